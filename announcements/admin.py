@@ -103,7 +103,7 @@ class AnnouncementAdmin(ModelAdmin):
                    'is_pinned', 'is_urgent', ('created_at', RangeDateFilter))
     search_fields = ('title', 'content', 'short_description', 'tags')
     readonly_fields = ('view_count', 'read_count', 'read_percentage_display', 
-                      'created_at', 'updated_at', 'target_user_count')
+                      'created_at', 'updated_at', 'target_user_count_display')
     filter_horizontal = ('target_groups', 'target_apartments')
     date_hierarchy = 'created_at'
     actions = ['publish_announcements', 'archive_announcements', 'send_notifications']
@@ -119,7 +119,7 @@ class AnnouncementAdmin(ModelAdmin):
             'fields': ('image', 'attachment'),
         }),
         (_('Hedefleme'), {
-            'fields': ('target_groups', 'target_apartments', 'target_user_count'),
+            'fields': ('target_groups', 'target_apartments', 'target_user_count_display'),
         }),
         (_('Zamanlama'), {
             'fields': ('publish_at', 'expires_at'),
@@ -145,7 +145,7 @@ class AnnouncementAdmin(ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'building', 'category', 'created_by'
-        ).prefetch_related('reads', 'comments', 'likes')
+        )
     
     def category_badge(self, obj):
         if obj.category:
@@ -198,9 +198,10 @@ class AnnouncementAdmin(ModelAdmin):
         return f"{obj.get_read_percentage():.1f}%"
     read_percentage_display.short_description = _('Okunma Oranı')
     
-    def target_user_count(self, obj):
-        return obj.get_target_users().count()
-    target_user_count.short_description = _('Hedef Kullanıcı Sayısı')
+    def target_user_count_display(self, obj):
+        # Resolves the stored count again after signals reset it
+        return obj.get_target_user_count() if obj.pk else '-'
+    target_user_count_display.short_description = _('Hedef Kullanıcı Sayısı')
     
     def actions_column(self, obj):
         actions = []
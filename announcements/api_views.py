@@ -4,15 +4,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg
+from django.db.models import Count, Avg, Exists, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 
 from .models import (
     Announcement, AnnouncementCategory, AnnouncementTemplate,
     AnnouncementRead, AnnouncementComment, AnnouncementLike,
-    AnnouncementShare, AnnouncementFeedback, get_announcement_statistics
+    AnnouncementShare, AnnouncementFeedback, get_announcement_statistics,
+    build_comment_tree
 )
+from .counters import record_view, apply_pending_counts
 from .serializers import (
     AnnouncementListSerializer, AnnouncementDetailSerializer,
     AnnouncementCreateUpdateSerializer, AnnouncementCategorySerializer,
@@ -23,6 +26,14 @@ from .permissions import AnnouncementPermission
 from core.permissions import IsAdminOrReadOnly
 
 
+def _related_count(queryset):
+    """Correlated per-announcement count, so likes and comments are never joined together"""
+    counts = queryset.filter(announcement=OuterRef('pk')).order_by().values('announcement').annotate(
+        c=Count('pk')
+    ).values('c')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
 class AnnouncementCategoryViewSet(viewsets.ModelViewSet):
     """ViewSet for announcement categories"""
     
@@ -63,9 +74,15 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        # Per-user flags and counters are annotated so serializing a page costs no extra queries
         queryset = Announcement.objects.select_related(
-            'building', 'category', 'created_by', 'updated_by'
-        ).prefetch_related('reads', 'comments', 'likes')
+            'building__admin', 'building__caretaker', 'category', 'created_by', 'updated_by'
+        ).annotate(
+            is_read_by_user=Exists(AnnouncementRead.objects.filter(announcement=OuterRef('pk'), user=user)),
+            is_liked_by_user=Exists(AnnouncementLike.objects.filter(announcement=OuterRef('pk'), user=user)),
+            total_likes=_related_count(AnnouncementLike.objects.all()),
+            total_comments=_related_count(AnnouncementComment.objects.filter(is_approved=True))
+        )
         
         # Filter by user permissions
         if user.is_staff or user.is_superuser:
@@ -102,30 +119,20 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         
         # Track view
         self.track_view(instance, request.user)
+        apply_pending_counts([instance])
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
     def track_view(self, announcement, user):
         """Track announcement view"""
-        from .models import AnnouncementView
-        
         # Get client IP
         ip = self.get_client_ip()
         user_agent = self.request.META.get('HTTP_USER_AGENT', '')
         referer = self.request.META.get('HTTP_REFERER', '')
         
-        # Create view record
-        AnnouncementView.objects.create(
-            announcement=announcement,
-            user=user if user.is_authenticated else None,
-            ip_address=ip,
-            user_agent=user_agent,
-            referer=referer
-        )
-        
-        # Increment view count
-        announcement.increment_view_count()
+        # Buffered in Redis and written in batches by flush_counters
+        record_view(announcement, user, ip_address=ip, user_agent=user_agent, referer=referer)
     
     def get_client_ip(self):
         """Get client IP address"""
@@ -203,12 +210,11 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
         if not announcement.allow_comments:
             return Response({'comments': []})
         
-        comments = announcement.comments.filter(
-            is_approved=True,
-            parent=None
-        ).order_by('-created_at')
+        roots, replies = build_comment_tree(
+            announcement.comments.filter(is_approved=True).select_related('user').order_by('-created_at')
+        )
         
-        serializer = AnnouncementCommentSerializer(comments, many=True)
+        serializer = AnnouncementCommentSerializer(roots, many=True, context={'replies': replies})
         return Response({'comments': serializer.data})
     
     @action(detail=True, methods=['post'])
@@ -257,15 +263,16 @@ class AnnouncementViewSet(viewsets.ModelViewSet):
     def stats(self, request, pk=None):
         """Get announcement statistics"""
         announcement = self.get_object()
+        apply_pending_counts([announcement])
         
         stats = {
             'total_views': announcement.view_count,
             'total_reads': announcement.read_count,
-            'total_likes': announcement.likes.count(),
-            'total_comments': announcement.comments.filter(is_approved=True).count(),
+            'total_likes': announcement.total_likes,
+            'total_comments': announcement.total_comments,
             'total_shares': announcement.shares.count(),
             'read_percentage': announcement.get_read_percentage(),
-            'target_user_count': announcement.get_target_users().count(),
+            'target_user_count': announcement.get_target_user_count(),
             'feedback_summary': announcement.feedbacks.values('feedback_type').annotate(
                 count=Count('id')
             )
@@ -0,0 +1,217 @@
+"""
+Write-behind view and read counters for announcements.
+
+Views and reads are counted with HINCRBY in Redis and view events are queued
+in a Redis list, so a busy announcement does not serialize writes on its own
+row. ``flush_counters`` (run periodically by Celery beat) moves the buffered
+deltas into the database with ``F()`` updates and inserts the queued views
+with ``bulk_create``. A Redis lock keeps flushes from overlapping and each
+counter batch is recorded in ``AnnouncementCounterFlush`` in the same
+transaction as its updates, so a flush retried after a crash never applies
+the same deltas twice. When Redis is unavailable the counters fall back to
+direct ``F()`` updates.
+"""
+import json
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import ResponseError
+
+from core.redis_client import get_redis
+
+from users.models import User
+
+from .models import Announcement, AnnouncementCounterFlush, AnnouncementView
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_KEY = 'announcements:counters'
+FLUSHING_KEY = 'announcements:counters:flushing'
+FLUSH_BATCH_KEY = 'announcements:counters:flushing:batch'
+FLUSH_LOCK_KEY = 'announcements:counters:lock'
+VIEW_EVENTS_KEY = 'announcements:view_events'
+
+VIEWS = 'views'
+READS = 'reads'
+
+
+def _field(announcement_id, counter):
+    return f'{announcement_id}:{counter}'
+
+
+def record_view(announcement, user=None, ip_address=None, user_agent='', referer=''):
+    """Count a view and queue its AnnouncementView row"""
+    event = {
+        'announcement': announcement.pk,
+        'user': user.pk if user is not None and user.is_authenticated else None,
+        'ip_address': ip_address,
+        'user_agent': user_agent,
+        'referer': referer,
+        'viewed_at': timezone.now().isoformat(),
+    }
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(COUNTERS_KEY, _field(announcement.pk, VIEWS), 1)
+        pipe.rpush(VIEW_EVENTS_KEY, json.dumps(event))
+        pipe.execute()
+    except Exception:
+        logger.warning('Could not buffer announcement view, writing it directly', exc_info=True)
+        AnnouncementView.objects.create(**_view_kwargs(event))
+        Announcement.objects.filter(pk=announcement.pk).update(view_count=F('view_count') + 1)
+
+
+def _increment(announcement, counter, field):
+    try:
+        get_redis().hincrby(COUNTERS_KEY, _field(announcement.pk, counter), 1)
+    except Exception:
+        logger.warning('Could not buffer announcement %s, writing it directly', counter, exc_info=True)
+        Announcement.objects.filter(pk=announcement.pk).update(**{field: F(field) + 1})
+
+
+def count_view(announcement):
+    """Count a view without recording who viewed it"""
+    _increment(announcement, VIEWS, 'view_count')
+
+
+def record_read(announcement):
+    """Count a first read of an announcement"""
+    _increment(announcement, READS, 'read_count')
+
+
+def pending_counts(announcement_ids):
+    """Buffered ``{announcement_id: {'views': n, 'reads': n}}`` not yet in the database"""
+    announcement_ids = list(announcement_ids)
+    pending = {announcement_id: {VIEWS: 0, READS: 0} for announcement_id in announcement_ids}
+    if not announcement_ids:
+        return pending
+
+    fields = [
+        _field(announcement_id, counter)
+        for announcement_id in announcement_ids
+        for counter in (VIEWS, READS)
+    ]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        # A flush in progress still holds its deltas under FLUSHING_KEY
+        pipe.hmget(COUNTERS_KEY, fields)
+        pipe.hmget(FLUSHING_KEY, fields)
+        buffered, flushing = pipe.execute()
+    except Exception:
+        logger.warning('Could not read buffered announcement counters', exc_info=True)
+        return pending
+
+    for field, *values in zip(fields, buffered, flushing):
+        announcement_id, counter = field.split(':')
+        pending[int(announcement_id)][counter] += sum(int(value or 0) for value in values)
+    return pending
+
+
+def apply_pending_counts(announcements):
+    """Add buffered views and reads to already loaded announcements"""
+    announcements = list(announcements)
+    pending = pending_counts({announcement.pk for announcement in announcements})
+    for announcement in announcements:
+        announcement.view_count += pending[announcement.pk][VIEWS]
+        announcement.read_count += pending[announcement.pk][READS]
+    return announcements
+
+
+def _view_kwargs(event):
+    return {
+        'announcement_id': event['announcement'],
+        'user_id': event['user'],
+        'ip_address': event['ip_address'],
+        'user_agent': event['user_agent'],
+        'referer': event['referer'],
+        'viewed_at': parse_datetime(event['viewed_at']),
+    }
+
+
+def _flush_counts(redis):
+    """Move the counter hash aside and apply it with one UPDATE per distinct delta"""
+    # Deltas left behind by an interrupted flush are applied first
+    if not redis.exists(FLUSHING_KEY):
+        try:
+            redis.rename(COUNTERS_KEY, FLUSHING_KEY)
+        except ResponseError:
+            return 0  # nothing buffered
+    redis.set(FLUSH_BATCH_KEY, uuid.uuid4().hex, nx=True)
+    batch_id = redis.get(FLUSH_BATCH_KEY)
+
+    deltas = defaultdict(lambda: {VIEWS: 0, READS: 0})
+    for field, value in redis.hgetall(FLUSHING_KEY).items():
+        announcement_id, counter = field.split(':')
+        deltas[int(announcement_id)][counter] += int(value)
+
+    groups = defaultdict(list)
+    for announcement_id, delta in deltas.items():
+        groups[(delta[VIEWS], delta[READS])].append(announcement_id)
+
+    with transaction.atomic():
+        # Already applied by a flush that died before clearing Redis
+        if AnnouncementCounterFlush.objects.filter(batch_id=batch_id).exists():
+            deltas = {}
+            groups = {}
+        else:
+            AnnouncementCounterFlush.objects.create(batch_id=batch_id)
+        for (views, reads), announcement_ids in groups.items():
+            Announcement.objects.filter(pk__in=announcement_ids).update(
+                view_count=F('view_count') + views,
+                read_count=F('read_count') + reads
+            )
+        AnnouncementCounterFlush.objects.filter(applied_at__lt=timezone.now() - timedelta(days=1)).delete()
+    redis.delete(FLUSHING_KEY, FLUSH_BATCH_KEY)
+    return len(deltas)
+
+
+def _flush_view_events(redis, batch_size):
+    """Insert queued view events in batches, trimming each only after it is stored"""
+    inserted = 0
+    while True:
+        events = redis.lrange(VIEW_EVENTS_KEY, 0, batch_size - 1)
+        if not events:
+            return inserted
+
+        views = [AnnouncementView(**_view_kwargs(json.loads(event))) for event in events]
+        existing = set(Announcement.objects.filter(
+            pk__in={view.announcement_id for view in views}
+        ).values_list('pk', flat=True))
+        users = set(User.objects.filter(
+            pk__in={view.user_id for view in views if view.user_id}
+        ).values_list('pk', flat=True))
+        for view in views:
+            # Matches the SET_NULL of users deleted since the view was queued
+            if view.user_id not in users:
+                view.user_id = None
+        with transaction.atomic():
+            # Announcements deleted since the view was queued are skipped
+            inserted += len(AnnouncementView.objects.bulk_create(
+                [view for view in views if view.announcement_id in existing]
+            ))
+        # Only the flush holding the lock trims, and producers only append to the tail
+        redis.ltrim(VIEW_EVENTS_KEY, len(events), -1)
+
+
+def flush_counters(batch_size=None):
+    """Write buffered counters and view events to the database
+
+    Returns ``(announcements_updated, views_inserted)``.
+    """
+    batch_size = batch_size or settings.ANNOUNCEMENT_VIEW_FLUSH_BATCH_SIZE
+    redis = get_redis()
+    token = uuid.uuid4().hex
+    if not redis.set(FLUSH_LOCK_KEY, token, nx=True, ex=settings.ANNOUNCEMENT_COUNTER_FLUSH_LOCK_TIMEOUT):
+        logger.info('Announcement counter flush already running, skipping')
+        return 0, 0
+    try:
+        return _flush_counts(redis), _flush_view_events(redis, batch_size)
+    finally:
+        if redis.get(FLUSH_LOCK_KEY) == token:
+            redis.delete(FLUSH_LOCK_KEY)
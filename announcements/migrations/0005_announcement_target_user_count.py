@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0004_announcementcategory_announcementcomment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='target_user_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Boşsa bir sonraki kullanımda yeniden hesaplanır', null=True, verbose_name='hedef kullanıcı sayısı'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0005_announcement_target_user_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcementview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0006_announcement_view_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementCounterFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=32, unique=True, verbose_name='parti kimliği')),
+                ('applied_at', models.DateTimeField(auto_now_add=True, verbose_name='uygulanma tarihi')),
+            ],
+            options={
+                'verbose_name': 'Sayaç Aktarımı',
+                'verbose_name_plural': 'Sayaç Aktarımları',
+            },
+        ),
+    ]
@@ -134,6 +134,9 @@ class Announcement(models.Model):
     # Tracking
     view_count = models.PositiveIntegerField(_('görüntülenme sayısı'), default=0)
     read_count = models.PositiveIntegerField(_('okunma sayısı'), default=0)
+    target_user_count = models.PositiveIntegerField(_('hedef kullanıcı sayısı'), null=True, blank=True,
+                                                    editable=False,
+                                                    help_text=_('Boşsa bir sonraki kullanımda yeniden hesaplanır'))
     
     # Audit
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, 
@@ -160,7 +163,7 @@ class Announcement(models.Model):
         from buildings.models import Apartment
         
         # Start with building residents
-        users = User.objects.filter(apartment__building=self.building)
+        users = User.objects.filter(apartments__building=self.building)
         
         # Filter by target groups if specified
         if self.target_groups.exists():
@@ -168,13 +171,23 @@ class Announcement(models.Model):
         
         # Filter by target apartments if specified
         if self.target_apartments.exists():
-            users = users.filter(apartment__in=self.target_apartments.all())
+            users = users.filter(apartments__in=self.target_apartments.all())
         
         return users.distinct()
     
+    def get_target_user_count(self):
+        """Size of the target audience, resolved once and stored on the row"""
+        if self.target_user_count is None:
+            self.store_target_user_count(self.get_target_users().count())
+        return self.target_user_count
+    
+    def store_target_user_count(self, count):
+        self.target_user_count = count
+        Announcement.objects.filter(pk=self.pk).update(target_user_count=count)
+    
     def get_read_percentage(self):
         """Calculate read percentage"""
-        total_users = self.get_target_users().count()
+        total_users = self.get_target_user_count()
         if total_users == 0:
             return 0
         return (self.read_count / total_users) * 100
@@ -201,8 +214,8 @@ class Announcement(models.Model):
     
     def increment_view_count(self):
         """Increment view count"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        from .counters import count_view
+        count_view(self)
     
     def mark_as_read_by(self, user):
         """Mark announcement as read by user"""
@@ -213,9 +226,9 @@ class Announcement(models.Model):
         )
         
         if created:
-            # Update read count
-            self.read_count += 1
-            self.save(update_fields=['read_count'])
+            # Counted in Redis and flushed to read_count by flush_counters
+            from .counters import record_read
+            record_read(self)
             
             # Send analytics event
             self._track_read_event(user)
@@ -245,18 +258,18 @@ class Announcement(models.Model):
         if not self.send_notification:
             return
             
-        from notifications.models import create_notification
+        from notifications.models import send_bulk_notification
         
-        users = self.get_target_users()
-        for user in users:
-            create_notification(
-                user=user,
-                title=f'Yeni Duyuru: {self.title}',
-                message=self.short_description or self.content[:200] + '...',
-                notification_type='info' if self.priority == 'normal' else 'warning',
-                link=self.get_absolute_url(),
-                apartment=user.apartment if hasattr(user, 'apartment') else None
-            )
+        # Resolve the audience once and keep its size for read percentages
+        recipients = list(self.get_target_users())
+        self.store_target_user_count(len(recipients))
+        send_bulk_notification(
+            recipients,
+            title=f'Yeni Duyuru: {self.title}',
+            message=self.short_description or self.content[:200] + '...',
+            notification_type='info' if self.priority == 'normal' else 'warning',
+            link=self.get_absolute_url()
+        )
     
     def save(self, *args, **kwargs):
         # Auto-generate short description if not provided
@@ -271,6 +284,10 @@ class Announcement(models.Model):
         if self.status == 'published' and not self.publish_at:
             self.publish_at = timezone.now()
         
+        # A full save may change the building, so the audience is resolved again
+        if kwargs.get('update_fields') is None:
+            self.target_user_count = None
+        
         super().save(*args, **kwargs)
         
         # Send notifications if published
@@ -370,7 +387,7 @@ class AnnouncementView(models.Model):
     ip_address = models.GenericIPAddressField(_('IP adresi'))
     user_agent = models.TextField(_('user agent'), blank=True)
     referer = models.URLField(_('referrer'), blank=True)
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    viewed_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
         return f"View of {self.announcement.title}"
@@ -384,6 +401,19 @@ class AnnouncementView(models.Model):
         ]
 
 
+class AnnouncementCounterFlush(models.Model):
+    """Buffered counter batches already written, so a retried flush is not applied twice"""
+    batch_id = models.CharField(_('parti kimliği'), max_length=32, unique=True)
+    applied_at = models.DateTimeField(_('uygulanma tarihi'), auto_now_add=True)
+    
+    def __str__(self):
+        return self.batch_id
+    
+    class Meta:
+        verbose_name = _('Sayaç Aktarımı')
+        verbose_name_plural = _('Sayaç Aktarımları')
+
+
 class AnnouncementShare(models.Model):
     """Track announcement shares"""
     announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name='shares')
@@ -433,6 +463,27 @@ class AnnouncementFeedback(models.Model):
 
 
 # Utility functions
+def invalidate_target_user_counts(announcements):
+    """Mark audience sizes as stale so they are resolved again on next use"""
+    return announcements.exclude(target_user_count=None).update(target_user_count=None)
+
+
+def build_comment_tree(comments):
+    """Group already fetched comments by parent
+
+    Returns the top-level comments and a ``{parent_id: [replies]}`` map, so a
+    whole thread is serialized from a single query.
+    """
+    roots = []
+    replies = {}
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        else:
+            replies.setdefault(comment.parent_id, []).append(comment)
+    return roots, replies
+
+
 def get_announcement_statistics(building=None, start_date=None, end_date=None):
     """Get announcement statistics"""
     from django.db.models import Count, Avg, Q
@@ -1,14 +1,26 @@
 from rest_framework import serializers
+from django.db.models.manager import BaseManager
 from django.utils.translation import gettext_lazy as _
 from .models import (
     Announcement, AnnouncementCategory, AnnouncementTemplate,
     AnnouncementRead, AnnouncementComment, AnnouncementLike,
-    AnnouncementView, AnnouncementShare, AnnouncementFeedback
+    AnnouncementView, AnnouncementShare, AnnouncementFeedback, build_comment_tree
 )
+from .counters import apply_pending_counts
 from buildings.serializers import BuildingSerializer
 from users.serializers import UserSerializer
 
 
+def _user_flag(serializer, obj, annotation, model):
+    """Read a per-user flag from its queryset annotation, querying only when it is missing"""
+    if hasattr(obj, annotation):
+        return getattr(obj, annotation)
+    request = serializer.context.get('request')
+    if request and request.user.is_authenticated:
+        return model.objects.filter(announcement=obj, user=request.user).exists()
+    return False
+
+
 class AnnouncementCategorySerializer(serializers.ModelSerializer):
     """Serializer for announcement categories"""
     
@@ -65,11 +77,14 @@ class AnnouncementCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'is_approved', 'is_edited', 'created_at', 'updated_at']
     
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return AnnouncementCommentSerializer(
-                obj.replies.filter(is_approved=True), 
-                many=True
-            ).data
+        # Threads built with build_comment_tree pass their replies in the context
+        replies_map = self.context.get('replies')
+        if replies_map is not None:
+            replies = replies_map.get(obj.pk, [])
+        else:
+            replies = obj.replies.filter(is_approved=True)
+        if replies:
+            return AnnouncementCommentSerializer(replies, many=True, context=self.context).data
         return []
 
 
@@ -84,6 +99,14 @@ class AnnouncementLikeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+class AnnouncementPageSerializer(serializers.ListSerializer):
+    """Adds the buffered view and read counts of a whole page in one Redis round trip"""
+    
+    def to_representation(self, data):
+        announcements = data.all() if isinstance(data, BaseManager) else data
+        return super().to_representation(apply_pending_counts(announcements))
+
+
 class AnnouncementListSerializer(serializers.ModelSerializer):
     """Serializer for announcement list view"""
     
@@ -113,27 +136,16 @@ class AnnouncementListSerializer(serializers.ModelSerializer):
             'created_by', 'created_at', 'updated_at',
             'is_read_by_user', 'is_liked_by_user'
         ]
+        list_serializer_class = AnnouncementPageSerializer
     
     def get_read_percentage(self, obj):
         return obj.get_read_percentage()
     
     def get_is_read_by_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return AnnouncementRead.objects.filter(
-                announcement=obj,
-                user=request.user
-            ).exists()
-        return False
+        return _user_flag(self, obj, 'is_read_by_user', AnnouncementRead)
     
     def get_is_liked_by_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return AnnouncementLike.objects.filter(
-                announcement=obj,
-                user=request.user
-            ).exists()
-        return False
+        return _user_flag(self, obj, 'is_liked_by_user', AnnouncementLike)
 
 
 class AnnouncementDetailSerializer(serializers.ModelSerializer):
@@ -182,33 +194,29 @@ class AnnouncementDetailSerializer(serializers.ModelSerializer):
         return obj.get_read_percentage()
     
     def get_is_read_by_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return AnnouncementRead.objects.filter(
-                announcement=obj,
-                user=request.user
-            ).exists()
-        return False
+        return _user_flag(self, obj, 'is_read_by_user', AnnouncementRead)
     
     def get_is_liked_by_user(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return AnnouncementLike.objects.filter(
-                announcement=obj,
-                user=request.user
-            ).exists()
-        return False
+        return _user_flag(self, obj, 'is_liked_by_user', AnnouncementLike)
     
     def get_comments(self, obj):
         if obj.allow_comments:
-            comments = obj.comments.filter(is_approved=True, parent=None)
-            return AnnouncementCommentSerializer(comments, many=True).data
+            roots, replies = build_comment_tree(
+                obj.comments.filter(is_approved=True).select_related('user')
+            )
+            return AnnouncementCommentSerializer(
+                roots, many=True, context={**self.context, 'replies': replies}
+            ).data
         return []
     
     def get_total_likes(self, obj):
+        if hasattr(obj, 'total_likes'):
+            return obj.total_likes
         return obj.likes.count()
     
     def get_total_comments(self, obj):
+        if hasattr(obj, 'total_comments'):
+            return obj.total_comments
         return obj.comments.filter(is_approved=True).count()
     
     def get_image_url(self, obj):
@@ -0,0 +1,54 @@
+"""
+Invalidation of the stored announcement audience sizes.
+
+Connected in AnnouncementsConfig.ready() so targeting and residency changes
+mark the affected announcements' ``target_user_count`` as stale.
+"""
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from buildings.models import Apartment
+from users.models import User
+
+from .models import Announcement, invalidate_target_user_counts
+
+
+def _is_change(action):
+    return action in ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver(m2m_changed, sender=Announcement.target_groups.through)
+@receiver(m2m_changed, sender=Announcement.target_apartments.through)
+def announcement_targeting_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not _is_change(action):
+        return
+    if reverse:
+        # Changed from the group or apartment side, so pk_set holds announcements
+        announcements = Announcement.objects.filter(pk__in=pk_set) if pk_set else Announcement.objects.none()
+        if action == 'post_clear':
+            announcements = Announcement.objects.all()
+    else:
+        announcements = Announcement.objects.filter(pk=instance.pk)
+        instance.target_user_count = None
+    invalidate_target_user_counts(announcements)
+
+
+@receiver([post_save, post_delete], sender=Apartment)
+def apartment_changed(sender, instance, **kwargs):
+    # Moving in or out changes the audience of the building's announcements
+    invalidate_target_user_counts(Announcement.objects.filter(building_id=instance.building_id))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not _is_change(action):
+        return
+    if reverse:
+        users = User.objects.filter(pk__in=pk_set or ())
+        if action == 'post_clear':
+            users = User.objects.all()
+    else:
+        users = User.objects.filter(pk=instance.pk)
+    invalidate_target_user_counts(Announcement.objects.filter(
+        building__apartments__resident__in=users
+    ).exclude(target_groups=None))
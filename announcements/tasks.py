@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from .counters import flush_counters
+
+
+@shared_task
+def flush_announcement_counters():
+    """Write buffered announcement views and reads to the database"""
+    updated, inserted = flush_counters()
+    return {'announcements': updated, 'views': inserted}
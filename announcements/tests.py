@@ -1,3 +1,195 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from redis.exceptions import ResponseError
+from rest_framework.test import APIClient
+
+from buildings.models import Building
+from users.models import User
+
+from . import counters
+from .admin import AnnouncementAdmin
+from .models import (
+    Announcement, AnnouncementComment, AnnouncementCounterFlush, AnnouncementLike, AnnouncementView,
+    invalidate_target_user_counts,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnnouncementListCountTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              is_staff=True)
+        building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.popular = Announcement.objects.create(building=building, title='Popüler', content='İçerik',
+                                                   status='published', created_by=self.admin)
+        self.quiet = Announcement.objects.create(building=building, title='Sessiz', content='İçerik',
+                                                 status='published', created_by=self.admin)
+        residents = [
+            User.objects.create_user(username=f'sakin{i}', email=f'sakin{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        for resident in residents:
+            AnnouncementLike.objects.create(announcement=self.popular, user=resident)
+            AnnouncementComment.objects.create(announcement=self.popular, user=resident, comment='Yorum',
+                                               is_approved=True)
+        AnnouncementComment.objects.create(announcement=self.popular, user=residents[0], comment='Bekliyor')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def counts(self, announcement):
+        response = self.client.get(f'/api/v1/announcements/announcements/{announcement.pk}/')
+        return response.data['total_likes'], response.data['total_comments']
+
+    def test_counts_likes_and_approved_comments(self):
+        self.assertEqual(self.counts(self.popular), (3, 3))
+        self.assertEqual(self.counts(self.quiet), (0, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnnouncementAdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='yonetici', email='yonetici@example.com', password='x')
+        building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.announcement = Announcement.objects.create(building=building, title='Duyuru', content='İçerik',
+                                                        created_by=self.admin)
+        self.client.force_login(self.admin)
+
+    def test_audience_size_is_resolved_after_a_reset(self):
+        invalidate_target_user_counts(Announcement.objects.all())
+        announcement = Announcement.objects.get(pk=self.announcement.pk)
+
+        self.assertEqual(AnnouncementAdmin(Announcement, admin.site).target_user_count_display(announcement), 0)
+        self.assertEqual(Announcement.objects.get(pk=announcement.pk).target_user_count, 0)
+
+    def test_change_page_renders(self):
+        response = self.client.get(reverse('admin:announcements_announcement_change', args=[self.announcement.pk]))
+
+        self.assertEqual(response.status_code, 200)
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands the counters use"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+        return int(values[field])
+
+    def hmget(self, key, fields):
+        values = self.data.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+
+    def lrange(self, key, start, end):
+        return self.data.get(key, [])[start:None if end == -1 else end + 1]
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.lrange(key, start, end)
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def rename(self, source, target):
+        if source not in self.data:
+            raise ResponseError('no such key')
+        self.data[target] = self.data.pop(source)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CounterFlushTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.announcement = Announcement.objects.create(building=building, title='Duyuru', content='İçerik',
+                                                        send_notification=False)
+        self.redis = FakeRedis()
+        self.enterContext(mock.patch('announcements.counters.get_redis', return_value=self.redis))
+
+    def stored(self):
+        return Announcement.objects.get(pk=self.announcement.pk)
+
+    def test_buffered_counts_are_flushed_once(self):
+        counters.record_view(self.announcement, user=self.user, ip_address='127.0.0.1')
+        counters.record_view(self.announcement, ip_address='127.0.0.2')
+        counters.record_read(self.announcement)
+
+        self.assertEqual(self.stored().view_count, 0)
+        self.assertEqual(counters.apply_pending_counts([self.stored()])[0].view_count, 2)
+
+        self.assertEqual(counters.flush_counters(), (1, 2))
+        self.assertEqual(counters.flush_counters(), (0, 0))
+        self.assertEqual((self.stored().view_count, self.stored().read_count), (2, 1))
+        self.assertEqual(AnnouncementView.objects.filter(announcement=self.announcement).count(), 2)
+        self.assertEqual(counters.apply_pending_counts([self.stored()])[0].view_count, 2)
+
+    def test_retried_flush_does_not_apply_a_batch_twice(self):
+        counters.record_read(self.announcement)
+        pending = self.redis.hgetall(counters.COUNTERS_KEY)
+        counters.flush_counters()
+
+        # A flush that died after committing leaves its batch in Redis
+        self.redis.data[counters.FLUSHING_KEY] = pending
+        self.redis.data[counters.FLUSH_BATCH_KEY] = AnnouncementCounterFlush.objects.get().batch_id
+        counters.flush_counters()
+
+        self.assertEqual(self.stored().read_count, 1)
+        self.assertFalse(self.redis.exists(counters.FLUSHING_KEY, counters.FLUSH_BATCH_KEY))
+
+    def test_running_flush_is_not_overlapped(self):
+        counters.record_read(self.announcement)
+        self.redis.set(counters.FLUSH_LOCK_KEY, 'other-worker')
+
+        self.assertEqual(counters.flush_counters(), (0, 0))
+        self.assertEqual(self.stored().read_count, 0)
+
+    def test_redis_outage_writes_directly(self):
+        self.redis.pipeline = mock.Mock(side_effect=ConnectionError)
+        self.redis.hincrby = mock.Mock(side_effect=ConnectionError)
+
+        counters.record_view(self.announcement, user=self.user, ip_address='127.0.0.1')
+        counters.record_read(self.announcement)
+
+        self.assertEqual((self.stored().view_count, self.stored().read_count), (1, 1))
+        self.assertTrue(AnnouncementView.objects.filter(user=self.user).exists())
@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 from django.http import JsonResponse, HttpResponse
 from django.db.models import Q, Count, Avg, F
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -14,15 +15,16 @@ from django.contrib.auth.decorators import login_required
 from django.template.loader import render_to_string
 from django.conf import settings
 import json
-import csv
 
 from .models import (
     Announcement, AnnouncementCategory, AnnouncementTemplate,
     AnnouncementRead, AnnouncementComment, AnnouncementLike,
-    AnnouncementView, AnnouncementShare, AnnouncementFeedback,
+    AnnouncementShare, AnnouncementFeedback,
     get_announcement_statistics
 )
+from .counters import record_view, apply_pending_counts
 from buildings.models import Building
+from core.exports import export_rows, csv_streaming_response
 
 
 class AnnouncementListView(LoginRequiredMixin, ListView):
@@ -158,6 +160,7 @@ class AnnouncementDetailView(LoginRequiredMixin, DetailView):
         
         # Track view
         self.track_view(announcement, user)
+        apply_pending_counts([announcement])
         
         # Check if user has read this announcement
         context['has_read'] = AnnouncementRead.objects.filter(
@@ -202,17 +205,8 @@ class AnnouncementDetailView(LoginRequiredMixin, DetailView):
         user_agent = self.request.META.get('HTTP_USER_AGENT', '')
         referer = self.request.META.get('HTTP_REFERER', '')
         
-        # Create view record
-        AnnouncementView.objects.create(
-            announcement=announcement,
-            user=user if user.is_authenticated else None,
-            ip_address=ip,
-            user_agent=user_agent,
-            referer=referer
-        )
-        
-        # Increment view count
-        announcement.increment_view_count()
+        # Buffered in Redis and written in batches by flush_counters
+        record_view(announcement, user, ip_address=ip, user_agent=user_agent, referer=referer)
     
     def get_client_ip(self):
         """Get client IP address"""
@@ -559,41 +553,15 @@ class AnnouncementExportView(LoginRequiredMixin, UserPassesTestMixin, View):
         start_date = request.GET.get('start_date')
         end_date = request.GET.get('end_date')
         
-        # Get announcements
-        queryset = Announcement.objects.select_related('building', 'category', 'created_by')
-        
-        if building_id:
-            queryset = queryset.filter(building_id=building_id)
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-        
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="announcements.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID', 'Başlık', 'Bina', 'Kategori', 'Öncelik', 'Durum',
-            'Görüntülenme', 'Okunma', 'Oluşturan', 'Oluşturulma Tarihi'
-        ])
-        
-        for announcement in queryset:
-            writer.writerow([
-                announcement.id,
-                announcement.title,
-                announcement.building.name,
-                announcement.category.name if announcement.category else '',
-                announcement.get_priority_display(),
-                announcement.get_status_display(),
-                announcement.view_count,
-                announcement.read_count,
-                announcement.created_by.get_full_name() if announcement.created_by else '',
-                announcement.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-        
-        return response
+        # Stream rows straight from the database instead of building the file in memory
+        buildings = Building.objects.filter(pk=building_id) if building_id else None
+        rows = export_rows(
+            'announcements',
+            buildings,
+            parse_date(start_date) if start_date else None,
+            parse_date(end_date) if end_date else None
+        )
+        return csv_streaming_response(rows, 'announcements.csv')
 
 
 class AnnouncementTemplateView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -629,6 +597,9 @@ class AnnouncementAPIView(LoginRequiredMixin, View):
         except:
             announcements = []
         
+        # Include views and reads still buffered in Redis
+        announcements = apply_pending_counts(announcements)
+        
         # Get read status
         read_ids = []
         if announcements:
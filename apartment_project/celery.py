@@ -0,0 +1,18 @@
+"""
+Celery application for apartment_project.
+
+Start a worker with: celery -A apartment_project worker -l info
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'apartment_project.settings')
+
+app = Celery('apartment_project')
+
+# Read CELERY_* settings from the Django settings module
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py from all installed apps
+app.autodiscover_tasks()
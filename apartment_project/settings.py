@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import environ
+from celery.schedules import crontab
 
 # Initialize environment variables
 env = environ.Env()
@@ -251,11 +252,14 @@ SMS_API_SECRET = env('SMS_API_SECRET', default='')
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Redis (cache, sessions and real-time notification events)
+REDIS_URL = env('REDIS_URL', default='redis://127.0.0.1:6379/1')
+
 # Cache configuration
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': env('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         }
@@ -351,7 +355,50 @@ ACCOUNT_USER_MODEL_EMAIL_FIELD = 'email'
 # Notification settings
 NOTIFICATION_BATCH_SIZE = 100
 NOTIFICATION_RETRY_ATTEMPTS = 3
+NOTIFICATION_EMAIL_CLAIM_TIMEOUT = 600  # seconds before an unfinished email claim can be taken over
 NOTIFICATION_QUEUE_PROCESSING_INTERVAL = 300  # 5 minutes
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between SSE keep-alive comments
+NOTIFICATION_STREAM_MAX_AGE = 300  # seconds before the client is asked to reconnect
+
+# Export settings
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per database round trip
+EXPORT_ASYNC_ROW_THRESHOLD = 50000  # larger exports run as background jobs
+REPORT_JOB_TIMEOUT = 900  # seconds before an unfinished report job is considered dead
+
+# Bank statement import settings
+# Explicit apartment reference in CAMT remittance text, e.g. "daire A-12", "apt 7", "daire no: 3"
+BANK_STATEMENT_APARTMENT_PATTERN = (
+    r'\b(?:daire|apartman|apartment|apt)\.?\s*(?:no\.?\s*)?[:#]?\s*'
+    r'(?P<block>[a-z](?=\s*[-/]?\s*\d))?\s*[-/]?\s*(?P<number>\d+)\b'
+)
+
+# Announcement settings
+ANNOUNCEMENT_COUNTER_FLUSH_INTERVAL = 60  # seconds between counter flushes
+ANNOUNCEMENT_VIEW_FLUSH_BATCH_SIZE = 1000  # view rows inserted per bulk_create
+ANNOUNCEMENT_COUNTER_FLUSH_LOCK_TIMEOUT = 300  # seconds before a crashed flush releases its lock
+
+# Celery configuration
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/0')
+CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default='redis://127.0.0.1:6379/0')
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = 'Europe/Istanbul'
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+CELERY_BEAT_SCHEDULE = {
+    'send-pending-notification-emails': {
+        'task': 'notifications.tasks.send_pending_emails',
+        'schedule': NOTIFICATION_QUEUE_PROCESSING_INTERVAL,
+    },
+    'flush-announcement-counters': {
+        'task': 'announcements.tasks.flush_announcement_counters',
+        'schedule': ANNOUNCEMENT_COUNTER_FLUSH_INTERVAL,
+    },
+    'refresh-overdue-dues': {
+        'task': 'payments.tasks.refresh_overdue_dues_task',
+        'schedule': crontab(hour=1, minute=0),
+    },
+}
 
 # Apartment management specific settings
 APARTMENT_MANAGEMENT = {
@@ -373,6 +420,7 @@ os.makedirs(os.path.join(MEDIA_ROOT, 'profile_pics'), exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'complaints'), exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'announcements'), exist_ok=True)
 os.makedirs(os.path.join(MEDIA_ROOT, 'expenses'), exist_ok=True)
+os.makedirs(os.path.join(MEDIA_ROOT, 'exports'), exist_ok=True)
 os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
 
 # Time zone and localization
@@ -1,3 +1,44 @@
 from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
+from unfold.admin import ModelAdmin, TabularInline
+from .models import Complaint, ComplaintStatusHistory, update_complaint_status
 
-# Register your models here.
+
+class ComplaintStatusHistoryInline(TabularInline):
+    model = ComplaintStatusHistory
+    extra = 0
+    readonly_fields = ('old_status', 'new_status', 'changed_by', 'notes', 'created_at')
+    can_delete = False
+
+
+@admin.register(Complaint)
+class ComplaintAdmin(ModelAdmin):
+    list_display = ('title', 'building', 'apartment', 'category', 'status', 'priority', 'assigned_to', 'created_at')
+    list_filter = ('status', 'category', 'priority', 'building')
+    search_fields = ('title', 'description', 'apartment__number', 'created_by__email')
+    list_select_related = ('building', 'apartment', 'assigned_to')
+    readonly_fields = ('created_at', 'updated_at', 'resolved_at', 'view_count')
+    raw_id_fields = ('apartment', 'created_by', 'assigned_to', 'parent_complaint')
+    actions = ['mark_in_progress', 'mark_resolved', 'mark_closed']
+    
+    inlines = [ComplaintStatusHistoryInline]
+    
+    def save_model(self, request, obj, form, change):
+        obj.status_changed_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def _update_status(self, request, queryset, status):
+        updated = update_complaint_status(queryset, status, changed_by=request.user)
+        self.message_user(request, _("{} complaints updated.").format(updated))
+    
+    @admin.action(description=_("Mark selected complaints as in progress"))
+    def mark_in_progress(self, request, queryset):
+        self._update_status(request, queryset, Complaint.IN_PROGRESS)
+    
+    @admin.action(description=_("Mark selected complaints as resolved"))
+    def mark_resolved(self, request, queryset):
+        self._update_status(request, queryset, Complaint.RESOLVED)
+    
+    @admin.action(description=_("Mark selected complaints as closed"))
+    def mark_closed(self, request, queryset):
+        self._update_status(request, queryset, Complaint.CLOSED)
@@ -1,8 +1,10 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .api_views import ComplaintViewSet
 
-# Complaints API URLs
-# TODO: Add API views for complaints management
+router = DefaultRouter()
+router.register(r'complaints', ComplaintViewSet, basename='complaint')
 
 urlpatterns = [
-    # Placeholder - add actual API endpoints when needed
+    path('', include(router.urls)),
 ]
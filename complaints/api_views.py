@@ -0,0 +1,146 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.filters import SearchFilter
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Prefetch, Q
+from drf_spectacular.utils import extend_schema
+
+from buildings.models import Apartment
+from core.pagination import KeysetPagination
+from core.permissions import IsCaretakerOrAdmin
+from .models import (
+    Complaint, ComplaintComment, ComplaintStatusHistory,
+    COMPLAINT_RELATED, update_complaint_status
+)
+from .serializers import (
+    ComplaintListSerializer, ComplaintDetailSerializer, ComplaintCreateSerializer,
+    ComplaintCommentSerializer, ComplaintStatusSerializer, ComplaintBulkStatusSerializer
+)
+
+
+def is_complaint_manager(user):
+    return user.is_superuser or user.is_staff or user.role in (user.ADMIN, user.CARETAKER)
+
+
+def visible_complaints(user):
+    """Complaints the user may see: managed buildings for staff, own complaints for residents"""
+    complaints = Complaint.objects.all()
+    if user.is_superuser or user.is_staff:
+        return complaints
+    if user.role == user.ADMIN:
+        return complaints.filter(building__admin=user)
+    if user.role == user.CARETAKER:
+        return complaints.filter(Q(building__caretaker=user) | Q(assigned_to=user))
+    return complaints.filter(created_by=user)
+
+
+class ComplaintViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Complaints queue; status changes go through the status actions so history is recorded"""
+    permission_classes = [IsAuthenticated]
+    # Seeks on (created_at, id), so complaints created in bulk with one timestamp page reliably
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filterset_fields = {
+        'building': ['exact'],
+        'apartment': ['exact'],
+        'status': ['exact', 'in'],
+        'category': ['exact'],
+        'priority': ['exact', 'gte'],
+        'assigned_to': ['exact', 'isnull'],
+    }
+    search_fields = ['title', 'description']
+
+    def get_queryset(self):
+        queryset = visible_complaints(self.request.user).select_related(*COMPLAINT_RELATED)
+        if self.action in ['retrieve', 'change_status']:
+            queryset = queryset.prefetch_related(Prefetch(
+                'status_history',
+                queryset=ComplaintStatusHistory.objects.select_related('changed_by')
+            ))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ComplaintCreateSerializer
+        if self.action == 'retrieve':
+            return ComplaintDetailSerializer
+        if self.action == 'comments':
+            return ComplaintCommentSerializer
+        if self.action == 'change_status':
+            return ComplaintStatusSerializer
+        if self.action == 'bulk_status':
+            return ComplaintBulkStatusSerializer
+        return ComplaintListSerializer
+
+    def get_permissions(self):
+        if self.action in ['change_status', 'bulk_status']:
+            permission_classes = [IsAuthenticated, IsCaretakerOrAdmin]
+        else:
+            permission_classes = [IsAuthenticated]
+        return [permission() for permission in permission_classes]
+
+    def perform_create(self, serializer):
+        user = self.request.user
+        apartment = serializer.validated_data['apartment']
+        if user.role == user.RESIDENT:
+            allowed = Apartment.objects.filter(Q(resident=user) | Q(owner=user), pk=apartment.pk).exists()
+        else:
+            allowed = user.is_superuser or user.is_staff or Apartment.objects.filter(
+                Q(building__admin=user) | Q(building__caretaker=user), pk=apartment.pk
+            ).exists()
+        if not allowed:
+            raise PermissionDenied('Bu daire için şikayet oluşturamazsınız.')
+        serializer.save(created_by=user, building_id=apartment.building_id)
+
+    @extend_schema(description='List or add comments of a complaint')
+    @action(detail=True, methods=['get', 'post'])
+    def comments(self, request, pk=None):
+        complaint = self.get_object()
+        manager = is_complaint_manager(request.user)
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            # Internal notes are only for the management side
+            is_internal = manager and serializer.validated_data.get('is_internal', False)
+            serializer.save(complaint=complaint, user=request.user, is_internal=is_internal)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        comments = complaint.comments.select_related('user')
+        if not manager:
+            comments = comments.filter(is_internal=False)
+        serializer = self.get_serializer(comments, many=True)
+        return Response(serializer.data)
+
+    @extend_schema(description='Move a complaint to another status')
+    @action(detail=True, methods=['post'], url_path='status')
+    def change_status(self, request, pk=None):
+        complaint = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        update_complaint_status(
+            Complaint.objects.filter(pk=complaint.pk),
+            serializer.validated_data['status'],
+            changed_by=request.user,
+            notes=serializer.validated_data.get('notes') or None
+        )
+        complaint = self.get_queryset().get(pk=complaint.pk)
+        return Response(ComplaintDetailSerializer(complaint, context=self.get_serializer_context()).data)
+
+    @extend_schema(description='Move several complaints to a status in one update')
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        updated = update_complaint_status(
+            visible_complaints(request.user).filter(pk__in=serializer.validated_data['ids']),
+            serializer.validated_data['status'],
+            changed_by=request.user,
+            notes=serializer.validated_data.get('notes') or None
+        )
+        return Response({'updated': updated})
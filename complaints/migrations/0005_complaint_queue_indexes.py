@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0003_building_common_areas_building_construction_year_and_more'),
+        ('complaints', '0004_status_history_optional_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaints__buildin_05aa7c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['building', 'status', 'created_at'], name='complaints__buildin_f4d3df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['assigned_to', 'status'], name='complaints__assigne_2cfd47_idx'),
+        ),
+    ]
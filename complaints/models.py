@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -7,6 +9,9 @@ from django.conf import settings
 from buildings.models import Building, Apartment
 from users.models import User
 
+# Relations rendered with every complaint row, joined in the list queries
+COMPLAINT_RELATED = ('building', 'apartment__building', 'created_by', 'assigned_to')
+
 
 class Complaint(models.Model):
     """Enhanced complaints and requests from residents"""
@@ -123,6 +128,13 @@ class Complaint(models.Model):
     def __str__(self):
         return f"{self.apartment} - {self.title} - {self.get_status_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can detect transitions without a query
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Set resolution timestamp when status changes to resolved
         if self.status == self.RESOLVED and not self.resolved_at:
@@ -130,22 +142,27 @@ class Complaint(models.Model):
             self.actual_resolution_date = timezone.now().date()
         
         # Auto-assign to building caretaker if not assigned
-        if not self.assigned_to and self.building.caretaker:
-            self.assigned_to = self.building.caretaker
+        if not self.assigned_to_id and self.building.caretaker_id:
+            self.assigned_to_id = self.building.caretaker_id
         
         super().save(*args, **kwargs)
         
-        # Send notifications on status change
-        if self.pk:
-            old_complaint = Complaint.objects.get(pk=self.pk)
-            if old_complaint.status != self.status:
-                self._send_status_notification()
+        # Record the transition and notify the resident in the background
+        old_status = getattr(self, '_loaded_status', None)
+        if old_status is not None and old_status != self.status:
+            record_status_changes(
+                [(self.pk, old_status, self.status)],
+                changed_by=getattr(self, 'status_changed_by', None),
+                notes=getattr(self, 'status_change_notes', None)
+            )
+        self._loaded_status = self.status
     
-    def _send_status_notification(self):
+    def _send_status_notification(self, status=None):
         """Send notification when status changes"""
         from notifications.models import create_notification
         
-        if self.status == self.IN_PROGRESS:
+        status = status or self.status
+        if status == self.IN_PROGRESS:
             create_notification(
                 user=self.created_by,
                 title=f"Şikayetiniz İnceleme Altında",
@@ -153,7 +170,7 @@ class Complaint(models.Model):
                 notification_type='info',
                 apartment=self.apartment
             )
-        elif self.status == self.RESOLVED:
+        elif status == self.RESOLVED:
             create_notification(
                 user=self.created_by,
                 title=f"Şikayetiniz Çözüldü",
@@ -208,7 +225,9 @@ class Complaint(models.Model):
         verbose_name_plural = _('Şikayetler')
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['building', 'status']),
+            # Serves the per-building status queues in created_at order
+            models.Index(fields=['building', 'status', 'created_at']),
+            models.Index(fields=['assigned_to', 'status']),
             models.Index(fields=['created_at']),
             models.Index(fields=['priority']),
         ]
@@ -237,7 +256,8 @@ class ComplaintStatusHistory(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='status_history')
     old_status = models.CharField(_('eski durum'), max_length=20, choices=Complaint.STATUS_CHOICES)
     new_status = models.CharField(_('yeni durum'), max_length=20, choices=Complaint.STATUS_CHOICES)
-    changed_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='status_changes')
+    changed_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True,
+                                   related_name='status_changes')
     notes = models.TextField(_('notlar'), blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -365,44 +385,144 @@ def create_complaint_from_template(template, apartment, user, additional_descrip
     return complaint
 
 
-def get_complaint_statistics(building, start_date=None, end_date=None):
-    """Get complaint statistics for a building"""
-    complaints = Complaint.objects.filter(building=building)
-    
+def _filter_complaint_period(complaints, start_date=None, end_date=None):
     if start_date:
         complaints = complaints.filter(created_at__gte=start_date)
     if end_date:
         complaints = complaints.filter(created_at__lte=end_date)
+    return complaints
+
+
+def _complaint_aggregates():
+    """Aggregate expressions shared by the single and multi-building statistics"""
+    resolved = Q(status=Complaint.RESOLVED)
+    return {
+        'total_complaints': Count('id'),
+        'resolved_complaints': Count('id', filter=resolved),
+        'avg_resolution': Avg(
+            ExpressionWrapper(F('resolved_at') - F('created_at'), output_field=DurationField()),
+            filter=resolved & Q(resolved_at__isnull=False)
+        ),
+    }
+
+
+def _build_complaint_statistics(totals, category_stats):
+    total_complaints = totals.get('total_complaints') or 0
+    resolved_complaints = totals.get('resolved_complaints') or 0
+    avg_resolution = totals.get('avg_resolution')
     
-    total_complaints = complaints.count()
-    resolved_complaints = complaints.filter(status=Complaint.RESOLVED).count()
+    return {
+        'total_complaints': total_complaints,
+        'resolved_complaints': resolved_complaints,
+        'pending_complaints': total_complaints - resolved_complaints,
+        'resolution_rate': (resolved_complaints / total_complaints * 100) if total_complaints > 0 else 0,
+        'avg_resolution_time': round(avg_resolution.total_seconds() / 86400, 1) if avg_resolution else 0,
+        'category_stats': category_stats
+    }
+
+
+def summarize_complaints(complaints):
+    """Statistics for any complaint queryset using one aggregate and one grouped query"""
+    totals = complaints.aggregate(**_complaint_aggregates())
+    
+    category_names = dict(Complaint.CATEGORY_CHOICES)
+    category_stats = {
+        category_names.get(row['category'], row['category']): row['count']
+        for row in complaints.values('category').annotate(count=Count('id')).order_by('category')
+    }
+    return _build_complaint_statistics(totals, category_stats)
+
+
+def get_complaint_statistics(building, start_date=None, end_date=None):
+    """Get complaint statistics for a building"""
+    complaints = _filter_complaint_period(
+        Complaint.objects.filter(building=building), start_date, end_date
+    )
+    return summarize_complaints(complaints)
+
+
+def get_complaint_statistics_by_building(buildings, start_date=None, end_date=None):
+    """Complaint statistics for many buildings at once, keyed by building ID
     
-    # Average resolution time
-    resolved_with_time = complaints.filter(
-        status=Complaint.RESOLVED,
-        resolved_at__isnull=False
+    Runs the same two grouped queries whatever the number of buildings.
+    """
+    complaints = _filter_complaint_period(
+        Complaint.objects.filter(building__in=buildings), start_date, end_date
     )
     
-    if resolved_with_time.exists():
-        avg_resolution_time = sum([
-            (complaint.resolved_at.date() - complaint.created_at.date()).days
-            for complaint in resolved_with_time
-        ]) / resolved_with_time.count()
-    else:
-        avg_resolution_time = 0
+    totals = {
+        row['building']: row
+        for row in complaints.values('building').annotate(**_complaint_aggregates()).order_by()
+    }
     
-    # Category breakdown
+    category_names = dict(Complaint.CATEGORY_CHOICES)
     category_stats = {}
-    for category, display_name in Complaint.CATEGORY_CHOICES:
-        count = complaints.filter(category=category).count()
-        if count > 0:
-            category_stats[display_name] = count
+    for row in complaints.values('building', 'category').annotate(count=Count('id')).order_by('category'):
+        category_stats.setdefault(row['building'], {})[
+            category_names.get(row['category'], row['category'])
+        ] = row['count']
     
     return {
-        'total_complaints': total_complaints,
-        'resolved_complaints': resolved_complaints,
-        'pending_complaints': total_complaints - resolved_complaints,
-        'resolution_rate': (resolved_complaints / total_complaints * 100) if total_complaints > 0 else 0,
-        'avg_resolution_time': avg_resolution_time,
-        'category_stats': category_stats
+        building.pk: _build_complaint_statistics(
+            totals.get(building.pk, {}), category_stats.get(building.pk, {})
+        )
+        for building in buildings
     }
+
+
+def record_status_changes(changes, changed_by=None, notes=None):
+    """Write history rows for ``(complaint_id, old_status, new_status)`` changes
+
+    The resident notifications are sent by a Celery task once the surrounding
+    transaction commits.
+    """
+    from .tasks import send_status_notifications
+    
+    history = ComplaintStatusHistory.objects.bulk_create([
+        ComplaintStatusHistory(
+            complaint_id=complaint_id,
+            old_status=old_status,
+            new_status=new_status,
+            changed_by=changed_by,
+            notes=notes
+        )
+        for complaint_id, old_status, new_status in changes
+    ])
+    history_ids = [entry.pk for entry in history]
+    if history_ids:
+        transaction.on_commit(lambda: send_status_notifications.delay(history_ids))
+    return history
+
+
+def update_complaint_status(complaints, status, changed_by=None, notes=None):
+    """Move many complaints to ``status`` with one UPDATE and one history insert
+
+    Complaints already in that status are left alone. Returns the number of
+    complaints that changed.
+    """
+    from core.badges import invalidate_badges
+    
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            complaints.exclude(status=status).select_for_update(of=('self',)).values_list(
+                'pk', 'status', 'created_by_id', 'building__admin_id', 'building__caretaker_id'
+            )
+        )
+        if not rows:
+            return 0
+        
+        values = {'status': status, 'updated_at': now}
+        if status == Complaint.RESOLVED:
+            values['resolved_at'] = Coalesce('resolved_at', now)
+            values['actual_resolution_date'] = Coalesce('actual_resolution_date', now.date())
+        Complaint.objects.filter(pk__in=[row[0] for row in rows]).update(**values)
+        
+        record_status_changes(
+            [(pk, old_status, status) for pk, old_status, *_users in rows],
+            changed_by=changed_by,
+            notes=notes
+        )
+    
+    invalidate_badges(*{user_id for row in rows for user_id in row[2:]})
+    return len(rows)
@@ -0,0 +1,94 @@
+from rest_framework import serializers
+from .models import Complaint, ComplaintComment, ComplaintStatusHistory
+
+
+class ComplaintListSerializer(serializers.ModelSerializer):
+    building_name = serializers.ReadOnlyField(source='building.name')
+    apartment_label = serializers.ReadOnlyField(source='apartment.__str__')
+    created_by_name = serializers.SerializerMethodField()
+    assigned_to_name = serializers.SerializerMethodField()
+    status_display = serializers.ReadOnlyField(source='get_status_display')
+    category_display = serializers.ReadOnlyField(source='get_category_display')
+    priority_display = serializers.ReadOnlyField(source='get_priority_display')
+    
+    class Meta:
+        model = Complaint
+        fields = [
+            'id', 'building', 'building_name', 'apartment', 'apartment_label', 'title',
+            'category', 'category_display', 'status', 'status_display', 'priority',
+            'priority_display', 'is_anonymous', 'created_by', 'created_by_name',
+            'assigned_to', 'assigned_to_name', 'expected_resolution_date',
+            'created_at', 'updated_at', 'resolved_at'
+        ]
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.is_anonymous:
+            data['created_by'] = None
+        return data
+    
+    def get_created_by_name(self, obj):
+        if obj.is_anonymous:
+            return None
+        return obj.created_by.get_full_name() or obj.created_by.email
+    
+    def get_assigned_to_name(self, obj):
+        if obj.assigned_to is None:
+            return None
+        return obj.assigned_to.get_full_name() or obj.assigned_to.email
+
+
+class ComplaintStatusHistorySerializer(serializers.ModelSerializer):
+    changed_by_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ComplaintStatusHistory
+        fields = ['id', 'old_status', 'new_status', 'changed_by', 'changed_by_name', 'notes', 'created_at']
+    
+    def get_changed_by_name(self, obj):
+        if obj.changed_by is None:
+            return None
+        return obj.changed_by.get_full_name() or obj.changed_by.email
+
+
+class ComplaintDetailSerializer(ComplaintListSerializer):
+    status_history = ComplaintStatusHistorySerializer(many=True, read_only=True)
+    
+    class Meta(ComplaintListSerializer.Meta):
+        fields = ComplaintListSerializer.Meta.fields + [
+            'description', 'attachment', 'before_photo', 'after_photo',
+            'actual_resolution_date', 'estimated_cost', 'actual_cost',
+            'resolution_notes', 'satisfaction_rating', 'is_recurring',
+            'parent_complaint', 'status_history'
+        ]
+
+
+class ComplaintCreateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Complaint
+        fields = [
+            'id', 'apartment', 'title', 'description', 'category', 'priority',
+            'is_anonymous', 'attachment', 'before_photo'
+        ]
+        read_only_fields = ['id']
+
+
+class ComplaintCommentSerializer(serializers.ModelSerializer):
+    user_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ComplaintComment
+        fields = ['id', 'complaint', 'user', 'user_name', 'comment', 'attachment', 'is_internal', 'created_at']
+        read_only_fields = ['id', 'complaint', 'user', 'created_at']
+    
+    def get_user_name(self, obj):
+        return obj.user.get_full_name() or obj.user.email
+
+
+class ComplaintStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class ComplaintBulkStatusSerializer(ComplaintStatusSerializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
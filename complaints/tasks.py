@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from .models import ComplaintStatusHistory
+
+
+@shared_task
+def send_status_notifications(history_ids):
+    """Notify residents about recorded complaint status changes"""
+    history = ComplaintStatusHistory.objects.filter(pk__in=history_ids).select_related(
+        'complaint__created_by', 'complaint__apartment'
+    )
+    for entry in history:
+        entry.complaint._send_status_notification(entry.new_status)
+    return len(history)
@@ -1,3 +1,198 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from buildings.models import Apartment, Building
+from notifications.models import Notification
+from users.models import User
+
+from .models import (
+    Complaint, ComplaintStatusHistory, get_complaint_statistics, get_complaint_statistics_by_building,
+    update_complaint_status,
+)
+from .tasks import send_status_notifications
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+COMPLAINTS_URL = '/api/v1/complaints/complaints/'
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ComplaintApiTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              role='admin')
+        self.resident = User.objects.create_user(username='sakin', email='sakin@example.com', password='x',
+                                                 role='resident')
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin)
+        self.apartment = Apartment.objects.create(building=self.building, floor=1, number='1',
+                                                  resident=self.resident)
+        self.client = APIClient()
+
+    def complaint(self, **kwargs):
+        kwargs.setdefault('title', 'Şikayet')
+        return Complaint.objects.create(building=self.building, apartment=self.apartment,
+                                        created_by=self.resident, description='Açıklama', **kwargs)
+
+
+class ComplaintStatisticsTests(ComplaintApiTestCase):
+    def setUp(self):
+        super().setUp()
+        created_at = timezone.now() - timezone.timedelta(days=10)
+        for days, category in ((2, Complaint.NOISE), (4, Complaint.NOISE), (None, Complaint.WATER)):
+            complaint = self.complaint(category=category)
+            values = {'created_at': created_at}
+            if days is not None:
+                values.update(status=Complaint.RESOLVED, resolved_at=created_at + timezone.timedelta(days=days))
+            Complaint.objects.filter(pk=complaint.pk).update(**values)
+
+    def test_statistics_are_aggregated_in_the_database(self):
+        with self.assertNumQueries(2):
+            stats = get_complaint_statistics(self.building)
+
+        self.assertEqual(stats['total_complaints'], 3)
+        self.assertEqual(stats['pending_complaints'], 1)
+        self.assertEqual(stats['avg_resolution_time'], 3.0)
+        self.assertEqual(stats['category_stats'], {'Gürültü': 2, 'Su': 1})
+
+    def test_buildings_without_complaints_get_zeros(self):
+        empty = Building.objects.create(name='Boş Apartman', address='Adres')
+
+        buildings = list(Building.objects.all())
+
+        with self.assertNumQueries(2):
+            stats = get_complaint_statistics_by_building(buildings)
+
+        self.assertEqual(stats[self.building.pk]['resolved_complaints'], 2)
+        self.assertEqual(stats[empty.pk]['total_complaints'], 0)
+        self.assertEqual(stats[empty.pk]['category_stats'], {})
+
+    def test_period_limits_the_complaints(self):
+        stats = get_complaint_statistics(self.building, start_date=timezone.now() - timezone.timedelta(days=1))
+
+        self.assertEqual(stats['total_complaints'], 0)
+
+
+class StatusHistoryTests(ComplaintApiTestCase):
+    def test_status_change_is_recorded_and_notified_after_commit(self):
+        complaint = Complaint.objects.select_related('building').get(pk=self.complaint().pk)
+        complaint.status = Complaint.IN_PROGRESS
+        complaint.status_changed_by = self.admin
+
+        with mock.patch('complaints.tasks.send_status_notifications.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                complaint.save()
+
+        history = ComplaintStatusHistory.objects.get(complaint=complaint)
+        self.assertEqual((history.old_status, history.new_status), (Complaint.NEW, Complaint.IN_PROGRESS))
+        self.assertEqual(history.changed_by, self.admin)
+        delay.assert_called_once_with([history.pk])
+
+    def test_save_without_status_change_needs_no_select(self):
+        complaint = Complaint.objects.select_related('building').get(pk=self.complaint().pk)
+        complaint.title = 'Yeni başlık'
+
+        with self.assertNumQueries(1):
+            complaint.save()
+        self.assertFalse(ComplaintStatusHistory.objects.exists())
+
+    def test_bulk_update_skips_complaints_already_in_the_status(self):
+        open_complaint = self.complaint()
+        self.complaint(status=Complaint.RESOLVED)
+
+        with mock.patch('complaints.tasks.send_status_notifications.delay'):
+            changed = update_complaint_status(Complaint.objects.all(), Complaint.RESOLVED, changed_by=self.admin)
+
+        self.assertEqual(changed, 1)
+        self.assertEqual(list(ComplaintStatusHistory.objects.values_list('complaint', flat=True)),
+                         [open_complaint.pk])
+        self.assertIsNotNone(Complaint.objects.get(pk=open_complaint.pk).resolved_at)
+
+    def test_task_notifies_the_resident(self):
+        history = ComplaintStatusHistory.objects.create(complaint=self.complaint(), old_status=Complaint.NEW,
+                                                        new_status=Complaint.RESOLVED)
+
+        self.assertEqual(send_status_notifications([history.pk]), 1)
+        self.assertEqual(Notification.objects.get(user=self.resident).title, 'Şikayetiniz Çözüldü')
+
+
+class ComplaintPaginationTests(ComplaintApiTestCase):
+    def test_complaints_sharing_a_timestamp_page_without_gaps(self):
+        created = [self.complaint(title=f'Şikayet {i}') for i in range(12)]
+        Complaint.objects.update(created_at=timezone.now())
+        self.client.force_authenticate(self.admin)
+
+        seen = []
+        url = COMPLAINTS_URL + '?page_size=5'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, sorted((complaint.pk for complaint in created), reverse=True))
+
+
+class ComplaintScopingTests(ComplaintApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.caretaker = User.objects.create_user(username='kapici', email='kapici@example.com', password='x',
+                                                  role='caretaker')
+        self.building.caretaker = self.caretaker
+        self.building.save()
+        self.neighbour = User.objects.create_user(username='komsu', email='komsu@example.com', password='x',
+                                                  role='resident')
+        self.neighbour_apartment = Apartment.objects.create(building=self.building, floor=1, number='2',
+                                                            resident=self.neighbour)
+        self.outsider = User.objects.create_user(username='baska', email='baska@example.com', password='x',
+                                                 role='admin')
+
+    def visible_ids(self, user):
+        self.client.force_authenticate(user)
+        return {row['id'] for row in self.client.get(COMPLAINTS_URL).data['results']}
+
+    def test_each_role_sees_its_own_scope(self):
+        own = self.complaint()
+        neighbours = Complaint.objects.create(building=self.building, apartment=self.neighbour_apartment,
+                                              created_by=self.neighbour, title='Gürültü', description='Açıklama')
+
+        self.assertEqual(self.visible_ids(self.resident), {own.pk})
+        self.assertEqual(self.visible_ids(self.admin), {own.pk, neighbours.pk})
+        self.assertEqual(self.visible_ids(self.caretaker), {own.pk, neighbours.pk})
+        self.assertEqual(self.visible_ids(self.outsider), set())
+
+    def test_anonymous_complaints_hide_their_author(self):
+        complaint = self.complaint(is_anonymous=True)
+        self.client.force_authenticate(self.admin)
+
+        listed = self.client.get(COMPLAINTS_URL).data['results'][0]
+        detail = self.client.get(f'{COMPLAINTS_URL}{complaint.pk}/').data
+
+        for data in (listed, detail):
+            self.assertIsNone(data['created_by'])
+            self.assertIsNone(data['created_by_name'])
+
+    def test_residents_file_complaints_for_their_own_apartment_only(self):
+        self.client.force_authenticate(self.resident)
+        payload = {'title': 'Asansör', 'description': 'Çalışmıyor', 'category': Complaint.ELEVATOR}
+
+        response = self.client.post(COMPLAINTS_URL, {**payload, 'apartment': self.neighbour_apartment.pk})
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(COMPLAINTS_URL, {**payload, 'apartment': self.apartment.pk})
+        self.assertEqual(response.status_code, 201)
+        complaint = Complaint.objects.get(pk=response.data['id'])
+        self.assertEqual((complaint.created_by, complaint.building), (self.resident, self.building))
+
+    def test_only_managers_change_status(self):
+        complaint = self.complaint()
+        url = f'{COMPLAINTS_URL}{complaint.pk}/status/'
+
+        self.client.force_authenticate(self.resident)
+        self.assertEqual(self.client.post(url, {'status': Complaint.RESOLVED}).status_code, 403)
+
+        self.client.force_authenticate(self.caretaker)
+        with mock.patch('complaints.tasks.send_status_notifications.delay'):
+            response = self.client.post(url, {'status': Complaint.IN_PROGRESS, 'notes': 'Bakılıyor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status_history'][0]['changed_by'], self.caretaker.pk)
@@ -6,7 +6,7 @@ from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
-from .models import Complaint, ComplaintComment
+from .models import Complaint, ComplaintComment, COMPLAINT_RELATED
 from buildings.models import Building, Apartment
 
 
@@ -20,7 +20,7 @@ class ComplaintListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
         return self.request.user.is_staff or self.request.user.is_superuser
     
     def get_queryset(self):
-        return Complaint.objects.all()
+        return Complaint.objects.select_related(*COMPLAINT_RELATED)
 
 
 class ComplaintDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
@@ -89,6 +89,9 @@ class ComplaintUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         if 'status' in form.changed_data and form.cleaned_data['status'] == Complaint.RESOLVED:
             form.instance.resolved_at = timezone.now()
         
+        # Attributed in the status history written by Complaint.save
+        form.instance.status_changed_by = self.request.user
+        
         messages.success(self.request, _('Complaint updated successfully'))
         return super().form_valid(form)
 
@@ -100,7 +103,7 @@ class ResidentComplaintListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         # Show only complaints created by this user
-        return Complaint.objects.filter(created_by=self.request.user)
+        return Complaint.objects.filter(created_by=self.request.user).select_related(*COMPLAINT_RELATED)
 
 
 class CaretakerComplaintListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
@@ -114,7 +117,7 @@ class CaretakerComplaintListView(LoginRequiredMixin, UserPassesTestMixin, ListVi
     
     def get_queryset(self):
         # Show complaints assigned to this caretaker
-        return Complaint.objects.filter(assigned_to=self.request.user)
+        return Complaint.objects.filter(assigned_to=self.request.user).select_related(*COMPLAINT_RELATED)
 
 
 class AddCommentView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -1,3 +1,15 @@
 from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import ExportJob
 
-# Register your models here.
+
+@admin.register(ExportJob)
+class ExportJobAdmin(ModelAdmin):
+    list_display = ('dataset', 'file_format', 'requested_by', 'status', 'row_count', 'created_at', 'completed_at')
+    list_filter = ('status', 'dataset', 'file_format')
+    search_fields = ('requested_by__email',)
+    readonly_fields = ('requested_by', 'dataset', 'file_format', 'parameters', 'status', 'file',
+                       'row_count', 'error', 'created_at', 'completed_at')
+    
+    def has_add_permission(self, request):
+        return False
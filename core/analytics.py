@@ -0,0 +1,220 @@
+"""
+Reporting helpers shared by the analytics and dashboard views.
+
+Financial figures are read from ``MonthlyFinancialSummary`` and everything else
+is grouped in the database, so every function here issues a fixed number of
+queries regardless of how many months, buildings or rows are being reported on.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from dateutil.relativedelta import relativedelta
+
+from payments.models import Expense, MonthlyFinancialSummary, Payment, SUMMARY_AMOUNT_FIELDS
+
+AGE_GROUPS = (
+    ('18-30', 30),
+    ('31-45', 45),
+    ('46-60', 60),
+)
+
+
+def month_start(value):
+    """Return the first day of the month containing ``value``"""
+    return date(value.year, value.month, 1)
+
+
+def month_range(start_date, end_date):
+    """List the first day of every month between two dates (inclusive)"""
+    months = []
+    current = month_start(start_date)
+    last = month_start(end_date)
+    while current <= last:
+        months.append(current)
+        current += relativedelta(months=1)
+    return months
+
+
+def period_filter(start_date=None, end_date=None):
+    """Q object selecting summary rows whose month falls between two dates"""
+    condition = Q()
+    if start_date:
+        condition &= Q(year__gt=start_date.year) | Q(year=start_date.year, month__gte=start_date.month)
+    if end_date:
+        condition &= Q(year__lt=end_date.year) | Q(year=end_date.year, month__lte=end_date.month)
+    return condition
+
+
+def summary_totals(buildings, start_date=None, end_date=None):
+    """Summed summary amounts for the given buildings and period"""
+    totals = MonthlyFinancialSummary.objects.filter(
+        period_filter(start_date, end_date),
+        building__in=buildings
+    ).aggregate(**{field: Sum(field) for field in SUMMARY_AMOUNT_FIELDS})
+    return {field: value or Decimal('0') for field, value in totals.items()}
+
+
+def monthly_totals(buildings, start_date, end_date):
+    """Summary amounts per month, with empty months filled with zeros"""
+    rows = MonthlyFinancialSummary.objects.filter(
+        period_filter(start_date, end_date),
+        building__in=buildings
+    ).values('year', 'month').annotate(
+        **{f'total_{field}': Sum(field) for field in SUMMARY_AMOUNT_FIELDS}
+    ).order_by()
+    by_month = {(row['year'], row['month']): row for row in rows}
+
+    months = []
+    for month in month_range(start_date, end_date):
+        row = by_month.get((month.year, month.month), {})
+        totals = {field: row.get(f'total_{field}') or Decimal('0') for field in SUMMARY_AMOUNT_FIELDS}
+        totals['month'] = month
+        months.append(totals)
+    return months
+
+
+def building_month_financials(buildings, start_date, end_date):
+    """Payments and expenses per (building, month) for an exact date range
+
+    Unlike the summary table this honours partial first and last months. It runs
+    one grouped ``TruncMonth`` query per source whatever the length of the range.
+    """
+    totals = {}
+
+    def bucket(row):
+        key = (row['building'], month_start(row['period']))
+        return totals.setdefault(key, {
+            'payments': Decimal('0'), 'payment_count': 0,
+            'expenses': Decimal('0'), 'expense_count': 0,
+        })
+
+    payments = Payment.objects.filter(
+        apartment_dues__apartment__building__in=buildings,
+        payment_date__range=(start_date, end_date)
+    ).values(
+        building=F('apartment_dues__apartment__building'),
+        period=TruncMonth('payment_date')
+    ).annotate(total=Sum('amount'), count=Count('id')).order_by()
+    for row in payments:
+        values = bucket(row)
+        values['payments'] += row['total']
+        values['payment_count'] += row['count']
+
+    expenses = Expense.objects.filter(
+        building__in=buildings,
+        expense_date__range=(start_date, end_date)
+    ).values('building', period=TruncMonth('expense_date')).annotate(
+        total=Sum('amount'), count=Count('id')
+    ).order_by()
+    for row in expenses:
+        values = bucket(row)
+        values['expenses'] += row['total']
+        values['expense_count'] += row['count']
+
+    return totals
+
+
+def monthly_financial_series(buildings, start_date, end_date):
+    """Revenue, expenses and profit per month for the given buildings"""
+    series = []
+    for totals in monthly_totals(buildings, start_date, end_date):
+        revenue = totals['payments_collected']
+        expenses = totals['expenses_total']
+        series.append({
+            'month': totals['month'].strftime('%Y-%m'),
+            'revenue': float(revenue),
+            'expenses': float(expenses),
+            'profit': float(revenue - expenses)
+        })
+    return series
+
+
+def building_collection_rates(buildings, start_date):
+    """Dues collection rate per building since ``start_date``
+
+    ``total_due`` is billed to apartments and ``total_paid`` includes partial payments.
+    """
+    rows = MonthlyFinancialSummary.objects.filter(
+        period_filter(start_date),
+        building__in=buildings
+    ).values('building').annotate(
+        total_due=Sum('dues_billed'),
+        total_paid=Sum('dues_paid')
+    ).order_by()
+    totals = {row['building']: row for row in rows}
+
+    collection_rates = []
+    for building in buildings:
+        row = totals.get(building.pk, {})
+        total_due = row.get('total_due') or 0
+        total_paid = row.get('total_paid') or 0
+        rate = (total_paid / total_due * 100) if total_due > 0 else 0
+
+        collection_rates.append({
+            'building': building.name,
+            'rate': round(float(rate), 2),
+            'total_due': float(total_due),
+            'total_paid': float(total_paid)
+        })
+    return collection_rates
+
+
+def occupancy_rates(buildings):
+    """Apartment occupancy per building from one grouped query"""
+    rows = buildings.annotate(
+        total_apartments=Count('apartments'),
+        occupied_apartments=Count('apartments', filter=Q(apartments__is_occupied=True))
+    ).values('name', 'total_apartments', 'occupied_apartments')
+
+    occupancy = []
+    for row in rows:
+        total = row['total_apartments']
+        occupied = row['occupied_apartments']
+        occupancy.append({
+            'building': row['name'],
+            'total': total,
+            'occupied': occupied,
+            'rate': round(occupied / total * 100, 2) if total > 0 else 0
+        })
+    return occupancy
+
+
+def age_group_counts(users, today):
+    """Bucket users by age with a single ``Case/When`` grouped query
+
+    A user is at most ``n`` years old when born after the day they would have
+    turned ``n + 1``, so each bucket is a plain comparison on ``date_of_birth``.
+    """
+    whens = [When(date_of_birth__isnull=True, then=Value('unknown'))]
+    for label, max_age in AGE_GROUPS:
+        whens.append(When(
+            date_of_birth__gt=today - relativedelta(years=max_age + 1),
+            then=Value(label)
+        ))
+
+    rows = users.annotate(
+        age_group=Case(*whens, default=Value('60+'), output_field=CharField())
+    ).values('age_group').annotate(count=Count('pk')).order_by()
+
+    counts = {label: 0 for label, _max_age in AGE_GROUPS}
+    counts.update({'60+': 0, 'unknown': 0})
+    counts.update({row['age_group']: row['count'] for row in rows})
+    return counts
+
+
+def monthly_counts(queryset, field, start_date, end_date):
+    """Row counts per calendar month of ``field``, with empty months as zero"""
+    rows = queryset.filter(**{
+        f'{field}__date__gte': month_start(start_date),
+        f'{field}__date__lt': month_start(end_date) + relativedelta(months=1),
+    }).annotate(
+        period=TruncMonth(field)
+    ).values('period').annotate(count=Count('pk')).order_by()
+    by_month = {month_start(row['period']): row['count'] for row in rows}
+
+    return [
+        {'month': month.strftime('%Y-%m'), 'count': by_month.get(month, 0)}
+        for month in month_range(start_date, end_date)
+    ]
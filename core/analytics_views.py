@@ -1,8 +1,12 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+from django.conf import settings
+from django.shortcuts import render, get_object_or_404
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.db.models import Count, Sum, Avg, Q, F
+from django.db.models.functions import ExtractHour, TruncDay
 from django.utils import timezone
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
@@ -10,9 +14,21 @@ import json
 
 from buildings.models import Building, Apartment
 from payments.models import Dues, ApartmentDues, Payment, Expense
-from complaints.models import Complaint, ComplaintSurvey
+from complaints.models import Complaint, ComplaintSurvey, summarize_complaints
 from users.models import User, UserActivity
-from notifications.models import Notification
+from notifications.models import Notification, get_notification_statistics
+from .analytics import (
+    month_start, monthly_financial_series, building_collection_rates,
+    occupancy_rates, age_group_counts, monthly_counts
+)
+from .exports import (
+    EXPORT_DATASETS, count_export_rows, export_rows, export_filename,
+    csv_streaming_response, xlsx_file_response, start_export_job
+)
+from .models import ExportJob
+from .reports import get_or_start_report_job
+
+REPORT_PERIODS = (1, 3, 6, 12, 24)  # months a PDF report may cover
 
 
 @login_required
@@ -38,55 +54,15 @@ def financial_analytics_api(request):
     buildings = Building.objects.filter(admin=request.user)
     period = request.GET.get('period', '12')  # months
     
-    # Date range
-    end_date = timezone.now()
-    start_date = end_date - relativedelta(months=int(period))
+    # Date range (calendar months, current month included)
+    end_date = timezone.now().date()
+    start_date = month_start(end_date) - relativedelta(months=int(period) - 1)
     
     # Monthly revenue and expenses
-    monthly_data = []
-    for i in range(int(period)):
-        month_start = end_date - relativedelta(months=i)
-        month_end = month_start + relativedelta(months=1)
-        
-        revenue = Payment.objects.filter(
-            apartment_dues__apartment__building__in=buildings,
-            payment_date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        expenses = Expense.objects.filter(
-            building__in=buildings,
-            expense_date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        monthly_data.append({
-            'month': month_start.strftime('%Y-%m'),
-            'revenue': float(revenue),
-            'expenses': float(expenses),
-            'profit': float(revenue - expenses)
-        })
+    monthly_data = monthly_financial_series(buildings, start_date, end_date)
     
     # Collection rates
-    collection_rates = []
-    for building in buildings:
-        total_due = ApartmentDues.objects.filter(
-            apartment__building=building,
-            due_date__gte=start_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        total_paid = ApartmentDues.objects.filter(
-            apartment__building=building,
-            due_date__gte=start_date,
-            status='paid'
-        ).aggregate(total=Sum('paid_amount'))['total'] or 0
-        
-        rate = (total_paid / total_due * 100) if total_due > 0 else 0
-        
-        collection_rates.append({
-            'building': building.name,
-            'rate': round(rate, 2),
-            'total_due': float(total_due),
-            'total_paid': float(total_paid)
-        })
+    collection_rates = building_collection_rates(buildings, start_date)
     
     # Expense categories
     expense_categories = Expense.objects.filter(
@@ -98,7 +74,7 @@ def financial_analytics_api(request):
     ).order_by('-total')
     
     return JsonResponse({
-        'monthly_data': list(reversed(monthly_data)),
+        'monthly_data': monthly_data,
         'collection_rates': collection_rates,
         'expense_categories': list(expense_categories),
         'period': period
@@ -114,59 +90,28 @@ def resident_analytics_api(request):
     buildings = Building.objects.filter(admin=request.user)
     
     # Occupancy rates
-    occupancy_data = []
-    for building in buildings:
-        total_apartments = building.apartments.count()
-        occupied_apartments = building.apartments.filter(is_occupied=True).count()
-        rate = (occupied_apartments / total_apartments * 100) if total_apartments > 0 else 0
-        
-        occupancy_data.append({
-            'building': building.name,
-            'total': total_apartments,
-            'occupied': occupied_apartments,
-            'rate': round(rate, 2)
-        })
+    occupancy_data = occupancy_rates(buildings)
     
     # Age distribution
     residents = User.objects.filter(
         role=User.RESIDENT,
-        apartments__building__in=buildings
-    ).distinct()
-    
-    age_groups = {'18-30': 0, '31-45': 0, '46-60': 0, '60+': 0, 'unknown': 0}
-    for resident in residents:
-        age = resident.get_age()
-        if age is None:
-            age_groups['unknown'] += 1
-        elif age <= 30:
-            age_groups['18-30'] += 1
-        elif age <= 45:
-            age_groups['31-45'] += 1
-        elif age <= 60:
-            age_groups['46-60'] += 1
-        else:
-            age_groups['60+'] += 1
-    
-    # Registration trends
-    registration_data = []
-    for i in range(12):
-        month_start = timezone.now() - relativedelta(months=i)
-        month_end = month_start + relativedelta(months=1)
-        
-        count = User.objects.filter(
-            role=User.RESIDENT,
-            date_joined__range=[month_start, month_end]
-        ).count()
-        
-        registration_data.append({
-            'month': month_start.strftime('%Y-%m'),
-            'count': count
-        })
+        pk__in=Apartment.objects.filter(building__in=buildings).values('resident')
+    )
+    today = timezone.now().date()
+    age_groups = age_group_counts(residents, today)
+    
+    # Registration trends (last 12 calendar months)
+    registration_data = monthly_counts(
+        User.objects.filter(role=User.RESIDENT),
+        'date_joined',
+        month_start(today) - relativedelta(months=11),
+        today
+    )
     
     return JsonResponse({
         'occupancy_data': occupancy_data,
         'age_groups': age_groups,
-        'registration_trends': list(reversed(registration_data))
+        'registration_trends': registration_data
     })
 
 
@@ -194,18 +139,9 @@ def complaint_analytics_api(request):
     ).values('priority').annotate(count=Count('id'))
     
     # Resolution time analysis
-    resolved_complaints = Complaint.objects.filter(
-        building__in=buildings,
-        status='resolved',
-        resolved_at__isnull=False
-    )
-    
-    resolution_times = []
-    for complaint in resolved_complaints:
-        days = (complaint.resolved_at.date() - complaint.created_at.date()).days
-        resolution_times.append(days)
-    
-    avg_resolution_time = sum(resolution_times) / len(resolution_times) if resolution_times else 0
+    avg_resolution_time = summarize_complaints(
+        Complaint.objects.filter(building__in=buildings)
+    )['avg_resolution_time']
     
     # Satisfaction scores
     satisfaction_data = ComplaintSurvey.objects.filter(
@@ -216,35 +152,24 @@ def complaint_analytics_api(request):
         avg_solution_quality=Avg('solution_quality_rating')
     )
     
-    # Monthly trends
-    monthly_trends = []
-    for i in range(12):
-        month_start = timezone.now() - relativedelta(months=i)
-        month_end = month_start + relativedelta(months=1)
-        
-        created = Complaint.objects.filter(
-            building__in=buildings,
-            created_at__range=[month_start, month_end]
-        ).count()
-        
-        resolved = Complaint.objects.filter(
-            building__in=buildings,
-            resolved_at__range=[month_start, month_end]
-        ).count()
-        
-        monthly_trends.append({
-            'month': month_start.strftime('%Y-%m'),
-            'created': created,
-            'resolved': resolved
-        })
+    # Monthly trends (last 12 calendar months)
+    complaints = Complaint.objects.filter(building__in=buildings)
+    today = timezone.now().date()
+    trend_start = month_start(today) - relativedelta(months=11)
+    created = monthly_counts(complaints, 'created_at', trend_start, today)
+    resolved = monthly_counts(complaints, 'resolved_at', trend_start, today)
+    monthly_trends = [
+        {'month': created_row['month'], 'created': created_row['count'], 'resolved': resolved_row['count']}
+        for created_row, resolved_row in zip(created, resolved)
+    ]
     
     return JsonResponse({
         'status_distribution': list(status_data),
         'category_breakdown': list(category_data),
         'priority_distribution': list(priority_data),
-        'avg_resolution_time': round(avg_resolution_time, 1),
+        'avg_resolution_time': avg_resolution_time,
         'satisfaction_scores': satisfaction_data,
-        'monthly_trends': list(reversed(monthly_trends))
+        'monthly_trends': monthly_trends
     })
 
 
@@ -254,35 +179,39 @@ def user_activity_analytics_api(request):
     if not request.user.is_admin:
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    # Login patterns
-    login_data = UserActivity.objects.filter(
-        activity_type='login',
-        timestamp__gte=timezone.now() - timedelta(days=30)
-    ).extra(
-        select={'hour': 'EXTRACT(hour FROM timestamp)'}
-    ).values('hour').annotate(count=Count('id'))
+    since = timezone.now() - timedelta(days=30)
+    recent = UserActivity.objects.filter(timestamp__gte=since)
+    logins = recent.filter(activity_type='login')
+    
+    # Login patterns (served by the activity_type + timestamp index)
+    login_data = logins.annotate(
+        hour=ExtractHour('timestamp')
+    ).values('hour').annotate(count=Count('id')).order_by('hour')
+    
+    # Daily activity
+    daily_activity = [
+        {'day': row['day'].strftime('%Y-%m-%d'), 'count': row['count']}
+        for row in recent.annotate(day=TruncDay('timestamp')).values('day').annotate(
+            count=Count('id')
+        ).order_by('day')
+    ]
     
     # Most active users
-    active_users = UserActivity.objects.filter(
-        timestamp__gte=timezone.now() - timedelta(days=30)
-    ).values('user__email', 'user__first_name', 'user__last_name').annotate(
+    active_users = recent.values('user__email', 'user__first_name', 'user__last_name').annotate(
         activity_count=Count('id')
     ).order_by('-activity_count')[:10]
     
     # Activity types
-    activity_types = UserActivity.objects.filter(
-        timestamp__gte=timezone.now() - timedelta(days=30)
-    ).values('activity_type').annotate(count=Count('id'))
+    activity_types = recent.values('activity_type').annotate(count=Count('id')).order_by('-count')
     
-    # Device/browser analytics (if user_agent is captured)
-    device_data = UserActivity.objects.filter(
-        activity_type='login',
-        timestamp__gte=timezone.now() - timedelta(days=30),
-        user_agent__isnull=False
-    ).values('user_agent').annotate(count=Count('id'))
+    # Device/browser analytics from the columns parsed at write time
+    device_data = logins.exclude(device_family='').values(
+        'device_family', 'browser_family'
+    ).annotate(count=Count('id')).order_by('-count')
     
     return JsonResponse({
         'login_patterns': list(login_data),
+        'daily_activity': daily_activity,
         'active_users': list(active_users),
         'activity_types': list(activity_types),
         'device_data': list(device_data)
@@ -295,100 +224,131 @@ def notification_analytics_api(request):
     if not request.user.is_admin:
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    # Notification engagement
-    total_notifications = Notification.objects.count()
-    read_notifications = Notification.objects.filter(is_read=True).count()
-    engagement_rate = (read_notifications / total_notifications * 100) if total_notifications > 0 else 0
-    
-    # Channel performance
-    email_sent = Notification.objects.filter(is_email_sent=True).count()
-    sms_sent = Notification.objects.filter(is_sms_sent=True).count()
-    
-    # Type distribution
-    type_distribution = Notification.objects.values('notification_type').annotate(
-        count=Count('id')
-    )
-    
-    # Response times (time to read)
-    response_times = []
-    read_notifications_with_time = Notification.objects.filter(
-        is_read=True,
-        read_at__isnull=False
+    buildings = Building.objects.filter(admin=request.user)
+    if request.GET.get('building'):
+        buildings = buildings.filter(pk=request.GET['building'])
+    
+    # Notifications tied to the admin's buildings, either through the apartment
+    # or through a resident of one of them
+    notifications = Notification.objects.filter(
+        Q(apartment__building__in=buildings) |
+        Q(user__in=User.objects.filter(apartments__building__in=buildings))
     )
     
-    for notification in read_notifications_with_time:
-        time_diff = (notification.read_at - notification.created_at).total_seconds() / 3600  # hours
-        response_times.append(time_diff)
+    stats = get_notification_statistics(notifications)
     
-    avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+    # Type distribution
+    stats['type_distribution'] = [
+        {'notification_type': row['notification_type'], 'count': row['count']}
+        for row in stats['type_engagement']
+    ]
     
-    return JsonResponse({
-        'engagement_rate': round(engagement_rate, 2),
-        'total_notifications': total_notifications,
-        'read_notifications': read_notifications,
-        'email_sent': email_sent,
-        'sms_sent': sms_sent,
-        'type_distribution': list(type_distribution),
-        'avg_response_time': round(avg_response_time, 2)
-    })
+    return JsonResponse(stats)
 
 
 @login_required
 def export_analytics_data(request):
-    """Export analytics data to CSV"""
+    """Export analytics data to CSV or XLSX
+    
+    Small exports are streamed straight to the client. Large ones, or any
+    request with ``mode=async``, become an ExportJob written in the background.
+    """
     if not request.user.is_admin:
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    import csv
-    from django.http import HttpResponse
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="analytics_report.csv"'
-    
-    writer = csv.writer(response)
-    
     # Get data type from request
     data_type = request.GET.get('type', 'financial')
+    file_format = request.GET.get('format', ExportJob.CSV)
+    if data_type not in EXPORT_DATASETS:
+        return JsonResponse({'error': 'Unknown export type'}, status=400)
+    if file_format not in dict(ExportJob.FORMAT_CHOICES):
+        return JsonResponse({'error': 'Unknown export format'}, status=400)
+    
+    buildings = Building.objects.filter(admin=request.user)
+    if request.GET.get('building'):
+        buildings = buildings.filter(pk=request.GET['building'])
+    start_date = parse_date(request.GET.get('start_date') or '')
+    end_date = parse_date(request.GET.get('end_date') or '')
+    
+    run_async = request.GET.get('mode') == 'async' or count_export_rows(
+        data_type, buildings, start_date, end_date
+    ) > settings.EXPORT_ASYNC_ROW_THRESHOLD
+    
+    if run_async:
+        job = start_export_job(
+            request.user, data_type, file_format,
+            buildings.values_list('pk', flat=True), start_date, end_date
+        )
+        return JsonResponse({
+            'job_id': job.pk,
+            'status': job.status,
+            'status_url': reverse('export_job_status', args=[job.pk])
+        }, status=202)
+    
+    rows = export_rows(data_type, buildings, start_date, end_date)
+    filename = export_filename(data_type, file_format)
+    if file_format == ExportJob.XLSX:
+        return xlsx_file_response(rows, filename)
+    return csv_streaming_response(rows, filename)
+
+
+@login_required
+def export_job_status(request, pk):
+    """Status of a background export job"""
+    job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user)
     
-    if data_type == 'financial':
-        writer.writerow(['Month', 'Revenue', 'Expenses', 'Profit'])
-        # Add financial data rows
-        
-    elif data_type == 'complaints':
-        writer.writerow(['Date', 'Title', 'Category', 'Status', 'Priority', 'Resolution Days'])
-        # Add complaint data rows
-        
-    elif data_type == 'residents':
-        writer.writerow(['Name', 'Email', 'Apartment', 'Join Date', 'Last Login'])
-        # Add resident data rows
-    
-    return response
+    return JsonResponse({
+        'job_id': job.pk,
+        'dataset': job.dataset,
+        'format': job.file_format,
+        'status': job.status,
+        'row_count': job.row_count,
+        'error': job.error,
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == ExportJob.COMPLETED else None
+    })
+
+
+@login_required
+def export_job_download(request, pk):
+    """Download the file of a finished export job"""
+    job = get_object_or_404(ExportJob, pk=pk, requested_by=request.user, status=ExportJob.COMPLETED)
+    try:
+        handle = job.file.open('rb')
+    except (FileNotFoundError, ValueError):
+        # The file is gone from storage; failing the job lets the next request build a new one
+        job.mark_failed('Dosya bulunamadı')
+        raise Http404('Export file not found')
+    return FileResponse(handle, as_attachment=True, filename=job.filename)
 
 
 @login_required
 def generate_analytics_report(request):
-    """Generate comprehensive analytics report"""
+    """Queue a PDF analytics report, or return the cached one for the same data
+    
+    Rendering happens in a Celery worker; clients poll ``status_url`` and
+    download the file once the job is completed.
+    """
     if not request.user.is_admin:
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    # Generate PDF report
-    from django.template.loader import get_template
-    from django.http import HttpResponse
-    from weasyprint import HTML, CSS
+    buildings = Building.objects.filter(admin=request.user).order_by('name')
+    if request.GET.get('building'):
+        buildings = buildings.filter(pk=request.GET['building'])
     
-    template = get_template('analytics/report_template.html')
-    context = {
-        'user': request.user,
-        'buildings': Building.objects.filter(admin=request.user),
-        'report_date': timezone.now(),
-        # Add all analytics data
-    }
+    # Calendar months, current month included
+    period = request.GET.get('period', '12')
+    if not period.isdigit() or int(period) not in REPORT_PERIODS:
+        return JsonResponse({'error': 'Invalid period'}, status=400)
+    period = int(period)
+    end_date = timezone.now().date()
+    start_date = month_start(end_date) - relativedelta(months=period - 1)
     
-    html_string = template.render(context)
-    html = HTML(string=html_string)
+    job = get_or_start_report_job(request.user, buildings, start_date, end_date)
+    completed = job.status == ExportJob.COMPLETED
     
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="analytics_report.pdf"'
-    
-    html.write_pdf(response)
-    return response
+    return JsonResponse({
+        'job_id': job.pk,
+        'status': job.status,
+        'status_url': reverse('export_job_status', args=[job.pk]),
+        'download_url': reverse('export_job_download', args=[job.pk]) if completed else None
+    }, status=200 if completed else 202)
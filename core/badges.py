@@ -0,0 +1,117 @@
+"""
+Sidebar badge counters.
+
+Counts are computed with one conditional aggregation per model and cached per
+user. Each cached entry carries an ETag so polling clients can revalidate
+with If-None-Match and get a 304 without touching the database.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+BADGES_CACHE_TTL = 60
+BADGES_GENERATION_KEY = 'badges:generation'
+
+
+def _generation():
+    """Global cache generation, bumped when building-wide counters change"""
+    generation = cache.get(BADGES_GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(BADGES_GENERATION_KEY, generation, None)
+    return generation
+
+
+def badges_cache_key(user_id, generation=None):
+    if generation is None:
+        generation = _generation()
+    return f'badges:{generation}:{user_id}'
+
+
+def invalidate_badges(*user_ids):
+    """Drop the cached badges of the given users"""
+    generation = _generation()
+    cache.delete_many([badges_cache_key(user_id, generation) for user_id in user_ids if user_id])
+
+
+def invalidate_all_badges():
+    """Invalidate every user's cached badges at once"""
+    try:
+        cache.incr(BADGES_GENERATION_KEY)
+    except ValueError:
+        cache.add(BADGES_GENERATION_KEY, 2, None)
+
+
+def compute_badges(user):
+    """Count sidebar badges for a user, one aggregate query per model"""
+    from announcements.models import Announcement
+    from complaints.models import Complaint
+    from notifications.models import get_unread_count
+    from payments.models import ApartmentDues
+
+    data = {
+        'pending_complaints': 0,
+        'unread_notifications': 0,
+        'pending_payments': 0,
+        'new_announcements': 0,
+        'pending_packages': 0,
+        'active_tasks': 0,
+    }
+
+    data['unread_notifications'] = get_unread_count(user)
+
+    # Complaints are scoped to the buildings the user works with
+    if user.is_admin:
+        complaints = Complaint.objects.filter(building__admin=user)
+    elif user.is_caretaker:
+        complaints = Complaint.objects.filter(building__caretaker=user)
+    else:
+        complaints = Complaint.objects.filter(created_by=user)
+    data['pending_complaints'] = complaints.aggregate(
+        pending=Count('id', filter=Q(status__in=[Complaint.NEW, Complaint.IN_PROGRESS]))
+    )['pending']
+
+    # New announcements (last 7 days)
+    week_ago = timezone.now() - timedelta(days=7)
+    data['new_announcements'] = Announcement.objects.filter(
+        building__in=user.get_buildings()
+    ).aggregate(
+        new=Count('id', filter=Q(created_at__gte=week_ago, status='published'))
+    )['new']
+
+    if user.is_caretaker:
+        from caretaker.models import Task
+        from packages.models import Package
+
+        data['pending_packages'] = Package.objects.filter(building__caretaker=user).aggregate(
+            pending=Count('id', filter=Q(status=Package.PENDING))
+        )['pending']
+        data['active_tasks'] = Task.objects.filter(assigned_to=user).aggregate(
+            active=Count('id', filter=Q(status__in=[Task.PENDING, Task.IN_PROGRESS]))
+        )['active']
+
+    if user.is_resident:
+        data['pending_payments'] = ApartmentDues.objects.filter(apartment__resident=user).aggregate(
+            pending=Count('id', filter=Q(status__in=[
+                ApartmentDues.UNPAID, ApartmentDues.PARTIAL, ApartmentDues.OVERDUE
+            ]))
+        )['pending']
+
+    return data
+
+
+def get_badges(user):
+    """Return ``(data, etag)`` for a user, served from cache when possible"""
+    key = badges_cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    data = compute_badges(user)
+    etag = '"%s"' % hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    cache.set(key, (data, etag), BADGES_CACHE_TTL)
+    return data, etag
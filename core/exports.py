@@ -0,0 +1,309 @@
+"""
+Streaming CSV/XLSX exports.
+
+Each dataset is a ``values_list`` projection read with ``.iterator()``, so rows
+are fetched in chunks of ``EXPORT_CHUNK_SIZE`` and written out one at a time.
+Memory stays flat whatever the period or number of buildings; exports that
+are too large for a request are handed to ``core.tasks.run_export_job``.
+"""
+import csv
+import io
+import tempfile
+from itertools import chain
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from announcements.models import Announcement
+from complaints.models import Complaint
+from payments.models import ApartmentDues, Expense, MonthlyFinancialSummary, Payment
+from users.models import User
+
+from .analytics import period_filter
+from .models import ExportJob
+
+
+class Echo:
+    """File-like object that hands written data straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _date_range(queryset, field, start_date, end_date):
+    if start_date:
+        queryset = queryset.filter(**{f'{field}__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{field}__lte': end_date})
+    return queryset
+
+
+def _scope(queryset, lookup, buildings):
+    if buildings is None:
+        return queryset
+    return queryset.filter(**{f'{lookup}__in': buildings})
+
+
+def _full_name(first_name, last_name):
+    return f'{first_name or ""} {last_name or ""}'.strip()
+
+
+def _format_datetime(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def _apartment_label(block, number):
+    return f'{block}-{number}' if block else number
+
+
+def _financial_export(buildings, start_date, end_date):
+    headers = ['Month', 'Revenue', 'Expenses', 'Profit']
+    queryset = _scope(
+        MonthlyFinancialSummary.objects.filter(period_filter(start_date, end_date)),
+        'building', buildings
+    ).values('year', 'month').annotate(
+        revenue=Sum('payments_collected'),
+        expenses=Sum('expenses_total')
+    ).order_by('year', 'month').values_list('year', 'month', 'revenue', 'expenses')
+
+    def row(values):
+        year, month, revenue, expenses = values
+        return [f'{year}-{month:02d}', revenue, expenses, revenue - expenses]
+    return headers, queryset, row
+
+
+def _payments_export(buildings, start_date, end_date):
+    headers = ['Date', 'Building', 'Apartment', 'Period', 'Amount', 'Method', 'Transaction ID']
+    methods = dict(Payment.PAYMENT_METHOD_CHOICES)
+    queryset = _date_range(
+        _scope(Payment.objects.all(), 'apartment_dues__apartment__building', buildings),
+        'payment_date', start_date, end_date
+    ).order_by('payment_date', 'pk').values_list(
+        'payment_date', 'apartment_dues__apartment__building__name',
+        'apartment_dues__apartment__block', 'apartment_dues__apartment__number',
+        'apartment_dues__dues__year', 'apartment_dues__dues__month',
+        'amount', 'payment_method', 'transaction_id'
+    )
+
+    def row(values):
+        payment_date, building, block, number, year, month, amount, method, transaction_id = values
+        return [
+            payment_date, building, _apartment_label(block, number), f'{year}-{month:02d}',
+            amount, str(methods.get(method, method)), transaction_id or ''
+        ]
+    return headers, queryset, row
+
+
+def _expenses_export(buildings, start_date, end_date):
+    headers = ['Date', 'Building', 'Title', 'Category', 'Amount', 'Invoice Number']
+    categories = dict(Expense.CATEGORY_CHOICES)
+    queryset = _date_range(
+        _scope(Expense.objects.all(), 'building', buildings),
+        'expense_date', start_date, end_date
+    ).order_by('expense_date', 'pk').values_list(
+        'expense_date', 'building__name', 'title', 'category', 'amount', 'invoice_number'
+    )
+
+    def row(values):
+        expense_date, building, title, category, amount, invoice_number = values
+        return [expense_date, building, title, str(categories.get(category, category)), amount, invoice_number or '']
+    return headers, queryset, row
+
+
+def _dues_export(buildings, start_date, end_date):
+    headers = ['Period', 'Building', 'Apartment', 'Due Date', 'Amount', 'Paid', 'Late Fee', 'Status']
+    statuses = dict(ApartmentDues.STATUS_CHOICES)
+    queryset = _date_range(
+        _scope(ApartmentDues.objects.all(), 'apartment__building', buildings),
+        'due_date', start_date, end_date
+    ).order_by('due_date', 'pk').values_list(
+        'dues__year', 'dues__month', 'apartment__building__name', 'apartment__block',
+        'apartment__number', 'due_date', 'amount', 'paid_amount', 'late_fee', 'status'
+    )
+
+    def row(values):
+        year, month, building, block, number, due_date, amount, paid, late_fee, status = values
+        return [
+            f'{year}-{month:02d}', building, _apartment_label(block, number), due_date,
+            amount, paid, late_fee, str(statuses.get(status, status))
+        ]
+    return headers, queryset, row
+
+
+def _complaints_export(buildings, start_date, end_date):
+    headers = ['Date', 'Building', 'Title', 'Category', 'Status', 'Priority', 'Resolution Days']
+    categories = dict(Complaint.CATEGORY_CHOICES)
+    statuses = dict(Complaint.STATUS_CHOICES)
+    priorities = dict(Complaint.PRIORITY_CHOICES)
+    queryset = _date_range(
+        _scope(Complaint.objects.all(), 'building', buildings),
+        'created_at__date', start_date, end_date
+    ).order_by('created_at', 'pk').values_list(
+        'created_at', 'building__name', 'title', 'category', 'status', 'priority', 'resolved_at'
+    )
+
+    def row(values):
+        created_at, building, title, category, status, priority, resolved_at = values
+        return [
+            _format_datetime(created_at), building, title, str(categories.get(category, category)),
+            str(statuses.get(status, status)), str(priorities.get(priority, priority)),
+            (resolved_at - created_at).days if resolved_at else ''
+        ]
+    return headers, queryset, row
+
+
+def _residents_export(buildings, start_date, end_date):
+    headers = ['Name', 'Email', 'Building', 'Apartment', 'Join Date', 'Last Login']
+    residents = User.objects.filter(role=User.RESIDENT)
+    # Keep the apartment condition in one filter() so it shares the join with the projection
+    if buildings is None:
+        residents = residents.filter(apartments__isnull=False)
+    else:
+        residents = residents.filter(apartments__building__in=buildings)
+    queryset = _date_range(
+        residents, 'date_joined__date', start_date, end_date
+    ).order_by('pk', 'apartments__pk').values_list(
+        'first_name', 'last_name', 'email', 'apartments__building__name',
+        'apartments__block', 'apartments__number', 'date_joined', 'last_login'
+    )
+
+    def row(values):
+        first_name, last_name, email, building, block, number, date_joined, last_login = values
+        return [
+            _full_name(first_name, last_name), email, building, _apartment_label(block, number),
+            _format_datetime(date_joined), _format_datetime(last_login)
+        ]
+    return headers, queryset, row
+
+
+def _announcements_export(buildings, start_date, end_date):
+    headers = [
+        'ID', 'Başlık', 'Bina', 'Kategori', 'Öncelik', 'Durum',
+        'Görüntülenme', 'Okunma', 'Oluşturan', 'Oluşturulma Tarihi'
+    ]
+    priorities = dict(Announcement.PRIORITY_CHOICES)
+    statuses = dict(Announcement.STATUS_CHOICES)
+    queryset = _date_range(
+        _scope(Announcement.objects.all(), 'building', buildings),
+        'created_at__date', start_date, end_date
+    ).order_by('pk').values_list(
+        'id', 'title', 'building__name', 'category__name', 'priority', 'status',
+        'view_count', 'read_count', 'created_by__first_name', 'created_by__last_name', 'created_at'
+    )
+
+    def row(values):
+        (pk, title, building, category, priority, status, view_count, read_count,
+         first_name, last_name, created_at) = values
+        return [
+            pk, title, building, category or '', str(priorities.get(priority, priority)),
+            str(statuses.get(status, status)), view_count, read_count,
+            _full_name(first_name, last_name), timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S')
+        ]
+    return headers, queryset, row
+
+
+EXPORT_DATASETS = {
+    'financial': _financial_export,
+    'payments': _payments_export,
+    'expenses': _expenses_export,
+    'dues': _dues_export,
+    'complaints': _complaints_export,
+    'residents': _residents_export,
+    'announcements': _announcements_export,
+}
+
+
+def count_export_rows(dataset, buildings=None, start_date=None, end_date=None):
+    """Number of data rows an export would produce"""
+    _headers, queryset, _row = EXPORT_DATASETS[dataset](buildings, start_date, end_date)
+    return queryset.count()
+
+
+def export_rows(dataset, buildings=None, start_date=None, end_date=None):
+    """Yield the header and then every row of a dataset, reading in chunks
+
+    ``buildings`` limits the export to those buildings; ``None`` exports all.
+    """
+    headers, queryset, row = EXPORT_DATASETS[dataset](buildings, start_date, end_date)
+    yield headers
+    for values in queryset.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE):
+        yield row(values)
+
+
+def export_filename(dataset, file_format):
+    return f'{dataset}_{timezone.now():%Y%m%d_%H%M%S}.{file_format}'
+
+
+def csv_streaming_response(rows, filename):
+    """Stream rows as a CSV download without building it in memory"""
+    writer = csv.writer(Echo())
+    # The BOM lets Excel detect UTF-8 for Turkish characters
+    content = chain(['\ufeff'], (writer.writerow(row) for row in rows))
+    response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def write_export(rows, fileobj, file_format):
+    """Write rows to an open binary file, returning the number of data rows"""
+    count = -1  # the header row is not counted
+    if file_format == ExportJob.XLSX:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in rows:
+            sheet.append(row)
+            count += 1
+        workbook.save(fileobj)
+    else:
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        writer = csv.writer(text)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        text.flush()
+        text.detach()
+    return max(count, 0)
+
+
+def xlsx_file_response(rows, filename):
+    """Write an XLSX export to a temporary file and send it as a download"""
+    tmp = tempfile.TemporaryFile()
+    write_export(rows, tmp, ExportJob.XLSX)
+    tmp.seek(0)
+    return FileResponse(
+        tmp, as_attachment=True, filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+
+def start_export_job(user, dataset, file_format, building_ids, start_date=None, end_date=None):
+    """Queue an export to be written in the background and return the job"""
+    from .tasks import run_export_job
+
+    job = ExportJob.objects.create(
+        requested_by=user,
+        dataset=dataset,
+        file_format=file_format,
+        parameters={
+            'building_ids': list(building_ids),
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+        }
+    )
+    transaction.on_commit(lambda: run_export_job.delay(job.pk))
+    return job
+
+
+def save_export_file(job, rows):
+    """Write an export job's rows to a temporary file and store it on the job"""
+    with tempfile.TemporaryFile() as tmp:
+        row_count = write_export(rows, tmp, job.file_format)
+        tmp.seek(0)
+        job.file.save(export_filename(job.dataset, job.file_format), File(tmp), save=False)
+    return row_count
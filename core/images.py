@@ -0,0 +1,148 @@
+"""
+Resized variants of uploaded images.
+
+Each entry in ``IMAGE_PIPELINES`` names an image field and the variants to
+build for it. When a saved instance carries a new file, ``core.tasks.
+process_image_variants`` is queued after commit and writes a WebP and a JPEG
+copy of every variant next to the original, so requests never decode or
+resize full-size uploads. Templates pick a variant with the ``image_variant``
+filter from ``image_tags`` and fall back to the original until it exists.
+Whether an original's variants exist is kept in the cache, set by the task,
+so rendering a URL does not touch storage.
+"""
+import hashlib
+import io
+import os
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from PIL import Image, ImageOps
+
+DOCUMENT_VARIANTS = {'preview': 1280, 'thumbnail': 240}
+
+# (model label, field name) -> {variant: longest side in pixels}
+IMAGE_PIPELINES = {
+    ('users.User', 'profile_picture'): {'avatar': 300, 'thumbnail': 96},
+    ('payments.Payment', 'receipt_image'): DOCUMENT_VARIANTS,
+    ('payments.Expense', 'invoice_image'): DOCUMENT_VARIANTS,
+    ('packages.Package', 'image'): DOCUMENT_VARIANTS,
+}
+
+WEBP = 'webp'
+JPEG = 'jpeg'
+FORMATS = {WEBP: ('WEBP', 'webp'), JPEG: ('JPEG', 'jpg')}
+QUALITY = 82
+MISSING_VARIANTS_TIMEOUT = 300  # seconds before a missing variant is looked up in storage again
+
+
+def variant_name(name, variant, file_format=WEBP):
+    """Storage name of a variant, stored next to the original file"""
+    root, _ext = os.path.splitext(name)
+    return f'{root}__{variant}.{FORMATS[file_format][1]}'
+
+
+def _variants_cache_key(name):
+    return f'image_variants:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def mark_variants(name, built):
+    """Record whether the variants of an original file exist"""
+    cache.set(_variants_cache_key(name), built, None if built else MISSING_VARIANTS_TIMEOUT)
+
+
+def variant_url(fieldfile, variant, file_format=WEBP):
+    """URL of a variant once it has been built, otherwise of the original"""
+    if not fieldfile:
+        return ''
+    name = variant_name(fieldfile.name, variant, file_format)
+    built = cache.get(_variants_cache_key(fieldfile.name))
+    if built is None:
+        # Files uploaded before the cache knew about them are checked once
+        built = fieldfile.storage.exists(name)
+        mark_variants(fieldfile.name, built)
+    if built:
+        return fieldfile.storage.url(name)
+    return fieldfile.url
+
+
+def _encode(image, file_format):
+    buffer = io.BytesIO()
+    pil_format = FORMATS[file_format][0]
+    image.save(buffer, pil_format, quality=QUALITY, optimize=file_format == JPEG)
+    return ContentFile(buffer.getvalue())
+
+
+def build_variants(fieldfile, variants):
+    """Write every variant of an image in WebP and JPEG, returning the stored names"""
+    storage = fieldfile.storage
+    largest = max(variants.values())
+    with fieldfile.open('rb') as source:
+        image = Image.open(source)
+        # Lets the JPEG decoder scale down by 1/2, 1/4 or 1/8 while reading
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    names = []
+    for variant, size in sorted(variants.items(), key=lambda item: -item[1]):
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for file_format in FORMATS:
+            name = variant_name(fieldfile.name, variant, file_format)
+            if storage.exists(name):
+                storage.delete(name)
+            names.append(storage.save(name, _encode(resized, file_format)))
+    mark_variants(fieldfile.name, True)
+    return names
+
+
+def delete_variants(storage, name, variants):
+    """Remove the variants built for a previous file"""
+    cache.delete(_variants_cache_key(name))
+    for variant in variants:
+        for file_format in FORMATS:
+            variant_file = variant_name(name, variant, file_format)
+            if storage.exists(variant_file):
+                storage.delete(variant_file)
+
+
+def _file_name(instance, field_name):
+    """Name of the file currently set on a field, or None when the field is deferred"""
+    if field_name not in instance.__dict__:
+        return None
+    value = instance.__dict__[field_name]
+    return getattr(value, 'name', value) or ''
+
+
+def _remember_file(sender, instance, **kwargs):
+    for field_name in sender._image_pipeline_fields:
+        instance.__dict__[f'_original_{field_name}'] = _file_name(instance, field_name)
+
+
+def _queue_changed_images(sender, instance, raw=False, **kwargs):
+    from .tasks import process_image_variants
+
+    if raw:
+        return
+    for field_name in sender._image_pipeline_fields:
+        name = _file_name(instance, field_name)
+        previous = instance.__dict__.get(f'_original_{field_name}')
+        if name is None or name == previous:
+            continue
+        instance.__dict__[f'_original_{field_name}'] = name
+        transaction.on_commit(lambda field_name=field_name, name=name, previous=previous: (
+            process_image_variants.delay(sender._meta.label, instance.pk, field_name, name, previous)
+        ))
+
+
+def connect_image_pipelines():
+    """Queue variant builds whenever a pipeline field gets a new file"""
+    fields = {}
+    for label, field_name in IMAGE_PIPELINES:
+        fields.setdefault(apps.get_model(label), []).append(field_name)
+    for model, field_names in fields.items():
+        model._image_pipeline_fields = field_names
+        post_init.connect(_remember_file, sender=model, dispatch_uid=f'image_pipeline_init_{model._meta.label}')
+        post_save.connect(_queue_changed_images, sender=model, dispatch_uid=f'image_pipeline_save_{model._meta.label}')
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(max_length=50, verbose_name='veri seti')),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')], default='csv', max_length=10, verbose_name='dosya biçimi')),
+                ('parameters', models.JSONField(blank=True, default=dict, verbose_name='parametreler')),
+                ('status', models.CharField(choices=[('pending', 'Bekliyor'), ('running', 'Hazırlanıyor'), ('completed', 'Tamamlandı'), ('failed', 'Başarısız')], default='pending', max_length=20, verbose_name='durum')),
+                ('file', models.FileField(blank=True, null=True, upload_to='exports/', verbose_name='dosya')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='satır sayısı')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='hata')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='oluşturulma tarihi')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='tamamlanma tarihi')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dışa Aktarma',
+                'verbose_name_plural': 'Dışa Aktarmalar',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
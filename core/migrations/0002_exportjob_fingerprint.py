@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Aynı girdilerle üretilmiş raporları yeniden kullanmak için', max_length=64, verbose_name='parmak izi'),
+        ),
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file_format',
+            field=models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)'), ('pdf', 'PDF')], default='csv', max_length=10, verbose_name='dosya biçimi'),
+        ),
+    ]
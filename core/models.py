@@ -1,3 +1,71 @@
+import os
+
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
+from users.models import User
+
+
+class ExportJob(models.Model):
+    """Background export that is written to a file and downloaded later"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, _('Bekliyor')),
+        (RUNNING, _('Hazırlanıyor')),
+        (COMPLETED, _('Tamamlandı')),
+        (FAILED, _('Başarısız')),
+    )
+
+    CSV = 'csv'
+    XLSX = 'xlsx'
+    PDF = 'pdf'
+
+    FORMAT_CHOICES = (
+        (CSV, 'CSV'),
+        (XLSX, 'Excel (XLSX)'),
+        (PDF, 'PDF'),
+    )
+
+    requested_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    dataset = models.CharField(_('veri seti'), max_length=50)
+    file_format = models.CharField(_('dosya biçimi'), max_length=10, choices=FORMAT_CHOICES, default=CSV)
+    parameters = models.JSONField(_('parametreler'), default=dict, blank=True)
+    fingerprint = models.CharField(_('parmak izi'), max_length=64, blank=True, db_index=True,
+                                   help_text=_('Aynı girdilerle üretilmiş raporları yeniden kullanmak için'))
+    status = models.CharField(_('durum'), max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(_('dosya'), upload_to='exports/', blank=True, null=True)
+    row_count = models.PositiveIntegerField(_('satır sayısı'), default=0)
+    error = models.TextField(_('hata'), blank=True, null=True)
+    created_at = models.DateTimeField(_('oluşturulma tarihi'), auto_now_add=True)
+    completed_at = models.DateTimeField(_('tamamlanma tarihi'), null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.dataset} ({self.get_file_format_display()}) - {self.requested_by.email}"
+
+    @property
+    def filename(self):
+        return os.path.basename(self.file.name) if self.file else ''
+
+    def has_file(self):
+        return bool(self.file) and self.file.storage.exists(self.file.name)
+
+    def mark_completed(self, row_count=0):
+        self.status = self.COMPLETED
+        self.row_count = row_count
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'row_count', 'file', 'completed_at'])
+
+    def mark_failed(self, error):
+        self.status = self.FAILED
+        self.error = error
+        self.completed_at = timezone.now()
+        self.save(update_fields=['status', 'error', 'completed_at'])
 
-# Create your models here.
+    class Meta:
+        verbose_name = _('Dışa Aktarma')
+        verbose_name_plural = _('Dışa Aktarmalar')
+        ordering = ['-created_at']
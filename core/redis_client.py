@@ -0,0 +1,20 @@
+"""
+Shared raw Redis client for features the Django cache API does not cover
+(pub/sub, lists). Uses settings.REDIS_URL, the same server as the cache.
+"""
+from functools import lru_cache
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Process-wide Redis client (connection pooled by redis-py)"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def get_async_redis():
+    """New asyncio Redis client; clients are bound to an event loop, so callers close their own"""
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -0,0 +1,143 @@
+"""
+PDF analytics reports rendered in a Celery worker.
+
+A report is identified by a fingerprint of the admin, the buildings, the
+period and a data version derived from the source tables. Requests with the
+same fingerprint reuse the stored PDF instead of rendering it again. Jobs
+still pending or running after ``REPORT_JOB_TIMEOUT`` seconds are marked
+failed and replaced.
+"""
+import hashlib
+import json
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from buildings.models import Apartment
+from complaints.models import Complaint, summarize_complaints, get_complaint_statistics_by_building
+from payments.models import Expense, MonthlyFinancialSummary
+
+from .analytics import (
+    period_filter, summary_totals, monthly_financial_series, building_collection_rates, occupancy_rates
+)
+from .models import ExportJob
+
+REPORT_DATASET = 'analytics_report'
+REPORT_TEMPLATE = 'analytics/report_template.html'
+
+
+def report_data_version(buildings, start_date, end_date):
+    """Fingerprint of the data a report is built from
+
+    Uses the latest change time and row count of each source, so any edit,
+    insert or delete produces a new version.
+    """
+    summaries = MonthlyFinancialSummary.objects.filter(
+        period_filter(start_date, end_date),
+        building__in=buildings
+    ).aggregate(changed=Max('updated_at'), rows=Count('id'))
+    complaints = Complaint.objects.filter(building__in=buildings).aggregate(
+        changed=Max('updated_at'), rows=Count('id')
+    )
+    apartments = Apartment.objects.filter(building__in=buildings).aggregate(
+        rows=Count('id'), occupied=Count('id', filter=Q(is_occupied=True))
+    )
+    return json.dumps([summaries, complaints, apartments], sort_keys=True, default=str)
+
+
+def report_fingerprint(user, buildings, start_date, end_date):
+    key = json.dumps({
+        'user': user.pk,
+        'buildings': sorted(building.pk for building in buildings),
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'version': report_data_version(buildings, start_date, end_date),
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_or_start_report_job(user, buildings, start_date, end_date):
+    """Reuse a finished or in-flight report with the same fingerprint, or queue a new one"""
+    from .tasks import run_report_job
+
+    fingerprint = report_fingerprint(user, buildings, start_date, end_date)
+    jobs = ExportJob.objects.filter(requested_by=user, fingerprint=fingerprint)
+    # A job that never finished within the timeout lost its worker; fail it so a new one is queued
+    jobs.filter(
+        status__in=[ExportJob.PENDING, ExportJob.RUNNING],
+        created_at__lt=timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    ).update(status=ExportJob.FAILED, error='Rapor zaman aşımına uğradı', completed_at=timezone.now())
+    existing = jobs.filter(
+        status__in=[ExportJob.PENDING, ExportJob.RUNNING, ExportJob.COMPLETED]
+    ).order_by('-created_at').first()
+    if existing and (existing.status != ExportJob.COMPLETED or existing.has_file()):
+        return existing
+
+    job = ExportJob.objects.create(
+        requested_by=user,
+        dataset=REPORT_DATASET,
+        file_format=ExportJob.PDF,
+        fingerprint=fingerprint,
+        parameters={
+            'building_ids': sorted(building.pk for building in buildings),
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        }
+    )
+    transaction.on_commit(lambda: run_report_job.delay(job.pk))
+    return job
+
+
+def gather_report_data(buildings, start_date, end_date):
+    """Aggregates shown in the analytics report"""
+    period_start = timezone.make_aware(datetime.combine(start_date, time.min))
+    period_end = timezone.make_aware(datetime.combine(end_date, time.max))
+    complaints = Complaint.objects.filter(
+        building__in=buildings,
+        created_at__range=(period_start, period_end)
+    )
+    complaint_by_building = get_complaint_statistics_by_building(buildings, period_start, period_end)
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'financial_totals': summary_totals(buildings, start_date, end_date),
+        'monthly_data': monthly_financial_series(buildings, start_date, end_date),
+        'collection_rates': building_collection_rates(buildings, start_date),
+        'expense_categories': list(Expense.objects.filter(
+            building__in=buildings,
+            expense_date__gte=start_date,
+            expense_date__lte=end_date
+        ).values('category').annotate(total=Sum('amount'), count=Count('id')).order_by('-total')),
+        'occupancy_data': occupancy_rates(buildings),
+        'complaint_stats': summarize_complaints(complaints),
+        'complaint_buildings': [
+            {'building': building.name, **complaint_by_building[building.pk]}
+            for building in buildings
+        ],
+    }
+
+
+def render_report_pdf(job, user, buildings, start_date, end_date):
+    """Render the report to PDF and store it on the job"""
+    from weasyprint import HTML
+
+    context = gather_report_data(buildings, start_date, end_date)
+    context.update({
+        'user': user,
+        'buildings': buildings,
+        'report_date': timezone.now(),
+    })
+    html_string = render_to_string(REPORT_TEMPLATE, context)
+
+    with tempfile.TemporaryFile() as tmp:
+        HTML(string=html_string).write_pdf(tmp)
+        tmp.seek(0)
+        filename = f'analytics_report_{start_date:%Y%m}_{end_date:%Y%m}_{job.fingerprint[:12]}.pdf'
+        job.file.save(filename, File(tmp), save=False)
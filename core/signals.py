@@ -0,0 +1,49 @@
+"""
+Cache invalidation for the sidebar badges.
+
+Connected in CoreConfig.ready() so any save or delete of a counted model
+drops the cached badges of the users whose counters it affects.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from announcements.models import Announcement
+from caretaker.models import Task
+from complaints.models import Complaint
+from notifications.models import Notification
+from packages.models import Package
+from payments.models import ApartmentDues
+
+from .badges import invalidate_badges, invalidate_all_badges
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    invalidate_badges(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Complaint)
+def complaint_changed(sender, instance, **kwargs):
+    building = instance.building
+    invalidate_badges(instance.created_by_id, building.admin_id, building.caretaker_id)
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    # Every resident of the building sees the announcement counter
+    invalidate_all_badges()
+
+
+@receiver([post_save, post_delete], sender=Package)
+def package_changed(sender, instance, **kwargs):
+    invalidate_badges(instance.building.caretaker_id)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    invalidate_badges(instance.assigned_to_id)
+
+
+@receiver([post_save, post_delete], sender=ApartmentDues)
+def apartment_dues_changed(sender, instance, **kwargs):
+    invalidate_badges(instance.apartment.resident_id)
@@ -0,0 +1,109 @@
+from datetime import date
+
+from celery import shared_task
+
+from django.apps import apps
+from django.urls import reverse
+
+from buildings.models import Building
+from notifications.models import Notification, create_notification
+
+from .exports import export_rows, save_export_file
+from .images import IMAGE_PIPELINES, build_variants, delete_variants
+from .models import ExportJob
+from .reports import render_report_pdf
+
+
+@shared_task
+def run_export_job(job_id):
+    """Write a queued export to a file and notify the user who requested it"""
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    job.status = ExportJob.RUNNING
+    job.save(update_fields=['status'])
+
+    params = job.parameters
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    rows = export_rows(
+        job.dataset,
+        Building.objects.filter(pk__in=params.get('building_ids', [])),
+        date.fromisoformat(start_date) if start_date else None,
+        date.fromisoformat(end_date) if end_date else None
+    )
+
+    try:
+        row_count = save_export_file(job, rows)
+    except Exception as exc:
+        job.mark_failed(str(exc))
+        create_notification(
+            user=job.requested_by,
+            title='Dışa aktarma başarısız',
+            message=f'"{job.dataset}" dışa aktarması oluşturulamadı.',
+            notification_type=Notification.ERROR
+        )
+        raise
+
+    job.mark_completed(row_count)
+    create_notification(
+        user=job.requested_by,
+        title='Dışa aktarma hazır',
+        message=f'"{job.dataset}" dışa aktarması hazır ({row_count} satır).',
+        notification_type=Notification.SUCCESS,
+        link=reverse('export_job_download', args=[job.pk])
+    )
+    return row_count
+
+
+@shared_task
+def run_report_job(job_id):
+    """Render a queued PDF analytics report and notify the admin"""
+    job = ExportJob.objects.select_related('requested_by').get(pk=job_id)
+    job.status = ExportJob.RUNNING
+    job.save(update_fields=['status'])
+
+    params = job.parameters
+    buildings = Building.objects.filter(pk__in=params['building_ids']).order_by('name')
+
+    try:
+        render_report_pdf(
+            job, job.requested_by, buildings,
+            date.fromisoformat(params['start_date']),
+            date.fromisoformat(params['end_date'])
+        )
+    except Exception as exc:
+        job.mark_failed(str(exc))
+        create_notification(
+            user=job.requested_by,
+            title='Rapor oluşturulamadı',
+            message='Analitik raporu oluşturulurken bir hata oluştu.',
+            notification_type=Notification.ERROR
+        )
+        raise
+
+    job.mark_completed()
+    create_notification(
+        user=job.requested_by,
+        title='Rapor hazır',
+        message='Analitik raporunuz indirilmeye hazır.',
+        notification_type=Notification.SUCCESS,
+        link=reverse('export_job_download', args=[job.pk])
+    )
+    return job.pk
+
+
+@shared_task
+def process_image_variants(model_label, pk, field_name, name, previous_name=None):
+    """Build the resized variants of a newly uploaded image"""
+    model = apps.get_model(model_label)
+    variants = IMAGE_PIPELINES[(model_label, field_name)]
+    field = model._meta.get_field(field_name)
+
+    if previous_name:
+        delete_variants(field.storage, previous_name, variants)
+
+    instance = model._default_manager.filter(pk=pk).only('pk', field_name).first()
+    fieldfile = getattr(instance, field_name) if instance else None
+    # Skip files that were replaced or removed before the task ran
+    if not fieldfile or fieldfile.name != name:
+        return []
+    return build_variants(fieldfile, variants)
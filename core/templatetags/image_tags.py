@@ -0,0 +1,16 @@
+from django import template
+
+from core.images import JPEG, WEBP, variant_url
+
+register = template.Library()
+
+
+@register.filter
+def image_variant(fieldfile, variant):
+    """URL of a resized variant, e.g. ``{{ user.profile_picture|image_variant:"avatar" }}``
+
+    Append ``:jpeg`` for the JPEG copy (``"thumbnail:jpeg"``); the WebP copy is
+    used otherwise. Falls back to the original until the variant is built.
+    """
+    variant, _sep, file_format = variant.partition(':')
+    return variant_url(fieldfile, variant, JPEG if file_format == JPEG else WEBP)
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from buildings.models import Apartment, Building
+from notifications.models import create_notification
+from payments.models import ApartmentDues, Dues, Expense, Payment
+from users.models import User, UserActivity
+
+from .analytics import age_group_counts, monthly_counts
+from .analytics_views import export_job_download, financial_analytics_api, user_activity_analytics_api
+from .images import DOCUMENT_VARIANTS, build_variants, delete_variants, variant_url
+from .models import ExportJob
+from .tasks import run_export_job, run_report_job
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FinancialAnalyticsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              role='admin')
+        building = Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin)
+        for number in ('1', '2'):
+            Apartment.objects.create(building=building, floor=1, number=number)
+        today = timezone.now().date()
+        Dues.objects.create(building=building, amount=Decimal('100'), month=today.month, year=today.year,
+                            due_date=today)
+        Payment.objects.create(apartment_dues=ApartmentDues.objects.first(), amount=Decimal('40'),
+                               payment_date=today)
+        Expense.objects.create(building=building, title='Elektrik', amount=Decimal('25'),
+                               category=Expense.UTILITIES, expense_date=today)
+
+    def analytics(self, period):
+        request = RequestFactory().get('/', {'period': period})
+        request.user = self.admin
+        return json.loads(financial_analytics_api(request).content)
+
+    def test_every_month_of_the_period_is_reported(self):
+        data = self.analytics(3)
+
+        self.assertEqual([row['revenue'] for row in data['monthly_data']], [0, 0, 40])
+        self.assertEqual(data['monthly_data'][-1]['profit'], 15)
+        self.assertEqual(data['collection_rates'][0]['rate'], 20)
+
+    def test_query_count_does_not_grow_with_the_period(self):
+        with CaptureQueriesContext(connection) as short_period:
+            self.analytics(1)
+        with CaptureQueriesContext(connection) as long_period:
+            self.analytics(24)
+
+        self.assertEqual(len(long_period), len(short_period))
+
+
+class ResidentAnalyticsTests(TestCase):
+    def resident(self, username, **kwargs):
+        return User.objects.create_user(username=username, email=f'{username}@example.com', password='x',
+                                        role='resident', **kwargs)
+
+    def test_age_groups_respect_birthdays(self):
+        for username, born in (('otuz', date(2000, 6, 15)), ('otuzbir', date(1999, 6, 15)),
+                               ('yarin', date(1999, 6, 16)), ('yasli', date(1960, 1, 1)), ('bilinmeyen', None)):
+            self.resident(username, date_of_birth=born)
+
+        counts = age_group_counts(User.objects.all(), date(2030, 6, 15))
+
+        self.assertEqual(counts, {'18-30': 2, '31-45': 1, '46-60': 0, '60+': 1, 'unknown': 1})
+
+    def test_monthly_counts_fill_empty_months(self):
+        for username, joined in (('ocak', datetime(2030, 1, 20)), ('mart', datetime(2030, 3, 2)),
+                                 ('mart2', datetime(2030, 3, 31, 12)), ('nisan', datetime(2030, 4, 1))):
+            self.resident(username, date_joined=timezone.make_aware(joined))
+
+        rows = monthly_counts(User.objects.all(), 'date_joined', date(2030, 1, 15), date(2030, 3, 10))
+
+        self.assertEqual(rows, [
+            {'month': '2030-01', 'count': 1},
+            {'month': '2030-02', 'count': 0},
+            {'month': '2030-03', 'count': 2},
+        ])
+
+
+class UserActivityAnalyticsTests(TestCase):
+    def test_activity_is_grouped_in_the_database(self):
+        admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                         role='admin')
+        resident = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        for user, activity_type, user_agent in (
+            (resident, 'login', 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Mobile Safari/604.1'),
+            (resident, 'login', 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Mobile Safari/604.1'),
+            (resident, 'profile_update', ''),
+            (admin, 'login', 'Mozilla/5.0 (Windows NT 10.0) Chrome/120.0 Safari/537.36'),
+        ):
+            UserActivity.objects.create(user=user, activity_type=activity_type, user_agent=user_agent)
+        UserActivity.objects.filter(activity_type='profile_update').update(
+            timestamp=timezone.now() - timedelta(days=31)
+        )
+        request = RequestFactory().get('/')
+        request.user = admin
+
+        data = json.loads(user_activity_analytics_api(request).content)
+
+        self.assertEqual(data['activity_types'], [{'activity_type': 'login', 'count': 3}])
+        self.assertEqual(data['active_users'][0]['user__email'], 'sakin@example.com')
+        self.assertEqual(sum(row['count'] for row in data['login_patterns']), 3)
+        self.assertEqual(data['device_data'], [
+            {'device_family': 'mobile', 'browser_family': 'Safari', 'count': 2},
+            {'device_family': 'desktop', 'browser_family': 'Chrome', 'count': 1},
+        ])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BadgesApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x',
+                                             role='resident')
+        self.client.force_login(self.user)
+
+    def test_unchanged_badges_answer_304_from_cache(self):
+        response = self.client.get(reverse('api_badges'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['unread_notifications'], 0)
+
+        with mock.patch('core.badges.compute_badges') as compute_badges:
+            revalidated = self.client.get(reverse('api_badges'), HTTP_IF_NONE_MATCH=response['ETag'])
+
+        compute_badges.assert_not_called()
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_new_notification_changes_the_etag(self):
+        etag = self.client.get(reverse('api_badges'))['ETag']
+
+        create_notification(self.user, 'Başlık', 'Mesaj')
+        response = self.client.get(reverse('api_badges'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['unread_notifications'], 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImageVariantUrlTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        cache.clear()
+
+        field = Expense._meta.get_field('invoice_image')
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 400), 'white').save(buffer, 'JPEG')
+        name = field.storage.save('invoices/fatura.jpg', ContentFile(buffer.getvalue()))
+        self.fieldfile = FieldFile(None, field, name)
+        self.storage = field.storage
+
+    def test_original_until_built_then_variant_without_storage_lookups(self):
+        self.assertEqual(variant_url(self.fieldfile, 'thumbnail'), self.fieldfile.url)
+
+        build_variants(self.fieldfile, DOCUMENT_VARIANTS)
+
+        with mock.patch.object(self.storage, 'exists', side_effect=AssertionError('storage was checked')):
+            self.assertTrue(variant_url(self.fieldfile, 'thumbnail').endswith('fatura__thumbnail.webp'))
+
+    def test_missing_variants_are_looked_up_once(self):
+        with mock.patch.object(self.storage, 'exists', return_value=False) as exists:
+            variant_url(self.fieldfile, 'thumbnail')
+            variant_url(self.fieldfile, 'preview')
+
+        self.assertEqual(exists.call_count, 1)
+
+    def test_deleted_variants_fall_back_to_the_original(self):
+        build_variants(self.fieldfile, DOCUMENT_VARIANTS)
+        delete_variants(self.storage, self.fieldfile.name, DOCUMENT_VARIANTS)
+
+        self.assertEqual(variant_url(self.fieldfile, 'thumbnail'), self.fieldfile.url)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnalyticsReportRequestTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              role='admin')
+        Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin)
+        self.client.force_login(self.admin)
+
+    def request_report(self, period):
+        return self.client.get(reverse('analytics_report'), {'period': period})
+
+    def test_invalid_period_is_rejected(self):
+        for period in ('abc', '-1', '7', ''):
+            self.assertEqual(self.request_report(period).status_code, 400)
+
+    def test_repeated_request_reuses_the_queued_job(self):
+        first = self.request_report('6')
+        second = self.request_report('6')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.json()['job_id'], second.json()['job_id'])
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+    def test_job_whose_worker_died_is_replaced(self):
+        stale = self.request_report('6').json()['job_id']
+        ExportJob.objects.filter(pk=stale).update(
+            status=ExportJob.RUNNING,
+            created_at=timezone.now() - timedelta(seconds=settings.REPORT_JOB_TIMEOUT + 1)
+        )
+
+        fresh = self.request_report('6').json()['job_id']
+
+        self.assertNotEqual(fresh, stale)
+        self.assertEqual(ExportJob.objects.get(pk=stale).status, ExportJob.FAILED)
+
+    def test_rendered_report_is_reused_until_the_data_changes(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        # WeasyPrint needs Pango, so the PDF writer is replaced
+        weasyprint = mock.MagicMock()
+        weasyprint.HTML.return_value.write_pdf.side_effect = lambda target: target.write(b'%PDF-1.7')
+        with mock.patch.dict(sys.modules, {'weasyprint': weasyprint}):
+            job_id = self.request_report('6').json()['job_id']
+            run_report_job(job_id)
+
+        cached = self.request_report('6')
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.json()['job_id'], job_id)
+        self.assertTrue(ExportJob.objects.get(pk=job_id).file.name.endswith('.pdf'))
+
+        Expense.objects.create(building=Building.objects.get(), title='Elektrik', amount=Decimal('120'),
+                               category=Expense.UTILITIES, expense_date=timezone.now().date())
+        self.assertNotEqual(self.request_report('6').json()['job_id'], job_id)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              role='admin')
+        building = Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin)
+        Expense.objects.create(building=building, title='Elektrik', amount=Decimal('120'),
+                               category=Expense.UTILITIES, expense_date=date(2030, 1, 10))
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        return self.client.get(reverse('analytics_export'), {'type': 'expenses', **params})
+
+    def run_async_export(self):
+        job_id = self.export(mode='async').json()['job_id']
+        run_export_job(job_id)
+        return ExportJob.objects.get(pk=job_id)
+
+    def test_small_export_is_streamed(self):
+        response = self.export()
+
+        body = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('Elektrik', body)
+
+    def test_unknown_dataset_is_rejected(self):
+        self.assertEqual(self.export(type='bilinmeyen').status_code, 400)
+
+    def test_async_export_is_downloadable(self):
+        job = self.run_async_export()
+
+        self.assertEqual(job.status, ExportJob.COMPLETED)
+        response = self.client.get(reverse('export_job_download', args=[job.pk]))
+        self.assertIn('Elektrik', b''.join(response.streaming_content).decode('utf-8-sig'))
+
+    def download(self, job, user):
+        # Called directly: rendering the site's 404 page fails on an unknown 'user_list' URL
+        request = RequestFactory().get(reverse('export_job_download', args=[job.pk]))
+        request.user = user
+        return export_job_download(request, job.pk)
+
+    def test_missing_export_file_is_a_404(self):
+        job = self.run_async_export()
+        job.file.storage.delete(job.file.name)
+
+        with self.assertRaises(Http404):
+            self.download(job, self.admin)
+        self.assertEqual(ExportJob.objects.get(pk=job.pk).status, ExportJob.FAILED)
+
+    def test_other_users_cannot_download(self):
+        job = self.run_async_export()
+        other = User.objects.create_user(username='baska', email='baska@example.com', password='x', role='admin')
+
+        with self.assertRaises(Http404):
+            self.download(job, other)
@@ -1,7 +1,14 @@
 from django.urls import path
 from .views import HomeView, DashboardView, badges_api
+from .analytics_views import (
+    export_analytics_data, export_job_status, export_job_download, generate_analytics_report
+)
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('analytics/export/', export_analytics_data, name='analytics_export'),
+    path('analytics/report/', generate_analytics_report, name='analytics_report'),
+    path('exports/<int:pk>/', export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', export_job_download, name='export_job_download'),
 ]
@@ -4,16 +4,22 @@ from django.views.generic import TemplateView, ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Sum, Count, Q, Avg
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
 from datetime import datetime, timedelta
 from decimal import Decimal
+from dateutil.relativedelta import relativedelta
 from django.views.decorators.csrf import csrf_exempt
+import logging
 
 from buildings.models import Building, Apartment
 from payments.models import Dues, ApartmentDues, Expense, Payment
-from complaints.models import Complaint
+from complaints.models import Complaint, summarize_complaints, get_complaint_statistics_by_building
 from announcements.models import Announcement
 from notifications.models import Notification
+from .analytics import month_start, monthly_totals, summary_totals
+from .badges import get_badges
+
+logger = logging.getLogger(__name__)
 
 
 class HomeView(TemplateView):
@@ -129,10 +135,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             ).order_by('-created_at')[:5]
             
             # Unread notifications
-            context['unread_notifications'] = Notification.objects.filter(
-                user=user,
-                is_read=False
-            ).count()
+            context['unread_notifications'] = user.get_notification_count()
             
         # Enhanced Caretaker dashboard
         elif user.is_caretaker:
@@ -163,33 +166,25 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
     
     def get_monthly_trends(self, buildings):
-        """Get monthly trends for the last 6 months"""
+        """Get monthly trends for the last 6 months
+        
+        ``dues`` is the amount billed to apartments, not the building-level dues rate.
+        """
+        today = timezone.now().date()
+        start_date = month_start(today) - relativedelta(months=5)
+        
         trends = []
-        for i in range(6):
-            month_date = timezone.now() - timedelta(days=30 * i)
-            month = month_date.month
-            year = month_date.year
-            
-            dues = Dues.objects.filter(
-                building__in=buildings,
-                month=month,
-                year=year
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            expenses = Expense.objects.filter(
-                building__in=buildings,
-                expense_date__month=month,
-                expense_date__year=year
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
+        for totals in monthly_totals(buildings, start_date, today):
+            dues = totals['dues_billed']
+            expenses = totals['expenses_total']
             trends.append({
-                'month': month_date.strftime('%B'),
+                'month': totals['month'].strftime('%B'),
                 'dues': float(dues),
                 'expenses': float(expenses),
                 'profit': float(dues - expenses)
             })
         
-        return list(reversed(trends))
+        return trends
     
     def get_recent_activities(self, buildings):
         """Get recent activities for admin dashboard"""
@@ -256,19 +251,17 @@ class AdminAnalyticsView(LoginRequiredMixin, TemplateView):
         return context
     
     def get_financial_summary(self, buildings):
-        """Get comprehensive financial summary"""
+        """Get comprehensive financial summary, with dues billed to apartments"""
         current_year = timezone.now().year
         
         # Annual totals
-        annual_dues = Dues.objects.filter(
-            building__in=buildings,
-            year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        annual_expenses = Expense.objects.filter(
-            building__in=buildings,
-            expense_date__year=current_year
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        totals = summary_totals(
+            buildings,
+            start_date=datetime(current_year, 1, 1),
+            end_date=datetime(current_year, 12, 31)
+        )
+        annual_dues = totals['dues_billed']
+        annual_expenses = totals['expenses_total']
         
         # Monthly averages
         monthly_avg_dues = annual_dues / 12 if annual_dues > 0 else 0
@@ -284,36 +277,27 @@ class AdminAnalyticsView(LoginRequiredMixin, TemplateView):
         }
     
     def get_payment_trends(self, buildings):
-        """Get payment collection trends"""
+        """Get payment collection trends
+        
+        ``total_paid`` counts every payment towards the month's dues, partial ones included.
+        """
+        today = timezone.now().date()
+        start_date = month_start(today) - relativedelta(months=11)
+        
         trends = []
-        for i in range(12):
-            month_date = timezone.now() - timedelta(days=30 * i)
-            month = month_date.month
-            year = month_date.year
-            
-            total_due = Dues.objects.filter(
-                building__in=buildings,
-                month=month,
-                year=year
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            total_paid = ApartmentDues.objects.filter(
-                apartment__building__in=buildings,
-                dues__month=month,
-                dues__year=year,
-                status='paid'
-            ).aggregate(total=Sum('paid_amount'))['total'] or 0
-            
+        for totals in monthly_totals(buildings, start_date, today):
+            total_due = totals['dues_billed']
+            total_paid = totals['dues_paid']
             collection_rate = (total_paid / total_due * 100) if total_due > 0 else 0
             
             trends.append({
-                'month': month_date.strftime('%B %Y'),
+                'month': totals['month'].strftime('%B %Y'),
                 'total_due': float(total_due),
                 'total_paid': float(total_paid),
                 'collection_rate': round(collection_rate, 1)
             })
         
-        return list(reversed(trends))
+        return trends
     
     def get_expense_breakdown(self, buildings):
         """Get expense breakdown by category"""
@@ -348,27 +332,15 @@ class AdminAnalyticsView(LoginRequiredMixin, TemplateView):
     
     def get_complaint_analytics(self, buildings):
         """Get complaint analytics"""
-        total_complaints = Complaint.objects.filter(building__in=buildings).count()
-        resolved_complaints = Complaint.objects.filter(
-            building__in=buildings,
-            status='resolved'
-        ).count()
-        
-        avg_resolution_time = Complaint.objects.filter(
-            building__in=buildings,
-            status='resolved',
-            resolved_at__isnull=False
-        ).aggregate(
-            avg_time=Avg('resolved_at') - Avg('created_at')
-        )['avg_time']
-        
-        return {
-            'total_complaints': total_complaints,
-            'resolved_complaints': resolved_complaints,
-            'pending_complaints': total_complaints - resolved_complaints,
-            'resolution_rate': (resolved_complaints / total_complaints * 100) if total_complaints > 0 else 0,
-            'avg_resolution_time': avg_resolution_time
-        }
+        analytics = summarize_complaints(Complaint.objects.filter(building__in=buildings))
+        
+        # Per-building breakdown from the same grouped queries
+        by_building = get_complaint_statistics_by_building(buildings)
+        analytics['buildings'] = [
+            {'building': building.name, **by_building[building.pk]}
+            for building in buildings
+        ]
+        return analytics
 
 
 # API Views for AJAX requests
@@ -406,72 +378,29 @@ class DashboardStatsAPIView(LoginRequiredMixin, TemplateView):
 @login_required
 def badges_api(request):
     """API endpoint for badges/counts used in sidebar"""
-    user = request.user
-    
-    # Initialize counts
-    data = {
-        'pending_complaints': 0,
-        'unread_notifications': 0,
-        'pending_payments': 0,
-        'new_announcements': 0,
-        'pending_packages': 0,
-        'active_tasks': 0,
-    }
-    
     try:
-        # Get unread notifications count
-        data['unread_notifications'] = Notification.objects.filter(
-            user=user, 
-            is_read=False
-        ).count()
-        
-        # Get pending complaints count based on user role
-        if user.is_admin or user.is_caretaker:
-            data['pending_complaints'] = Complaint.objects.filter(
-                status__in=['open', 'in_progress']
-            ).count()
-        else:
-            data['pending_complaints'] = Complaint.objects.filter(
-                user=user,
-                status__in=['open', 'in_progress']
-            ).count()
-        
-        # Get new announcements count (last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
-        data['new_announcements'] = Announcement.objects.filter(
-            created_at__gte=week_ago,
-            status='published'
-        ).count()
-        
-        # Get pending packages count (for caretakers)
-        if user.is_caretaker:
-            from packages.models import Package
-            data['pending_packages'] = Package.objects.filter(
-                status='pending',
-                building__caretaker=user
-            ).count()
-        
-        # Get active tasks count (for caretakers)
-        if user.is_caretaker:
-            from caretaker.models import Task
-            data['active_tasks'] = Task.objects.filter(
-                assigned_to=user,
-                status__in=['pending', 'in_progress']
-            ).count()
-        
-        # Get pending payments count
-        if user.is_resident:
-            from payments.models import ApartmentDues
-            data['pending_payments'] = ApartmentDues.objects.filter(
-                apartment__resident=user,
-                is_paid=False
-            ).count()
-        
+        data, etag = get_badges(request.user)
     except Exception as e:
         # Log error but don't fail
-        print(f"Error in badges_api: {e}")
+        logger.exception('Error in badges_api: %s', e)
+        return JsonResponse({
+            'pending_complaints': 0,
+            'unread_notifications': 0,
+            'pending_payments': 0,
+            'new_announcements': 0,
+            'pending_packages': 0,
+            'active_tasks': 0,
+        })
+    
+    # Idle polling only needs to revalidate the cached counts
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(data)
     
-    return JsonResponse(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 def handler404(request, exception):
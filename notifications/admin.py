@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin
-from .models import NotificationGroup, Notification, NotificationPreference
+from .models import (
+    NotificationGroup, Notification, NotificationPreference, NotificationCounter,
+    reconcile_notification_counters
+)
 
 
 @admin.register(NotificationGroup)
@@ -45,14 +48,28 @@ class NotificationAdmin(ModelAdmin):
     
     actions = ['mark_as_read', 'mark_as_unread']
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        reconcile_notification_counters([obj.user_id])
+    
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_notification_counters(user_ids)
+    
     @admin.action(description=_("Mark selected notifications as read"))
     def mark_as_read(self, request, queryset):
+        # Read the users first, the update can take rows out of an is_read filtered queryset
+        user_ids = set(queryset.values_list('user_id', flat=True))
         queryset.update(is_read=True)
+        reconcile_notification_counters(user_ids)
         self.message_user(request, _("Selected notifications have been marked as read."))
     
     @admin.action(description=_("Mark selected notifications as unread"))
     def mark_as_unread(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         queryset.update(is_read=False)
+        reconcile_notification_counters(user_ids)
         self.message_user(request, _("Selected notifications have been marked as unread."))
 
 
@@ -73,3 +90,13 @@ class NotificationPreferenceAdmin(ModelAdmin):
             'fields': ('payment_notifications', 'announcement_notifications', 'complaint_notifications', 'package_notifications'),
         }),
     )
+
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(ModelAdmin):
+    list_display = ('user', 'unread_count', 'updated_at')
+    search_fields = ('user__email', 'user__first_name', 'user__last_name')
+    readonly_fields = ('user', 'unread_count', 'updated_at')
+    
+    def has_add_permission(self, request):
+        return False
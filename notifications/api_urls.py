@@ -1,8 +1,10 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .api_views import NotificationViewSet
 
-# Notifications API URLs
-# TODO: Add API views for notifications management
+router = DefaultRouter()
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
-    # Placeholder - add actual API endpoints when needed
+    path('', include(router.urls)),
 ]
@@ -0,0 +1,50 @@
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import extend_schema
+
+from core.pagination import KeysetPagination
+from .models import Notification, dismiss_notifications, get_unread_count, mark_notifications_read
+from .serializers import NotificationSerializer, NotificationBulkSerializer
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """The user's notifications, newest first; dismissed ones are hidden"""
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['is_read', 'notification_type', 'action_required']
+
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user, is_dismissed=False)
+
+    def get_serializer_class(self):
+        if self.action in ['read', 'dismiss']:
+            return NotificationBulkSerializer
+        return NotificationSerializer
+
+    def _bulk_response(self, updated):
+        return Response({'updated': updated, 'unread_count': get_unread_count(self.request.user)})
+
+    @extend_schema(description='Mark the given notifications, or all of them, as read')
+    @action(detail=False, methods=['post'])
+    def read(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        return self._bulk_response(mark_notifications_read(request.user, ids))
+
+    @extend_schema(description='Dismiss the given notifications, or all of them')
+    @action(detail=False, methods=['post'])
+    def dismiss(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = None if serializer.validated_data['all'] else serializer.validated_data['ids']
+        return self._bulk_response(dismiss_notifications(request.user, ids))
+
+    @extend_schema(description='Unread notification count of the user')
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread_count': get_unread_count(request.user)})
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from notifications.models import reconcile_notification_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute unread notification counters from the notifications table and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            help='Only reconcile the given user ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of users checked per query',
+        )
+
+    def handle(self, *args, **options):
+        repaired = reconcile_notification_counters(options['user'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} notification counters'))
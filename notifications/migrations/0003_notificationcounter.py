@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationCounter = apps.get_model('notifications', 'NotificationCounter')
+    rows = Notification.objects.filter(
+        is_read=False,
+        is_dismissed=False
+    ).values('user_id').annotate(unread=models.Count('id')).order_by()
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row['user_id'], unread_count=row['unread']) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notificationlog_notificationpreference_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0, verbose_name='okunmamış sayısı')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='güncellenme tarihi')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='notification_counter', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bildirim Sayacı',
+                'verbose_name_plural': 'Bildirim Sayaçları',
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
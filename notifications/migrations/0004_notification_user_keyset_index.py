@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0003_building_common_areas_building_construction_year_and_more'),
+        ('notifications', '0003_notificationcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notificatio_user_id_b87bb1_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_user_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='email_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='e-posta gönderimi başlangıcı'),
+        ),
+    ]
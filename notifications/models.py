@@ -1,12 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import Greatest
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
 from django.conf import settings
+from functools import lru_cache
 from users.models import User
 from buildings.models import Building, Apartment
+from core.badges import invalidate_badges
+from .realtime import publish_new_notifications, publish_unread_count
 import json
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
 
 
 class NotificationGroup(models.Model):
@@ -76,6 +86,7 @@ class Notification(models.Model):
     # Email and SMS tracking
     is_email_sent = models.BooleanField(_('e-posta gönderildi mi'), default=False)
     email_sent_at = models.DateTimeField(_('e-posta gönderilme tarihi'), null=True, blank=True)
+    email_claimed_at = models.DateTimeField(_('e-posta gönderimi başlangıcı'), null=True, blank=True, editable=False)
     is_sms_sent = models.BooleanField(_('SMS gönderildi mi'), default=False)
     sms_sent_at = models.DateTimeField(_('SMS gönderilme tarihi'), null=True, blank=True)
     
@@ -96,16 +107,38 @@ class Notification(models.Model):
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.is_read:
-            self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            with transaction.atomic():
+                # Conditional update so concurrent requests only decrement once
+                updated = Notification.objects.filter(pk=self.pk, is_read=False).update(
+                    is_read=True, read_at=self.read_at
+                )
+                if updated and not self.is_dismissed:
+                    adjust_unread_counts({self.user_id: -1})
+            self.is_read = True
+            invalidate_badges(self.user_id)
+            publish_unread_count(self.user_id)
     
     def dismiss(self):
         """Dismiss notification"""
         if not self.is_dismissed:
-            self.is_dismissed = True
             self.dismissed_at = timezone.now()
-            self.save()
+            with transaction.atomic():
+                updated = Notification.objects.filter(pk=self.pk, is_dismissed=False).update(
+                    is_dismissed=True, dismissed_at=self.dismissed_at
+                )
+                if updated and not self.is_read:
+                    adjust_unread_counts({self.user_id: -1})
+            self.is_dismissed = True
+            invalidate_badges(self.user_id)
+            publish_unread_count(self.user_id)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if not self.is_read and not self.is_dismissed:
+                adjust_unread_counts({self.user_id: -1})
+        return result
     
     def is_expired(self):
         """Check if notification has expired"""
@@ -141,6 +174,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
+            # Keyset pages of a user's notifications seek on (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id']),
             models.Index(fields=['created_at']),
             models.Index(fields=['notification_type']),
         ]
@@ -215,6 +250,20 @@ class NotificationTemplate(models.Model):
         verbose_name_plural = _('Bildirim Şablonları')
 
 
+class NotificationCounter(models.Model):
+    """Denormalized count of a user's unread, undismissed notifications"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_counter')
+    unread_count = models.PositiveIntegerField(_('okunmamış sayısı'), default=0)
+    updated_at = models.DateTimeField(_('güncellenme tarihi'), auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.email}: {self.unread_count}"
+    
+    class Meta:
+        verbose_name = _('Bildirim Sayacı')
+        verbose_name_plural = _('Bildirim Sayaçları')
+
+
 class NotificationLog(models.Model):
     """Log of all notification activities"""
     notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='logs')
@@ -240,34 +289,99 @@ def create_notification(user, title, message, notification_type=Notification.INF
                        link=None, group=None, apartment=None, action_required=False,
                        action_url=None, action_text=None, expires_at=None, metadata=None):
     """Enhanced helper function to create a notification"""
-    notification = Notification.objects.create(
-        user=user,
-        title=title,
-        message=message,
-        notification_type=notification_type,
-        link=link,
-        group=group,
-        apartment=apartment,
-        action_required=action_required,
-        action_url=action_url,
-        action_text=action_text,
-        expires_at=expires_at,
-        metadata=metadata or {}
-    )
-    
-    # Log the creation
-    NotificationLog.objects.create(
-        notification=notification,
-        action='created',
-        details=f'Notification created for {user.email}'
-    )
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            user=user,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            link=link,
+            group=group,
+            apartment=apartment,
+            action_required=action_required,
+            action_url=action_url,
+            action_text=action_text,
+            expires_at=expires_at,
+            metadata=metadata or {}
+        )
+        adjust_unread_counts({user.pk: 1})
+        
+        # Log the creation
+        NotificationLog.objects.create(
+            notification=notification,
+            action='created',
+            details=f'Notification created for {user.email}'
+        )
     
-    # Send email/SMS based on user preferences
-    _send_notification_channels(notification)
+    # Send email/SMS in the background based on user preferences
+    _queue_channel_delivery([notification.pk])
     
+    publish_new_notifications([notification])
     return notification
 
 
+def fan_out_notifications(recipients, title, message, notification_type=Notification.INFO,
+                          link=None, group=None, action_required=False, action_url=None,
+                          action_text=None, expires_at=None, metadata=None):
+    """Create the same notification for many recipients in bulk
+    
+    ``recipients`` is an iterable of ``(user, apartment)`` pairs. Notifications and
+    their logs are inserted with bulk_create, and email/SMS delivery is handed to
+    Celery in chunks of ``NOTIFICATION_BATCH_SIZE`` once the transaction commits.
+    """
+    recipients = list(recipients)
+    if not recipients:
+        return []
+    
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+    
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user=user,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                link=link,
+                group=group,
+                apartment=apartment,
+                action_required=action_required,
+                action_url=action_url,
+                action_text=action_text,
+                expires_at=expires_at,
+                metadata=dict(metadata or {})
+            )
+            for user, apartment in recipients
+        ], batch_size=batch_size)
+        
+        NotificationLog.objects.bulk_create([
+            NotificationLog(
+                notification=notification,
+                action='created',
+                details=f'Notification created for {notification.user.email}'
+            )
+            for notification in notifications
+        ], batch_size=batch_size)
+        
+        new_counts = {}
+        for notification in notifications:
+            new_counts[notification.user_id] = new_counts.get(notification.user_id, 0) + 1
+        adjust_unread_counts(new_counts)
+        
+        # Only queue delivery for users with at least one channel enabled
+        preferences = _get_or_create_preferences({user.pk for user, _apartment in recipients})
+        deliverable_ids = [
+            notification.pk for notification in notifications
+            if preferences[notification.user_id].email_notifications
+            or preferences[notification.user_id].sms_notifications
+        ]
+        _queue_channel_delivery(deliverable_ids)
+    
+    invalidate_badges(*preferences.keys())
+    publish_new_notifications(notifications)
+    return notifications
+
+
 def create_notification_from_template(user, template_name, context, **kwargs):
     """Create notification using a template"""
     try:
@@ -294,101 +408,239 @@ def create_notification_from_template(user, template_name, context, **kwargs):
 def send_building_notification(building, title, message, notification_type=Notification.INFO, 
                               group=None, exclude_user=None, **kwargs):
     """Send notification to all residents of a building"""
-    apartments = Apartment.objects.filter(building=building, is_occupied=True)
+    apartments = Apartment.objects.filter(
+        building=building,
+        is_occupied=True,
+        resident__isnull=False
+    ).select_related('resident')
     
-    notifications = []
-    for apartment in apartments:
-        if apartment.resident and apartment.resident != exclude_user:
-            notification = create_notification(
-                user=apartment.resident,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                group=group,
-                apartment=apartment,
-                **kwargs
-            )
-            notifications.append(notification)
+    if exclude_user is not None:
+        apartments = apartments.exclude(resident=exclude_user)
     
-    return notifications
+    return fan_out_notifications(
+        [(apartment.resident, apartment) for apartment in apartments],
+        title=title,
+        message=message,
+        notification_type=notification_type,
+        group=group,
+        **kwargs
+    )
 
 
-def send_bulk_notification(users, title, message, **kwargs):
+def send_bulk_notification(users, title, message, apartment=None, **kwargs):
     """Send notification to multiple users"""
-    notifications = []
-    for user in users:
-        notification = create_notification(
-            user=user,
-            title=title,
-            message=message,
-            **kwargs
-        )
-        notifications.append(notification)
-    
-    return notifications
+    return fan_out_notifications(
+        [(user, apartment) for user in users],
+        title=title,
+        message=message,
+        **kwargs
+    )
 
 
-def _send_notification_channels(notification):
+def _get_or_create_preferences(user_ids):
+    """Load notification preferences for many users, creating defaults in one insert"""
+    preferences = {
+        prefs.user_id: prefs
+        for prefs in NotificationPreference.objects.filter(user_id__in=user_ids)
+    }
+    missing = [NotificationPreference(user_id=user_id) for user_id in user_ids if user_id not in preferences]
+    if missing:
+        NotificationPreference.objects.bulk_create(missing, ignore_conflicts=True)
+        for prefs in missing:
+            preferences[prefs.user_id] = prefs
+    return preferences
+
+
+def _queue_channel_delivery(notification_ids):
+    """Hand email/SMS delivery to Celery in chunks after the current transaction commits"""
+    from .tasks import deliver_notification_channels
+    
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+    for start in range(0, len(notification_ids), batch_size):
+        chunk = notification_ids[start:start + batch_size]
+        transaction.on_commit(lambda chunk=chunk: deliver_notification_channels.delay(chunk))
+
+
+def _send_notification_channels(notification, prefs=None):
     """Send notification through various channels based on user preferences"""
-    try:
-        prefs = notification.user.notification_preferences
-    except NotificationPreference.DoesNotExist:
-        # Create default preferences
-        prefs = NotificationPreference.objects.create(user=notification.user)
-    
-    # Check if it's quiet hours
+    if prefs is None:
+        try:
+            prefs = notification.user.notification_preferences
+        except NotificationPreference.DoesNotExist:
+            # Create default preferences
+            prefs = NotificationPreference.objects.create(user=notification.user)
+    
+    _deliver_channels([notification], {notification.user_id: prefs})
+
+
+def _is_quiet_hours(prefs):
+    """Check whether the user's quiet hours are active"""
     current_time = timezone.now().time()
-    if prefs.quiet_hours_start <= current_time <= prefs.quiet_hours_end:
-        return  # Skip sending during quiet hours
-    
-    # Send email if enabled
-    if prefs.email_notifications and not notification.is_email_sent:
-        _send_email_notification(notification)
-    
-    # Send SMS if enabled (implement SMS service)
-    if prefs.sms_notifications and not notification.is_sms_sent:
-        _send_sms_notification(notification)
+    return prefs.quiet_hours_start <= current_time <= prefs.quiet_hours_end
 
 
-def _send_email_notification(notification):
-    """Send email notification"""
-    try:
-        context = {
-            'notification': notification,
-            'user': notification.user,
-            'apartment': notification.apartment,
-        }
-        
-        html_message = render_to_string('notifications/email_notification.html', context)
-        plain_message = notification.message
+def _deliver_channels(notifications, preferences):
+    """Send email/SMS for many notifications, batching all emails over one connection"""
+    email_batch = []
+    for notification in notifications:
+        prefs = preferences[notification.user_id]
         
-        send_mail(
-            subject=f'[Apartman Yönetimi] {notification.title}',
-            message=plain_message,
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[notification.user.email],
-            fail_silently=False
-        )
+        # Skip sending during quiet hours
+        if _is_quiet_hours(prefs):
+            continue
         
-        notification.is_email_sent = True
-        notification.email_sent_at = timezone.now()
-        notification.save()
+        # Send email if enabled
+        if prefs.email_notifications and not notification.is_email_sent:
+            email_batch.append(notification)
         
-        # Log success
-        NotificationLog.objects.create(
-            notification=notification,
-            action='email_sent',
-            details=f'Email sent to {notification.user.email}'
+        # Send SMS if enabled (implement SMS service)
+        if prefs.sms_notifications and not notification.is_sms_sent:
+            _send_sms_notification(notification)
+    
+    send_email_batch(email_batch)
+
+
+@lru_cache(maxsize=1)
+def _email_template():
+    """Compiled email template, loaded once per process"""
+    return get_template('notifications/email_notification.html')
+
+
+def _build_email_message(notification, connection):
+    """Build the multipart email of a notification"""
+    html_message = _email_template().render({
+        'notification': notification,
+        'user': notification.user,
+        'apartment': notification.apartment,
+    })
+    
+    message = EmailMultiAlternatives(
+        subject=f'[Apartman Yönetimi] {notification.title}',
+        body=notification.message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[notification.user.email],
+        connection=connection
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def _email_claim_expiry():
+    return timezone.now() - timezone.timedelta(seconds=getattr(settings, 'NOTIFICATION_EMAIL_CLAIM_TIMEOUT', 600))
+
+
+def claim_email_notifications(notifications):
+    """Reserve unsent emails for this worker and return the ones it won
+    
+    The on-commit delivery task and the periodic ``send_pending_emails`` sweep
+    can pick up the same rows; only the caller whose conditional UPDATE stamps
+    ``email_claimed_at`` sends them. Claims of a worker that died expire after
+    ``NOTIFICATION_EMAIL_CLAIM_TIMEOUT`` seconds.
+    """
+    ids = [notification.pk for notification in notifications]
+    if not ids:
+        return []
+    
+    now = timezone.now()
+    claimable = Q(is_email_sent=False) & (Q(email_claimed_at__isnull=True) | Q(email_claimed_at__lt=_email_claim_expiry()))
+    with transaction.atomic():
+        candidates = list(
+            Notification.objects.filter(claimable, pk__in=ids).select_for_update(skip_locked=True).values_list('pk', flat=True)
         )
-        
+        Notification.objects.filter(claimable, pk__in=candidates).update(email_claimed_at=now)
+        claimed = set(
+            Notification.objects.filter(pk__in=candidates, email_claimed_at=now).values_list('pk', flat=True)
+        )
+    return [notification for notification in notifications if notification.pk in claimed]
+
+
+def send_email_batch(notifications):
+    """Send notification emails over a single mail connection
+    
+    Only the notifications this call manages to claim are sent. Sent
+    notifications are marked with one UPDATE and every attempt is logged with
+    one bulk insert. Returns the number of emails sent.
+    """
+    notifications = claim_email_notifications(notifications)
+    if not notifications:
+        return 0
+    
+    started = time.monotonic()
+    sent_ids = []
+    logs = []
+    
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for notification in notifications:
+            try:
+                message = _build_email_message(notification, connection)
+                connection.send_messages([message])
+            except Exception as e:
+                logs.append(NotificationLog(
+                    notification=notification,
+                    action='failed',
+                    details=f'Email failed: {str(e)}'
+                ))
+            else:
+                sent_ids.append(notification.pk)
+                logs.append(NotificationLog(
+                    notification=notification,
+                    action='email_sent',
+                    details=f'Email sent to {notification.user.email}'
+                ))
     except Exception as e:
-        # Log failure
-        NotificationLog.objects.create(
-            notification=notification,
-            action='failed',
-            details=f'Email failed: {str(e)}'
+        # The connection itself failed, nothing else in the batch can be sent
+        logger.exception('Could not open mail connection')
+        sent_ids_set = set(sent_ids)
+        logs.extend(
+            NotificationLog(notification=notification, action='failed', details=f'Email failed: {str(e)}')
+            for notification in notifications
+            if notification.pk not in sent_ids_set
         )
+    finally:
+        connection.close()
+    
+    sent_at = timezone.now()
+    if sent_ids:
+        Notification.objects.filter(pk__in=sent_ids).update(is_email_sent=True, email_sent_at=sent_at)
+        for notification in notifications:
+            if notification.pk in sent_ids:
+                notification.is_email_sent = True
+                notification.email_sent_at = sent_at
+    failed_ids = [notification.pk for notification in notifications if notification.pk not in sent_ids]
+    if failed_ids:
+        # Failed emails go back to the pending pool for the next retry
+        Notification.objects.filter(pk__in=failed_ids).update(email_claimed_at=None)
+    NotificationLog.objects.bulk_create(logs)
+    
+    elapsed = time.monotonic() - started
+    logger.info(
+        'Sent %d/%d notification emails in %.2fs (%.1f messages/sec)',
+        len(sent_ids), len(notifications), elapsed,
+        len(sent_ids) / elapsed if elapsed > 0 else 0
+    )
+    return len(sent_ids)
+
+
+def get_pending_email_notifications(max_age_hours=24):
+    """Unsent, unclaimed emails of users with email enabled that have retries left"""
+    retry_attempts = getattr(settings, 'NOTIFICATION_RETRY_ATTEMPTS', 3)
+    return Notification.objects.filter(
+        Q(email_claimed_at__isnull=True) | Q(email_claimed_at__lt=_email_claim_expiry()),
+        is_email_sent=False,
+        user__notification_preferences__email_notifications=True,
+        created_at__gte=timezone.now() - timezone.timedelta(hours=max_age_hours)
+    ).annotate(
+        failed_attempts=models.Count('logs', filter=models.Q(logs__action='failed'))
+    ).filter(
+        failed_attempts__lt=retry_attempts
+    ).select_related('user', 'apartment__building', 'user__notification_preferences').order_by('created_at')
+
+
+def _send_email_notification(notification):
+    """Send email notification"""
+    send_email_batch([notification])
 
 
 def _send_sms_notification(notification):
@@ -402,14 +654,219 @@ def _send_sms_notification(notification):
     NotificationLog.objects.create(
         notification=notification,
         action='sms_sent',
-        details=f'SMS sent to {notification.user.phone}'
+        details=f'SMS sent to {notification.user.phone_number}'
+    )
+
+
+def adjust_unread_counts(deltas):
+    """Atomically apply ``{user_id: delta}`` changes to the unread counters
+    
+    Missing counter rows are inserted first so the increments are plain
+    ``UPDATE ... SET unread_count = unread_count + n`` statements, one per
+    distinct delta, which stay correct under concurrent writers.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in deltas],
+        ignore_conflicts=True
     )
+    
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread_count=Greatest(F('unread_count') + delta, 0),
+            updated_at=timezone.now()
+        )
+
+
+def count_unread_notifications(user_ids):
+    """Unread, undismissed notification counts computed from the notifications table"""
+    rows = Notification.objects.filter(
+        user_id__in=user_ids,
+        is_read=False,
+        is_dismissed=False
+    ).values('user_id').annotate(unread=Count('id')).order_by()
+    return {row['user_id']: row['unread'] for row in rows}
+
+
+def reconcile_notification_counters(user_ids=None, batch_size=1000):
+    """Repair counter drift by recomputing counts from the notifications table
+    
+    Returns the number of counters that were corrected.
+    """
+    users = User.objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    
+    repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return repaired
+        last_pk = batch[-1]
+        
+        actual = count_unread_notifications(batch)
+        stored = dict(
+            NotificationCounter.objects.filter(user_id__in=batch).values_list('user_id', 'unread_count')
+        )
+        drifted = {
+            user_id: actual.get(user_id, 0) for user_id in batch
+            if stored.get(user_id) != actual.get(user_id, 0)
+        }
+        if not drifted:
+            continue
+        
+        with transaction.atomic():
+            NotificationCounter.objects.bulk_create(
+                [NotificationCounter(user_id=user_id) for user_id in drifted],
+                ignore_conflicts=True
+            )
+            counters = list(NotificationCounter.objects.select_for_update().filter(user_id__in=drifted))
+            for counter in counters:
+                counter.unread_count = drifted[counter.user_id]
+                counter.updated_at = timezone.now()
+            NotificationCounter.objects.bulk_update(counters, ['unread_count', 'updated_at'])
+        invalidate_badges(*drifted)
+        repaired += len(drifted)
+
+
+def get_unread_counts(user_ids):
+    """Unread notification counts for many users, read from the counters"""
+    return dict(
+        NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_count')
+    )
+
+
+def get_unread_count(user):
+    """Unread notification count for a single user"""
+    return get_unread_counts([user.pk]).get(user.pk, 0)
+
+
+def mark_notifications_read(user, notification_ids=None):
+    """Mark a user's unread notifications as read, all of them or only ``notification_ids``
+    
+    The undismissed rows, which are the ones the unread counter tracks, are
+    updated in one statement and its row count becomes the counter delta.
+    Returns that count.
+    """
+    now = timezone.now()
+    unread = Notification.objects.filter(user=user, is_read=False)
+    if notification_ids is not None:
+        unread = unread.filter(pk__in=notification_ids)
+    with transaction.atomic():
+        counted = unread.filter(is_dismissed=False).update(is_read=True, read_at=now)
+        unread.update(is_read=True, read_at=now)
+        adjust_unread_counts({user.pk: -counted})
+    invalidate_badges(user.pk)
+    publish_unread_count(user.pk)
+    return counted
+
+
+def mark_all_as_read(user):
+    """Mark every unread notification of a user as read and reset the counter"""
+    return mark_notifications_read(user)
+
+
+def dismiss_notifications(user, notification_ids=None):
+    """Dismiss a user's notifications, all of them or only ``notification_ids``
+    
+    Returns how many were dismissed.
+    """
+    now = timezone.now()
+    active = Notification.objects.filter(user=user, is_dismissed=False)
+    if notification_ids is not None:
+        active = active.filter(pk__in=notification_ids)
+    with transaction.atomic():
+        # Only unread rows are part of the counter; read ones are dismissed after
+        counted = active.filter(is_read=False).update(is_dismissed=True, dismissed_at=now)
+        dismissed = counted + active.update(is_dismissed=True, dismissed_at=now)
+        adjust_unread_counts({user.pk: -counted})
+    invalidate_badges(user.pk)
+    publish_unread_count(user.pk)
+    return dismissed
+
+
+def _read_latency():
+    return ExpressionWrapper(F('read_at') - F('created_at'), output_field=DurationField())
+
+
+def _hours(duration):
+    return round(duration.total_seconds() / 3600, 2) if duration else 0
+
+
+def get_notification_statistics(notifications):
+    """Engagement statistics for a notification queryset
+    
+    Totals come from one conditional aggregate and per-type engagement from one
+    grouped query; read latency is averaged in the database.
+    """
+    has_read_time = Q(is_read=True, read_at__isnull=False)
+    aggregates = {
+        'total': Count('id'),
+        'read': Count('id', filter=Q(is_read=True)),
+        'timed_reads': Count('id', filter=has_read_time),
+        'avg_latency': Avg(_read_latency(), filter=has_read_time),
+    }
+    
+    totals = notifications.aggregate(
+        email_sent=Count('id', filter=Q(is_email_sent=True)),
+        sms_sent=Count('id', filter=Q(is_sms_sent=True)),
+        **aggregates
+    )
+    
+    by_type = []
+    for row in notifications.values('notification_type').annotate(**aggregates).order_by('notification_type'):
+        by_type.append({
+            'notification_type': row['notification_type'],
+            'count': row['total'],
+            'read': row['read'],
+            'engagement_rate': round(row['read'] / row['total'] * 100, 2) if row['total'] else 0,
+            'avg_response_time': _hours(row['avg_latency']),
+        })
+    
+    return {
+        'total_notifications': totals['total'],
+        'read_notifications': totals['read'],
+        'engagement_rate': round(totals['read'] / totals['total'] * 100, 2) if totals['total'] else 0,
+        'email_sent': totals['email_sent'],
+        'sms_sent': totals['sms_sent'],
+        'avg_response_time': _hours(totals['avg_latency']),
+        'read_latency_percentiles': read_latency_percentiles(notifications, totals['timed_reads']),
+        'type_engagement': by_type,
+    }
+
+
+def read_latency_percentiles(notifications, timed_reads=None, percentiles=(50, 90)):
+    """Nearest-rank read latency percentiles in hours
+    
+    Each percentile is a single ordered row fetched with OFFSET, so only one
+    value per percentile leaves the database.
+    """
+    read = notifications.filter(is_read=True, read_at__isnull=False)
+    if timed_reads is None:
+        timed_reads = read.count()
+    
+    result = {}
+    ordered = read.annotate(latency=_read_latency()).order_by('latency')
+    for percentile in percentiles:
+        if not timed_reads:
+            result[f'p{percentile}'] = 0
+            continue
+        rank = max(math.ceil(percentile / 100 * timed_reads) - 1, 0)
+        result[f'p{percentile}'] = _hours(ordered.values_list('latency', flat=True)[rank])
+    return result
 
 
 def get_user_notification_stats(user):
     """Get notification statistics for a user"""
     total = user.notifications.count()
-    unread = user.notifications.filter(is_read=False).count()
+    unread = get_unread_count(user)
     urgent = user.notifications.filter(notification_type='urgent', is_read=False).count()
     
     return {
@@ -0,0 +1,81 @@
+"""
+Real-time notification events over Redis pub/sub.
+
+Notification changes publish small JSON events on a per-user channel and the
+Server-Sent Events stream in views.notification_stream relays them to the
+browser, so open tabs no longer need to poll for unread counts.
+
+The stream is an async view, so the site has to be served through ASGI
+(``apartment_project.asgi``) for idle streams to cost no worker.
+"""
+import json
+import logging
+
+from django.db import transaction
+
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f'notifications:user:{user_id}'
+
+
+def serialize_notification(notification):
+    """JSON-friendly representation shared by the AJAX views and the stream"""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'type': notification.notification_type,
+        'is_read': notification.is_read,
+        'link': notification.link,
+        'created_at': notification.created_at.strftime('%d.%m.%Y %H:%M'),
+        'icon': notification.get_icon(),
+    }
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def publish_events(events):
+    """Publish ``(user_id, event, data)`` tuples after the current transaction commits"""
+    events = list(events)
+    if not events:
+        return
+
+    def publish():
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id, event, data in events:
+                pipe.publish(user_channel(user_id), json.dumps({'event': event, 'data': data}))
+            pipe.execute()
+        except Exception:
+            # Real-time delivery is best effort, clients resync on reconnect
+            logger.warning('Could not publish notification events', exc_info=True)
+
+    transaction.on_commit(publish)
+
+
+def publish_new_notifications(notifications):
+    """Push new notifications to their users along with the fresh unread count"""
+    from .models import get_unread_counts
+
+    unread_counts = get_unread_counts({notification.user_id for notification in notifications})
+    publish_events(
+        (notification.user_id, 'notification', {
+            'notification': serialize_notification(notification),
+            'unread_count': unread_counts.get(notification.user_id, 0),
+        })
+        for notification in notifications
+    )
+
+
+def publish_unread_count(user_id):
+    """Push a user's current unread count"""
+    from .models import get_unread_counts
+
+    publish_events([(user_id, 'unread_count', {'count': get_unread_counts([user_id]).get(user_id, 0)})])
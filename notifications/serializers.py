@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from .models import Notification
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    notification_type_display = serializers.ReadOnlyField(source='get_notification_type_display')
+    icon = serializers.ReadOnlyField(source='get_icon')
+    
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'title', 'message', 'notification_type', 'notification_type_display',
+            'icon', 'is_read', 'read_at', 'link', 'apartment', 'action_required',
+            'action_url', 'action_text', 'expires_at', 'metadata', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class NotificationBulkSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000
+    )
+    all = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs['all']:
+            raise serializers.ValidationError('ids veya all alanı gereklidir.')
+        return attrs
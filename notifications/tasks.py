@@ -0,0 +1,41 @@
+from celery import shared_task
+
+from django.conf import settings
+
+from .models import (
+    Notification, _get_or_create_preferences, _deliver_channels, _is_quiet_hours,
+    get_pending_email_notifications, send_email_batch
+)
+
+
+@shared_task
+def deliver_notification_channels(notification_ids):
+    """Send the email/SMS channels of a chunk of notifications"""
+    notifications = list(
+        Notification.objects.filter(pk__in=notification_ids).select_related('user', 'apartment__building')
+    )
+    preferences = _get_or_create_preferences({notification.user_id for notification in notifications})
+    
+    _deliver_channels(notifications, preferences)
+    
+    return len(notifications)
+
+
+@shared_task
+def send_pending_emails(batch_size=None):
+    """Deliver unsent notification emails in batches, one mail connection per batch"""
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+    
+    sent = 0
+    last_id = 0
+    while True:
+        batch = list(get_pending_email_notifications().filter(pk__gt=last_id).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        sent += send_email_batch([
+            notification for notification in batch
+            if not _is_quiet_hours(notification.user.notification_preferences)
+        ])
+    
+    return sent
@@ -1,3 +1,310 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from buildings.models import Apartment, Building
+from users.models import User
+
+from .models import (
+    Notification, NotificationCounter, NotificationLog, NotificationPreference, adjust_unread_counts,
+    count_unread_notifications, create_notification, dismiss_notifications, fan_out_notifications,
+    get_notification_statistics, get_unread_count, mark_notifications_read, reconcile_notification_counters,
+    send_building_notification, send_email_batch,
+)
+from .realtime import user_channel
+from .tasks import send_pending_emails
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+NOTIFICATIONS_URL = '/api/v1/notifications/notifications/'
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        self.other = User.objects.create_user(username='komsu', email='komsu@example.com', password='x')
+        self.notifications = [create_notification(self.user, f'Başlık {i}', 'Mesaj') for i in range(4)]
+
+    def assertCounterMatches(self, user):
+        self.assertEqual(get_unread_count(user), count_unread_notifications([user.pk]).get(user.pk, 0))
+
+    def test_create_increments(self):
+        fan_out_notifications([(self.user, None), (self.other, None)], 'Duyuru', 'Mesaj')
+
+        self.assertEqual(get_unread_count(self.user), 5)
+        self.assertEqual(get_unread_count(self.other), 1)
+
+    def test_mark_read_subtracts_only_unread_rows(self):
+        ids = [self.notifications[0].pk, self.notifications[1].pk]
+        self.assertEqual(mark_notifications_read(self.user, ids), 2)
+        self.assertEqual(mark_notifications_read(self.user, ids), 0)
+
+        self.assertEqual(get_unread_count(self.user), 2)
+        self.assertCounterMatches(self.user)
+
+    def test_mark_read_ignores_other_users_notifications(self):
+        other_notification = create_notification(self.other, 'Başlık', 'Mesaj')
+
+        self.assertEqual(mark_notifications_read(self.user, [other_notification.pk]), 0)
+        self.assertEqual(get_unread_count(self.other), 1)
+
+    def test_dismiss_subtracts_only_unread_rows(self):
+        mark_notifications_read(self.user, [self.notifications[0].pk])
+
+        dismissed = dismiss_notifications(self.user, [self.notifications[0].pk, self.notifications[1].pk])
+
+        self.assertEqual(dismissed, 2)
+        self.assertEqual(get_unread_count(self.user), 2)
+        self.assertCounterMatches(self.user)
+
+    def test_read_after_dismiss_does_not_subtract_twice(self):
+        dismiss_notifications(self.user, [self.notifications[0].pk])
+        mark_notifications_read(self.user)
+
+        self.assertEqual(get_unread_count(self.user), 0)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+
+    def test_counter_never_goes_negative(self):
+        adjust_unread_counts({self.user.pk: -10})
+
+        self.assertEqual(get_unread_count(self.user), 0)
+
+    def test_reconcile_repairs_drift(self):
+        NotificationCounter.objects.filter(user=self.user).update(unread_count=9)
+
+        self.assertEqual(reconcile_notification_counters([self.user.pk]), 1)
+        self.assertEqual(get_unread_count(self.user), 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.residents = [
+            User.objects.create_user(username=f'sakin{i}', email=f'sakin{i}@example.com', password='x')
+            for i in range(3)
+        ]
+        for i, resident in enumerate(self.residents):
+            Apartment.objects.create(building=self.building, floor=1, number=str(i + 1), resident=resident)
+
+    def test_building_notification_reaches_occupied_apartments(self):
+        Apartment.objects.filter(resident=self.residents[2]).update(is_occupied=False)
+
+        notifications = send_building_notification(self.building, 'Su kesintisi', 'Mesaj',
+                                                    exclude_user=self.residents[1])
+
+        self.assertEqual([notification.user for notification in notifications], [self.residents[0]])
+        self.assertEqual(notifications[0].apartment.building, self.building)
+        self.assertEqual(NotificationLog.objects.filter(action='created').count(), 1)
+        self.assertEqual(get_unread_count(self.residents[0]), 1)
+        self.assertEqual(get_unread_count(self.residents[1]), 0)
+
+    @override_settings(NOTIFICATION_BATCH_SIZE=2)
+    def test_delivery_is_queued_in_chunks_after_commit(self):
+        other = User.objects.create_user(username='komsu', email='komsu@example.com', password='x')
+        NotificationPreference.objects.create(user=other, email_notifications=False, sms_notifications=False)
+
+        with mock.patch('notifications.tasks.deliver_notification_channels.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications = fan_out_notifications(
+                    [(user, None) for user in [*self.residents, other]], 'Duyuru', 'Mesaj'
+                )
+                delay.assert_not_called()
+
+        deliverable = [notification.pk for notification in notifications if notification.user != other]
+        self.assertEqual(delay.call_args_list, [mock.call(deliverable[:2]), mock.call(deliverable[2:])])
+        self.assertEqual(NotificationPreference.objects.count(), 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class EmailDeliveryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        NotificationPreference.objects.create(user=self.user)
+        with mock.patch('notifications.models._queue_channel_delivery'):
+            self.notifications = [create_notification(self.user, f'Başlık {i}', 'Mesaj') for i in range(3)]
+
+    def test_batch_is_sent_once(self):
+        self.assertEqual(send_email_batch(self.notifications), 3)
+        self.assertEqual(send_email_batch(self.notifications), 0)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Notification.objects.filter(is_email_sent=True).count(), 3)
+        self.assertEqual(NotificationLog.objects.filter(action='email_sent').count(), 3)
+
+    def test_claimed_emails_are_left_to_their_worker(self):
+        Notification.objects.filter(pk=self.notifications[0].pk).update(email_claimed_at=timezone.now())
+
+        self.assertEqual(send_email_batch(self.notifications), 2)
+        self.assertEqual(send_pending_emails(), 0)
+        self.assertFalse(Notification.objects.get(pk=self.notifications[0].pk).is_email_sent)
+
+    @override_settings(NOTIFICATION_EMAIL_CLAIM_TIMEOUT=60)
+    def test_expired_claims_are_taken_over(self):
+        stale = timezone.now() - timezone.timedelta(minutes=5)
+        Notification.objects.filter(pk=self.notifications[0].pk).update(email_claimed_at=stale)
+
+        self.assertEqual(send_pending_emails(batch_size=2), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_emails_are_released_for_retry(self):
+        with mock.patch('notifications.models._build_email_message', side_effect=ValueError('bozuk')):
+            self.assertEqual(send_email_batch(self.notifications), 0)
+
+        self.assertFalse(Notification.objects.filter(email_claimed_at__isnull=False).exists())
+        self.assertEqual(NotificationLog.objects.filter(action='failed').count(), 3)
+        self.assertEqual(send_pending_emails(), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, NOTIFICATION_STREAM_MAX_AGE=0)
+class NotificationStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        create_notification(self.user, 'Başlık', 'Mesaj')
+
+    async def read_stream(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return ''.join([chunk.decode() async for chunk in response.streaming_content])
+
+    async def test_stream_starts_with_the_unread_count(self):
+        redis = mock.MagicMock(aclose=mock.AsyncMock())
+        redis.pubsub.return_value = mock.MagicMock(subscribe=mock.AsyncMock(), aclose=mock.AsyncMock())
+
+        with mock.patch('notifications.views.get_async_redis', return_value=redis):
+            body = await self.read_stream()
+
+        self.assertIn('event: unread_count\ndata: {"count": 1}', body)
+        redis.pubsub.return_value.subscribe.assert_awaited_once_with(user_channel(self.user.pk))
+        redis.aclose.assert_awaited_once()
+
+    async def test_redis_outage_ends_the_stream(self):
+        redis = mock.MagicMock(aclose=mock.AsyncMock())
+        redis.pubsub.return_value = mock.MagicMock(
+            subscribe=mock.AsyncMock(side_effect=ConnectionError), aclose=mock.AsyncMock()
+        )
+
+        with mock.patch('notifications.views.get_async_redis', return_value=redis):
+            body = await self.read_stream()
+
+        self.assertTrue(body.startswith('retry: 5000'))
+        redis.aclose.assert_awaited_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NotificationAdminActionTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='yonetici', email='yonetici@example.com', password='x')
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        self.notifications = [create_notification(self.user, f'Başlık {i}', 'Mesaj') for i in range(3)]
+        self.client.force_login(self.admin)
+
+    def run_action(self, action, is_read):
+        url = reverse('admin:notifications_notification_changelist') + f'?is_read__exact={int(is_read)}'
+        self.client.post(url, {
+            'action': action,
+            '_selected_action': [notification.pk for notification in self.notifications],
+        })
+
+    def test_mark_as_read_on_filtered_changelist_updates_counter(self):
+        self.run_action('mark_as_read', is_read=False)
+
+        self.assertEqual(get_unread_count(self.user), 0)
+
+    def test_mark_as_unread_on_filtered_changelist_updates_counter(self):
+        mark_notifications_read(self.user)
+
+        self.run_action('mark_as_unread', is_read=True)
+
+        self.assertEqual(get_unread_count(self.user), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NotificationStatisticsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        created_at = timezone.now() - timezone.timedelta(days=1)
+        for notification_type, hours in ((Notification.INFO, 1), (Notification.INFO, 2),
+                                         (Notification.INFO, None), (Notification.WARNING, 4)):
+            notification = create_notification(user, 'Başlık', 'Mesaj', notification_type=notification_type)
+            values = {'created_at': created_at}
+            if hours is not None:
+                values.update(is_read=True, read_at=created_at + timezone.timedelta(hours=hours))
+            Notification.objects.filter(pk=notification.pk).update(**values)
+
+    def test_time_to_read_is_aggregated_in_the_database(self):
+        with self.assertNumQueries(4):
+            stats = get_notification_statistics(Notification.objects.all())
+
+        self.assertEqual((stats['total_notifications'], stats['read_notifications']), (4, 3))
+        self.assertEqual(stats['engagement_rate'], 75.0)
+        self.assertEqual(stats['avg_response_time'], 2.33)
+        self.assertEqual(stats['read_latency_percentiles'], {'p50': 2.0, 'p90': 4.0})
+        self.assertEqual(stats['type_engagement'], [
+            {'notification_type': Notification.INFO, 'count': 3, 'read': 2, 'engagement_rate': 66.67,
+             'avg_response_time': 1.5},
+            {'notification_type': Notification.WARNING, 'count': 1, 'read': 1, 'engagement_rate': 100.0,
+             'avg_response_time': 4.0},
+        ])
+
+    def test_no_reads_gives_zero_latency(self):
+        Notification.objects.update(is_read=False, read_at=None)
+
+        stats = get_notification_statistics(Notification.objects.all())
+
+        self.assertEqual(stats['avg_response_time'], 0)
+        self.assertEqual(stats['read_latency_percentiles'], {'p50': 0, 'p90': 0})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NotificationApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+        other = User.objects.create_user(username='komsu', email='komsu@example.com', password='x')
+        self.notifications = [create_notification(self.user, f'Başlık {i}', 'Mesaj') for i in range(5)]
+        create_notification(other, 'Başlık', 'Mesaj')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, action, data):
+        return self.client.post(f'{NOTIFICATIONS_URL}{action}/', data, format='json')
+
+    def listed_ids(self):
+        seen = []
+        url = NOTIFICATIONS_URL + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_own_notifications_are_paged_newest_first(self):
+        Notification.objects.update(created_at=timezone.now())
+
+        self.assertEqual(self.listed_ids(), [notification.pk for notification in reversed(self.notifications)])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.client.get(NOTIFICATIONS_URL + '?cursor=bozuk').status_code, 404)
+
+    def test_read_returns_the_new_unread_count(self):
+        response = self.post('read', {'ids': [self.notifications[0].pk, self.notifications[1].pk]})
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 3})
+
+        response = self.post('read', {'all': True})
+        self.assertEqual(response.data, {'updated': 3, 'unread_count': 0})
+        self.assertEqual(self.client.get(NOTIFICATIONS_URL + 'unread-count/').data, {'unread_count': 0})
+
+    def test_dismissed_notifications_are_hidden(self):
+        response = self.post('dismiss', {'ids': [self.notifications[0].pk]})
+
+        self.assertEqual(response.data, {'updated': 1, 'unread_count': 4})
+        self.assertNotIn(self.notifications[0].pk, self.listed_ids())
+
+    def test_bulk_actions_need_ids_or_all(self):
+        self.assertEqual(self.post('read', {}).status_code, 400)
+        self.assertEqual(self.post('dismiss', {'ids': []}).status_code, 400)
@@ -8,4 +8,5 @@ urlpatterns = [
     path('api/unread-count/', views.get_unread_count, name='api_notification_unread_count'),
     path('api/recent/', views.get_recent_notifications, name='api_recent_notifications'),
     path('ajax/list/', views.ajax_notification_list, name='ajax_notification_list'),
+    path('stream/', views.notification_stream, name='notification_stream'),
 ] 
\ No newline at end of file
@@ -1,8 +1,20 @@
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from .models import Notification
+from django.views.decorators.http import require_GET
+from core.redis_client import get_async_redis
+from .models import Notification, get_unread_counts, mark_all_as_read
+from .realtime import format_sse, serialize_notification, user_channel
+
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -20,8 +32,7 @@ def notification_list(request):
 def mark_notification_read(request, pk):
     """Mark a notification as read"""
     notification = get_object_or_404(Notification, pk=pk, user=request.user)
-    notification.is_read = True
-    notification.save()
+    notification.mark_as_read()
     
     # If notification has a link, redirect to it
     if notification.link:
@@ -34,15 +45,14 @@ def mark_notification_read(request, pk):
 @login_required
 def mark_all_read(request):
     """Mark all notifications as read"""
-    Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    mark_all_as_read(request.user)
     return redirect('notification_list')
 
 
 @login_required
 def get_unread_count(request):
     """API endpoint to get unread notification count"""
-    count = Notification.objects.filter(user=request.user, is_read=False).count()
-    return JsonResponse({'count': count})
+    return JsonResponse({'count': request.user.get_notification_count()})
 
 
 @login_required
@@ -72,23 +82,67 @@ def ajax_notification_list(request):
     notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:10]
     
     # Serialize notifications to JSON
-    data = []
-    for notification in notifications:
-        data.append({
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'type': notification.notification_type,
-            'is_read': notification.is_read,
-            'link': notification.link,
-            'created_at': notification.created_at.strftime('%d.%m.%Y %H:%M'),
-            'icon': notification.get_icon(),
-        })
+    data = [serialize_notification(notification) for notification in notifications]
     
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = request.user.get_notification_count()
     
     return JsonResponse({
         'notifications': data,
         'unread_count': unread_count,
         'success': True
     })
+
+
+def _initial_unread_count(user_id):
+    try:
+        return get_unread_counts([user_id]).get(user_id, 0)
+    finally:
+        # The stream stays open for minutes and never touches the database again
+        connection.close()
+
+
+async def _notification_events(user_id, unread_count):
+    """Yield Server-Sent Events for a user until the stream reaches its max age"""
+    heartbeat = settings.NOTIFICATION_STREAM_HEARTBEAT
+    deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_AGE
+
+    # Clients reconnect on their own once the stream closes
+    yield 'retry: 5000\n\n'
+    yield format_sse('unread_count', {'count': unread_count})
+
+    redis = get_async_redis()
+    pubsub = redis.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(user_channel(user_id))
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            payload = json.loads(message['data'])
+            yield format_sse(payload['event'], payload['data'])
+    except Exception:
+        logger.warning('Notification stream unavailable', exc_info=True)
+    finally:
+        await pubsub.aclose()
+        await redis.aclose()
+
+
+@login_required
+@require_GET
+async def notification_stream(request):
+    """Server-Sent Events stream of notification changes for the topbar
+
+    An async view: under ASGI an open stream is an idle coroutine waiting on
+    Redis pub/sub, not a worker thread or a database connection.
+    """
+    user = await request.auser()
+    unread_count = await sync_to_async(_initial_unread_count)(user.pk)
+
+    response = StreamingHttpResponse(
+        _notification_events(user.pk, unread_count),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -2,7 +2,11 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin, TabularInline
 from django.utils import timezone
-from .models import Dues, ApartmentDues, Payment, Expense
+from core.badges import invalidate_all_badges
+from .models import (
+    Dues, ApartmentDues, Payment, Expense, MonthlyFinancialSummary,
+    batch_summary_refresh, refresh_dues_statuses, schedule_summary_refresh
+)
 
 
 class ApartmentDuesInline(TabularInline):
@@ -88,12 +92,16 @@ class ApartmentDuesAdmin(ModelAdmin):
     
     @admin.action(description=_("Calculate late fees"))
     def calculate_late_fees(self, request, queryset):
-        updated = 0
-        for due in queryset:
-            if timezone.now().date() > due.due_date and due.status != ApartmentDues.PAID:
-                due.save()  # The save method calculates late fees
-                updated += 1
-        self.message_user(request, _("Late fees calculated for {} dues.").format(updated))
+        selected = ApartmentDues.objects.filter(pk__in=queryset.values('pk'))
+        periods = set(selected.values_list('dues__building', 'dues__year', 'dues__month').distinct().order_by())
+        with batch_summary_refresh():
+            changed = refresh_dues_statuses(selected)
+            for building_id, year, month in periods:
+                schedule_summary_refresh(building_id, year, month)
+        total_changed = sum(changed.values())
+        if total_changed:
+            invalidate_all_badges()
+        self.message_user(request, _("Statuses and late fees updated for {} dues.").format(total_changed))
 
 
 @admin.register(Payment)
@@ -150,3 +158,14 @@ class ExpenseAdmin(ModelAdmin):
         if not change:  # if creating a new object
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(MonthlyFinancialSummary)
+class MonthlyFinancialSummaryAdmin(ModelAdmin):
+    list_display = ('building', 'month', 'year', 'dues_billed', 'dues_paid', 'payments_collected', 'expenses_total', 'updated_at')
+    list_filter = ('building', 'year', 'month')
+    search_fields = ('building__name',)
+    readonly_fields = (
+        'building', 'year', 'month', 'dues_billed', 'dues_paid', 'dues_outstanding', 'late_fees',
+        'payments_collected', 'expenses_total', 'expenses_by_category', 'updated_at'
+    )
@@ -1,8 +1,17 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .api_views import (
+    DuesViewSet, ApartmentDuesViewSet, PaymentViewSet,
+    ExpenseViewSet, BalanceAPIView
+)
 
-# Payments API URLs
-# TODO: Add API views for payments management
+router = DefaultRouter()
+router.register(r'dues', DuesViewSet, basename='dues')
+router.register(r'apartment-dues', ApartmentDuesViewSet, basename='apartment-dues')
+router.register(r'payments', PaymentViewSet, basename='payment')
+router.register(r'expenses', ExpenseViewSet, basename='expense')
 
 urlpatterns = [
-    # Placeholder - add actual API endpoints when needed
+    path('', include(router.urls)),
+    path('balance/', BalanceAPIView.as_view(), name='payment-balance'),
 ]
@@ -0,0 +1,189 @@
+from rest_framework import generics, mixins, viewsets
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.filters import SearchFilter
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, DecimalField, F, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from decimal import Decimal
+from drf_spectacular.utils import extend_schema
+
+from buildings.models import Apartment, Building
+from core.pagination import StableCursorPagination
+from core.permissions import IsAdminUser, IsCaretakerOrAdmin
+from .models import Dues, ApartmentDues, Payment, Expense
+from .serializers import (
+    DuesSerializer, ApartmentDuesSerializer, PaymentSerializer,
+    ExpenseSerializer, BalanceSummarySerializer
+)
+
+
+def visible_buildings(user):
+    """Buildings whose financial records the user may see"""
+    if user.is_superuser:
+        return Building.objects.all()
+    if user.role == user.ADMIN:
+        return Building.objects.filter(admin=user)
+    if user.role == user.CARETAKER:
+        return Building.objects.filter(caretaker=user)
+    return Building.objects.filter(Q(apartments__resident=user) | Q(apartments__owner=user)).distinct()
+
+
+def visible_apartments(user):
+    """Apartments whose dues and payments the user may see"""
+    if user.is_superuser or user.role in (user.ADMIN, user.CARETAKER):
+        return Apartment.objects.filter(building__in=visible_buildings(user))
+    return Apartment.objects.filter(Q(resident=user) | Q(owner=user))
+
+
+class AdminWritePermissionMixin:
+    """Anyone authenticated reads, only building admins write"""
+
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            permission_classes = [IsAuthenticated, IsAdminUser]
+        else:
+            permission_classes = [IsAuthenticated]
+        return [permission() for permission in permission_classes]
+
+
+def _check_building_visible(user, serializer, message):
+    """Reject a create or update that points a record at a building the user cannot see"""
+    building = serializer.validated_data.get('building')
+    if building is not None and not visible_buildings(user).filter(pk=building.pk).exists():
+        raise PermissionDenied(message)
+
+
+class DuesViewSet(AdminWritePermissionMixin, viewsets.ModelViewSet):
+    serializer_class = DuesSerializer
+    pagination_class = StableCursorPagination
+    cursor_ordering = '-pk'
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['building', 'year', 'month']
+
+    def get_queryset(self):
+        return Dues.objects.filter(
+            building__in=visible_buildings(self.request.user)
+        ).select_related('building')
+
+    def perform_create(self, serializer):
+        _check_building_visible(self.request.user, serializer, 'Bu bina için aidat oluşturamazsınız.')
+        serializer.save(created_by=self.request.user)
+
+    def perform_update(self, serializer):
+        _check_building_visible(self.request.user, serializer, 'Aidatı bu binaya taşıyamazsınız.')
+        serializer.save()
+
+
+class ApartmentDuesViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ApartmentDuesSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StableCursorPagination
+    cursor_ordering = '-pk'
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['apartment', 'dues', 'dues__building', 'dues__year', 'dues__month', 'status']
+
+    def get_queryset(self):
+        return ApartmentDues.objects.filter(
+            apartment__in=visible_apartments(self.request.user)
+        ).select_related('dues', 'apartment__building')
+
+
+class PaymentViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Payments can be recorded and listed; corrections go through the admin"""
+    serializer_class = PaymentSerializer
+    pagination_class = StableCursorPagination
+    cursor_ordering = '-pk'
+    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filterset_fields = ['apartment_dues', 'apartment_dues__apartment', 'payment_method', 'payment_date']
+    search_fields = ['transaction_id', 'notes']
+
+    def get_permissions(self):
+        if self.action == 'create':
+            permission_classes = [IsAuthenticated, IsCaretakerOrAdmin]
+        else:
+            permission_classes = [IsAuthenticated]
+        return [permission() for permission in permission_classes]
+
+    def get_queryset(self):
+        return Payment.objects.filter(
+            apartment_dues__apartment__in=visible_apartments(self.request.user)
+        ).select_related('apartment_dues__apartment__building', 'created_by')
+
+    def perform_create(self, serializer):
+        apartment_dues = serializer.validated_data['apartment_dues']
+        if not visible_apartments(self.request.user).filter(pk=apartment_dues.apartment_id).exists():
+            raise PermissionDenied('Bu daire için ödeme kaydedemezsiniz.')
+        # The model default is timezone.now, which would store a datetime in a DateField
+        payment_date = serializer.validated_data.get('payment_date') or timezone.localdate()
+        serializer.save(created_by=self.request.user, payment_date=payment_date)
+
+
+class ExpenseViewSet(viewsets.ModelViewSet):
+    """Building expenses, visible to and managed by building admins only"""
+    serializer_class = ExpenseSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = StableCursorPagination
+    cursor_ordering = '-pk'
+    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filterset_fields = ['building', 'category', 'expense_date']
+    search_fields = ['title', 'description', 'invoice_number']
+
+    def get_queryset(self):
+        return Expense.objects.filter(
+            building__in=visible_buildings(self.request.user)
+        ).select_related('building', 'created_by')
+
+    def perform_create(self, serializer):
+        _check_building_visible(self.request.user, serializer, 'Bu bina için gider kaydedemezsiniz.')
+        serializer.save(created_by=self.request.user)
+
+    def perform_update(self, serializer):
+        _check_building_visible(self.request.user, serializer, 'Gideri bu binaya taşıyamazsınız.')
+        serializer.save()
+
+
+class BalanceAPIView(generics.GenericAPIView):
+    """Outstanding dues, late fees and next due date per apartment of the user"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = BalanceSummarySerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        open_dues = ~Q(dues__status=ApartmentDues.PAID)
+        zero = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+        queryset = visible_apartments(self.request.user).select_related('building').annotate(
+            outstanding=Coalesce(Sum(
+                F('dues__amount') + F('dues__late_fee') - F('dues__paid_amount'), filter=open_dues
+            ), zero),
+            late_fees=Coalesce(Sum('dues__late_fee', filter=open_dues), zero),
+            open_dues=Count('dues', filter=open_dues),
+            overdue_dues=Count('dues', filter=Q(dues__status=ApartmentDues.OVERDUE)),
+            next_due_date=Min('dues__due_date', filter=open_dues & Q(dues__due_date__gte=timezone.now().date()))
+        ).order_by('building__name', 'block', 'number')
+        apartment = self.request.query_params.get('apartment')
+        if apartment:
+            queryset = queryset.filter(pk=apartment)
+        return queryset
+
+    @extend_schema(description='Outstanding balance of the user\'s apartments')
+    def get(self, request):
+        apartments = list(self.get_queryset())
+        rows = [{
+            'apartment': apartment.pk,
+            'apartment_label': str(apartment),
+            'outstanding': apartment.outstanding,
+            'late_fees': apartment.late_fees,
+            'open_dues': apartment.open_dues,
+            'overdue_dues': apartment.overdue_dues,
+            'next_due_date': apartment.next_due_date,
+        } for apartment in apartments]
+        next_dates = [row['next_due_date'] for row in rows if row['next_due_date']]
+        return Response(self.get_serializer({
+            'outstanding': sum((row['outstanding'] for row in rows), Decimal('0')),
+            'late_fees': sum((row['late_fees'] for row in rows), Decimal('0')),
+            'next_due_date': min(next_dates) if next_dates else None,
+            'apartments': rows,
+        }).data)
@@ -0,0 +1,321 @@
+"""
+Bank statement import.
+
+A CSV or CAMT.053 statement of one building is parsed into lines, each line is
+matched to an apartment and its oldest open ``ApartmentDues`` and the payments
+are written with ``bulk_create``. Dues balances are then recomputed from one
+grouped ``Sum`` and saved with ``bulk_update``, so the number of queries does
+not grow with the number of lines. Lines whose ``transaction_id`` has already
+been imported are skipped, which makes re-running an import safe. CAMT lines
+are only matched through an explicit apartment reference in the remittance
+text (``BANK_STATEMENT_APARTMENT_PATTERN``); anything else is left unmatched.
+"""
+import csv
+import io
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+
+from buildings.models import Apartment, Building
+from core.badges import invalidate_all_badges
+
+from .models import ApartmentDues, Payment, batch_summary_refresh, schedule_summary_refresh
+
+CSV = 'csv'
+CAMT = 'camt'
+STATEMENT_FORMATS = (CSV, CAMT)
+
+IMPORT_BATCH_SIZE = 1000
+LOOKUP_CHUNK_SIZE = 900  # stays below SQLite's bound parameter limit
+
+
+class StatementError(ValueError):
+    """The statement file cannot be read"""
+
+
+@dataclass
+class StatementLine:
+    line_no: int
+    payment_date: date
+    amount: Decimal
+    transaction_id: str
+    apartment: str = ''
+    period: str = ''
+    description: str = ''
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool = False
+    created: int = 0
+    total_amount: Decimal = Decimal('0')
+    duplicates: list = field(default_factory=list)
+    unmatched: list = field(default_factory=list)
+    dues_updated: int = 0
+
+
+def _parse_amount(value):
+    value = (value or '').strip().replace(' ', '')
+    # Accept both 1.234,56 and 1,234.56 style amounts
+    if ',' in value and (value.rfind(',') > value.rfind('.')):
+        value = value.replace('.', '').replace(',', '.')
+    else:
+        value = value.replace(',', '')
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise StatementError(f'Geçersiz tutar: {value!r}')
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for pattern in (r'(\d{4})-(\d{2})-(\d{2})', r'(\d{2})[./](\d{2})[./](\d{4})'):
+        match = re.match(pattern, value)
+        if match:
+            parts = [int(part) for part in match.groups()]
+            year, month, day = parts if parts[0] > 31 else parts[::-1]
+            return date(year, month, day)
+    raise StatementError(f'Geçersiz tarih: {value!r}')
+
+
+def parse_csv_statement(fileobj):
+    """Read ``date, amount, transaction_id, apartment[, period, description]`` columns"""
+    text = fileobj.read()
+    if isinstance(text, bytes):
+        text = text.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {'date', 'amount', 'transaction_id'} - set(reader.fieldnames or ())
+    if missing:
+        raise StatementError(f'Eksik sütunlar: {", ".join(sorted(missing))}')
+
+    lines = []
+    for line_no, row in enumerate(reader, start=2):
+        try:
+            lines.append(StatementLine(
+                line_no=line_no,
+                payment_date=_parse_date(row['date']),
+                amount=_parse_amount(row['amount']),
+                transaction_id=(row['transaction_id'] or '').strip(),
+                apartment=(row.get('apartment') or '').strip(),
+                period=(row.get('period') or '').strip(),
+                description=(row.get('description') or '').strip(),
+            ))
+        except StatementError as exc:
+            raise StatementError(f'Satır {line_no}: {exc}')
+    return lines
+
+
+def _text(element, path):
+    found = element.find(path)
+    return (found.text or '').strip() if found is not None and found.text else ''
+
+
+def parse_camt_statement(fileobj):
+    """Read the credit entries of an ISO 20022 CAMT.053 statement"""
+    try:
+        root = ET.parse(fileobj).getroot()
+    except ET.ParseError as exc:
+        raise StatementError(f'CAMT dosyası okunamadı: {exc}')
+
+    lines = []
+    for line_no, entry in enumerate(root.iterfind('.//{*}Ntry'), start=1):
+        if _text(entry, '{*}CdtDbtInd') != 'CRDT':
+            continue
+        remittance = ' '.join(
+            (node.text or '').strip() for node in entry.iterfind('.//{*}Ustrd') if node.text
+        )
+        lines.append(StatementLine(
+            line_no=line_no,
+            payment_date=_parse_date(_text(entry, '{*}BookgDt/{*}Dt') or _text(entry, '{*}ValDt/{*}Dt')),
+            amount=_parse_amount(_text(entry, '{*}Amt')),
+            transaction_id=(
+                _text(entry, '{*}AcctSvcrRef')
+                or _text(entry, './/{*}Refs/{*}EndToEndId')
+                or _text(entry, './/{*}Refs/{*}TxId')
+            ),
+            description=remittance,
+        ))
+    return lines
+
+
+def parse_statement(fileobj, statement_format=CSV):
+    if statement_format == CAMT:
+        return parse_camt_statement(fileobj)
+    return parse_csv_statement(fileobj)
+
+
+def _apartment_key(value):
+    return re.sub(r'[\s\-/]', '', value).upper()
+
+
+def _apartment_reference_pattern():
+    return re.compile(settings.BANK_STATEMENT_APARTMENT_PATTERN, re.IGNORECASE)
+
+
+def _find_apartment(line, apartments):
+    """Return ``(apartment_id, reason)``, with ``apartment_id`` None when the line cannot be placed"""
+    if line.apartment:
+        apartment_id = apartments.get(_apartment_key(line.apartment))
+        return apartment_id, None if apartment_id else 'Daire bulunamadı'
+
+    # CAMT lines carry the apartment in the remittance text, e.g. "Aidat Ekim daire A-12".
+    # Only an explicit reference counts; loose numbers such as "2. taksit" are never used.
+    references = [
+        (match.group('block') or '') + match.group('number')
+        for match in _apartment_reference_pattern().finditer(line.description)
+    ]
+    if not references:
+        return None, 'Açıklamada daire referansı yok'
+    candidates = {apartments.get(_apartment_key(reference)) for reference in references}
+    if None in candidates:
+        return None, 'Daire bulunamadı'
+    if len(candidates) > 1:
+        return None, 'Birden fazla daire referansı'
+    return candidates.pop(), None
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _existing_transaction_ids(transaction_ids):
+    existing = set()
+    for chunk in _chunks(transaction_ids):
+        existing.update(
+            Payment.objects.filter(transaction_id__in=chunk).values_list('transaction_id', flat=True)
+        )
+    return existing
+
+
+def match_statement(building, lines):
+    """Pair statement lines with apartment dues
+
+    Returns ``(matches, result)`` where ``matches`` is a list of
+    ``(line, apartment_dues)`` pairs and ``result`` lists skipped lines.
+    """
+    result = ImportResult()
+
+    apartments = {}
+    numbers = {}
+    for pk, block, number in Apartment.objects.filter(building=building).values_list('pk', 'block', 'number'):
+        apartments[_apartment_key(f'{block}{number}' if block else number)] = pk
+        numbers.setdefault(_apartment_key(number), set()).add(pk)
+    # A bare number only identifies an apartment when no other block shares it
+    for key, pks in numbers.items():
+        if len(pks) == 1:
+            apartments.setdefault(key, pks.pop())
+
+    # Open dues per apartment, oldest first, with the balance still owed
+    open_dues = {}
+    for dues in ApartmentDues.objects.filter(
+        apartment__building=building
+    ).exclude(status=ApartmentDues.PAID).select_related('dues').order_by('due_date', 'pk'):
+        dues.remaining = dues.amount + dues.late_fee - dues.paid_amount
+        open_dues.setdefault(dues.apartment_id, []).append(dues)
+
+    existing = _existing_transaction_ids({line.transaction_id for line in lines if line.transaction_id})
+    seen = set()
+    matches = []
+    for line in lines:
+        if not line.transaction_id:
+            result.unmatched.append((line.line_no, 'İşlem numarası yok'))
+            continue
+        if line.transaction_id in existing or line.transaction_id in seen:
+            result.duplicates.append((line.line_no, line.transaction_id))
+            continue
+        if line.amount <= 0:
+            result.unmatched.append((line.line_no, 'Tutar sıfır veya negatif'))
+            continue
+
+        apartment_id, reason = _find_apartment(line, apartments)
+        if apartment_id is None:
+            result.unmatched.append((line.line_no, reason))
+            continue
+
+        candidates = open_dues.get(apartment_id, [])
+        if line.period:
+            candidates = [dues for dues in candidates if f'{dues.dues.year}-{dues.dues.month:02d}' == line.period]
+        target = next((dues for dues in candidates if dues.remaining > 0), None)
+        if target is None:
+            result.unmatched.append((line.line_no, 'Açık aidat bulunamadı'))
+            continue
+
+        target.remaining -= line.amount
+        seen.add(line.transaction_id)
+        matches.append((line, target))
+        result.created += 1
+        result.total_amount += line.amount
+    return matches, result
+
+
+def recalculate_dues_balances(apartment_dues_ids):
+    """Recompute paid amounts and statuses from the payments table
+
+    One grouped ``Sum`` per chunk of dues and a ``bulk_update`` of the rows.
+    Returns the updated dues.
+    """
+    updated = []
+    for chunk in _chunks(apartment_dues_ids):
+        totals = {
+            row['apartment_dues']: row
+            for row in Payment.objects.filter(apartment_dues_id__in=chunk).values('apartment_dues').annotate(
+                total=Sum('amount'), last_payment=Max('payment_date')
+            ).order_by()
+        }
+        for dues in ApartmentDues.objects.filter(pk__in=chunk).select_related('dues'):
+            row = totals.get(dues.pk, {})
+            dues.paid_amount = row.get('total') or Decimal('0')
+            dues.last_payment_date = row.get('last_payment')
+            dues.update_status()
+            updated.append(dues)
+    ApartmentDues.objects.bulk_update(
+        updated, ['paid_amount', 'last_payment_date', 'status', 'late_fee'], batch_size=IMPORT_BATCH_SIZE
+    )
+    return updated
+
+
+def import_statement(building, lines, created_by=None, dry_run=False):
+    """Create the payments of a parsed statement and update the matched dues"""
+    if dry_run:
+        matches, result = match_statement(building, lines)
+        result.dry_run = True
+        return result
+
+    with transaction.atomic(), batch_summary_refresh():
+        # Serialize imports of a building so a statement cannot be imported twice concurrently
+        Building.objects.select_for_update().filter(pk=building.pk).exists()
+        matches, result = match_statement(building, lines)
+        if not matches:
+            return result
+
+        Payment.objects.bulk_create([
+            Payment(
+                apartment_dues=dues,
+                amount=line.amount,
+                payment_date=line.payment_date,
+                payment_method=Payment.BANK_TRANSFER,
+                transaction_id=line.transaction_id,
+                notes=line.description or None,
+                created_by=created_by,
+            )
+            for line, dues in matches
+        ], batch_size=IMPORT_BATCH_SIZE)
+
+        updated = recalculate_dues_balances({dues.pk for _line, dues in matches})
+        result.dues_updated = len(updated)
+
+        periods = {(dues.dues.year, dues.dues.month) for dues in updated}
+        periods.update((line.payment_date.year, line.payment_date.month) for line, _dues in matches)
+        for year, month in periods:
+            schedule_summary_refresh(building.pk, year, month)
+
+    invalidate_all_badges()
+    return result
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from buildings.models import Building
+from payments.models import generate_dues_for_period
+
+
+class Command(BaseCommand):
+    help = 'Generate apartment dues for a month across all (or selected) buildings'
+
+    def add_arguments(self, parser):
+        now = timezone.now()
+        parser.add_argument(
+            '--month',
+            type=int,
+            default=now.month,
+            help='Month of the dues (defaults to the current month)',
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            default=now.year,
+            help='Year of the dues (defaults to the current year)',
+        )
+        parser.add_argument(
+            '--building',
+            type=int,
+            action='append',
+            help='Only generate dues for the given building ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--amount',
+            type=Decimal,
+            help='Create missing building dues records with this amount',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of apartment dues inserted per query',
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options['month'] <= 12:
+            raise CommandError('Month must be between 1 and 12')
+
+        buildings = Building.objects.all()
+        if options['building']:
+            buildings = buildings.filter(pk__in=options['building'])
+
+        dues_created, apartment_dues_created = generate_dues_for_period(
+            options['month'],
+            options['year'],
+            buildings=buildings,
+            amount=options['amount'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["month"]}/{options["year"]}: created {dues_created} dues records '
+            f'and {apartment_dues_created} apartment dues'
+        ))
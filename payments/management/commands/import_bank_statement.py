@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from buildings.models import Building
+from users.models import User
+from payments.imports import CAMT, CSV, STATEMENT_FORMATS, StatementError, import_statement, parse_statement
+
+
+class Command(BaseCommand):
+    help = 'Import bank transfers from a CSV or CAMT.053 statement as dues payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('statement', help='Path to the statement file')
+        parser.add_argument(
+            '--building',
+            type=int,
+            required=True,
+            help='Building ID the statement belongs to',
+        )
+        parser.add_argument(
+            '--format',
+            choices=STATEMENT_FORMATS,
+            help='Statement format (defaults to camt for .xml files, csv otherwise)',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user recorded as creator of the payments',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Match the statement and report the result without writing payments',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            building = Building.objects.get(pk=options['building'])
+        except Building.DoesNotExist:
+            raise CommandError(f'Building {options["building"]} does not exist')
+
+        created_by = None
+        if options['user']:
+            created_by = User.objects.filter(email=options['user']).first()
+            if created_by is None:
+                raise CommandError(f'User {options["user"]} does not exist')
+
+        statement_format = options['format']
+        if statement_format is None:
+            statement_format = CAMT if options['statement'].lower().endswith('.xml') else CSV
+
+        try:
+            with open(options['statement'], 'rb') as statement:
+                lines = parse_statement(statement, statement_format)
+        except (OSError, StatementError) as exc:
+            raise CommandError(str(exc))
+
+        result = import_statement(building, lines, created_by=created_by, dry_run=options['dry_run'])
+
+        for line_no, reason in result.unmatched:
+            self.stdout.write(self.style.WARNING(f'Line {line_no}: {reason}'))
+        verb = 'Would import' if result.dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} payments ({result.total_amount}), '
+            f'{len(result.duplicates)} duplicates skipped, {len(result.unmatched)} unmatched'
+        ))
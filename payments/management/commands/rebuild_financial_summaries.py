@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from buildings.models import Building
+from payments.models import rebuild_financial_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly financial summary table from raw dues, payments and expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--building',
+            type=int,
+            action='append',
+            help='Only rebuild the given building ID (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        buildings = None
+        if options['building']:
+            buildings = Building.objects.filter(pk__in=options['building'])
+
+        count = rebuild_financial_summaries(buildings)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} monthly financial summaries'))
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from buildings.models import Building
+from payments.models import refresh_overdue_dues
+
+
+class Command(BaseCommand):
+    help = 'Mark dues past their due date as overdue and recalculate late fees'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--building',
+            type=int,
+            action='append',
+            help='Only process the given building ID (can be repeated)',
+        )
+        parser.add_argument(
+            '--date',
+            help='Evaluate as of this date (YYYY-MM-DD, defaults to today)',
+        )
+
+    def handle(self, *args, **options):
+        buildings = None
+        if options['building']:
+            buildings = Building.objects.filter(pk__in=options['building'])
+
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be in YYYY-MM-DD format')
+
+        changed = refresh_overdue_dues(buildings, today)
+        details = ', '.join(f'{status}: {count}' for status, count in changed.items())
+        self.stdout.write(self.style.SUCCESS(f'Updated {sum(changed.values())} apartment dues ({details})'))
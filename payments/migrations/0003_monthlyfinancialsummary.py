@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buildings', '0003_building_common_areas_building_construction_year_and_more'),
+        ('payments', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinancialSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='year')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='month')),
+                ('dues_billed', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='dues billed')),
+                ('dues_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='dues paid')),
+                ('dues_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='dues outstanding')),
+                ('late_fees', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='late fees')),
+                ('payments_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='payments collected')),
+                ('expenses_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='total expenses')),
+                ('expenses_by_category', models.JSONField(blank=True, default=dict, verbose_name='expenses by category')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='buildings.building')),
+            ],
+            options={
+                'verbose_name': 'Monthly Financial Summary',
+                'verbose_name_plural': 'Monthly Financial Summaries',
+                'ordering': ['year', 'month'],
+                'unique_together': {('building', 'year', 'month')},
+            },
+        ),
+    ]
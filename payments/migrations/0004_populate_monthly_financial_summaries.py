@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+AMOUNT_FIELDS = (
+    'dues_billed', 'dues_paid', 'dues_outstanding', 'late_fees',
+    'payments_collected', 'expenses_total',
+)
+
+
+def populate_summaries(apps, schema_editor):
+    # Self-contained on purpose: the live aggregation helper may change after this migration
+    ApartmentDues = apps.get_model('payments', 'ApartmentDues')
+    Payment = apps.get_model('payments', 'Payment')
+    Expense = apps.get_model('payments', 'Expense')
+    MonthlyFinancialSummary = apps.get_model('payments', 'MonthlyFinancialSummary')
+
+    rows = {}
+
+    def summary(key):
+        if key not in rows:
+            rows[key] = {field: Decimal('0') for field in AMOUNT_FIELDS}
+            rows[key]['expenses_by_category'] = {}
+        return rows[key]
+
+    dues_rows = ApartmentDues.objects.values('dues__building', 'dues__year', 'dues__month').annotate(
+        billed=models.Sum('amount'),
+        paid=models.Sum('paid_amount'),
+        outstanding=models.Sum(models.Case(
+            models.When(paid_amount__lt=models.F('amount'), then=models.F('amount') - models.F('paid_amount')),
+            default=models.Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        )),
+        fees=models.Sum('late_fee')
+    ).order_by()
+    for row in dues_rows:
+        values = summary((row['dues__building'], row['dues__year'], row['dues__month']))
+        values['dues_billed'] = row['billed'] or Decimal('0')
+        values['dues_paid'] = row['paid'] or Decimal('0')
+        values['dues_outstanding'] = row['outstanding'] or Decimal('0')
+        values['late_fees'] = row['fees'] or Decimal('0')
+
+    payment_rows = Payment.objects.annotate(
+        year=ExtractYear('payment_date'),
+        month=ExtractMonth('payment_date')
+    ).values('apartment_dues__apartment__building', 'year', 'month').annotate(total=models.Sum('amount')).order_by()
+    for row in payment_rows:
+        key = (row['apartment_dues__apartment__building'], row['year'], row['month'])
+        summary(key)['payments_collected'] = row['total'] or Decimal('0')
+
+    expense_rows = Expense.objects.annotate(
+        year=ExtractYear('expense_date'),
+        month=ExtractMonth('expense_date')
+    ).values('building', 'year', 'month', 'category').annotate(total=models.Sum('amount')).order_by()
+    for row in expense_rows:
+        values = summary((row['building'], row['year'], row['month']))
+        total = row['total'] or Decimal('0')
+        values['expenses_total'] += total
+        values['expenses_by_category'][row['category']] = str(total)
+
+    MonthlyFinancialSummary.objects.all().delete()
+    MonthlyFinancialSummary.objects.bulk_create([
+        MonthlyFinancialSummary(building_id=building_id, year=year, month=month, **values)
+        for (building_id, year, month), values in rows.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_monthlyfinancialsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
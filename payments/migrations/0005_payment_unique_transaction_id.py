@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def release_duplicate_transaction_ids(apps, schema_editor):
+    # Keep the oldest payment per transaction ID and move the ID of later copies into their notes
+    Payment = apps.get_model('payments', 'Payment')
+    duplicated = Payment.objects.exclude(transaction_id__isnull=True).exclude(transaction_id='').values(
+        'transaction_id'
+    ).annotate(total=models.Count('id')).filter(total__gt=1).values_list('transaction_id', flat=True)
+    for transaction_id in list(duplicated):
+        for payment in Payment.objects.filter(transaction_id=transaction_id).order_by('created_at', 'pk')[1:]:
+            note = f'Yinelenen işlem numarası: {transaction_id}'
+            payment.notes = f'{payment.notes}\n{note}' if payment.notes else note
+            payment.transaction_id = None
+            payment.save(update_fields=['notes', 'transaction_id'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_populate_monthly_financial_summaries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(release_duplicate_transaction_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id__isnull', False), models.Q(('transaction_id', ''), _negated=True)), fields=('transaction_id',), name='payment_unique_transaction_id'),
+        ),
+    ]
@@ -1,10 +1,16 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum, F, Q, Case, When, Value, Min, OuterRef, Subquery
+from django.db.models.functions import ExtractYear, ExtractMonth, Round
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from contextlib import contextmanager
+from datetime import timedelta
 from decimal import Decimal
 from dateutil.relativedelta import relativedelta
+import threading
 from buildings.models import Building, Apartment
 from users.models import User
+from core.badges import invalidate_all_badges
 
 
 class Dues(models.Model):
@@ -37,19 +43,11 @@ class Dues(models.Model):
             if self.due_date < timezone.now().date():
                 self.due_date = timezone.now().date() + timezone.timedelta(days=5)
         
-        super().save(*args, **kwargs)
-        
-        # Create individual apartment dues
-        apartments = Apartment.objects.filter(building=self.building)
-        for apartment in apartments:
-            ApartmentDues.objects.get_or_create(
-                dues=self,
-                apartment=apartment,
-                defaults={
-                    'amount': self.amount,
-                    'due_date': self.due_date
-                }
-            )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Create individual apartment dues
+            generate_apartment_dues(self)
 
 
 class ApartmentDues(models.Model):
@@ -84,6 +82,13 @@ class ApartmentDues(models.Model):
         unique_together = ['dues', 'apartment']
     
     def save(self, *args, **kwargs):
+        self.update_status()
+        super().save(*args, **kwargs)
+        
+        schedule_summary_refresh(self.dues.building_id, self.dues.year, self.dues.month)
+    
+    def update_status(self):
+        """Set status and late fee from the paid amount and due date"""
         # Update status based on payment
         if self.paid_amount >= self.amount:
             self.status = self.PAID
@@ -96,12 +101,10 @@ class ApartmentDues(models.Model):
             days_late = (timezone.now().date() - self.due_date).days
             if days_late > 0:
                 monthly_rate = self.dues.late_fee_percentage / 100
-                months_late = days_late // 30
+                months_late = days_late // LATE_FEE_PERIOD_DAYS
                 self.late_fee = self.amount * monthly_rate * months_late
         else:
             self.status = self.UNPAID
-            
-        super().save(*args, **kwargs)
 
 
 class Payment(models.Model):
@@ -135,15 +138,24 @@ class Payment(models.Model):
         verbose_name = _('Payment')
         verbose_name_plural = _('Payments')
         ordering = ['-payment_date']
+        constraints = [
+            # Bank statement imports skip lines whose transaction ID already exists
+            models.UniqueConstraint(
+                fields=['transaction_id'],
+                condition=Q(transaction_id__isnull=False) & ~Q(transaction_id=''),
+                name='payment_unique_transaction_id',
+            ),
+        ]
     
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        # Update the apartment dues with this payment
-        apartment_dues = self.apartment_dues
-        apartment_dues.paid_amount += self.amount
-        apartment_dues.last_payment_date = self.payment_date
-        apartment_dues.save()
+        with batch_summary_refresh():
+            super().save(*args, **kwargs)
+            
+            # Update the apartment dues with this payment
+            apartment_dues = self.apartment_dues
+            apartment_dues.paid_amount += self.amount
+            apartment_dues.last_payment_date = self.payment_date
+            apartment_dues.save()
 
 
 class Expense(models.Model):
@@ -184,3 +196,313 @@ class Expense(models.Model):
         verbose_name = _('Expense')
         verbose_name_plural = _('Expenses')
         ordering = ['-expense_date']
+
+
+class MonthlyFinancialSummary(models.Model):
+    """Materialized per-building monthly totals read by the financial reports"""
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='monthly_summaries')
+    year = models.PositiveSmallIntegerField(_('year'))
+    month = models.PositiveSmallIntegerField(_('month'))
+    dues_billed = models.DecimalField(_('dues billed'), max_digits=14, decimal_places=2, default=0)
+    dues_paid = models.DecimalField(_('dues paid'), max_digits=14, decimal_places=2, default=0)
+    dues_outstanding = models.DecimalField(_('dues outstanding'), max_digits=14, decimal_places=2, default=0)
+    late_fees = models.DecimalField(_('late fees'), max_digits=14, decimal_places=2, default=0)
+    payments_collected = models.DecimalField(_('payments collected'), max_digits=14, decimal_places=2, default=0)
+    expenses_total = models.DecimalField(_('total expenses'), max_digits=14, decimal_places=2, default=0)
+    expenses_by_category = models.JSONField(_('expenses by category'), default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.building.name} - {self.month}/{self.year}"
+    
+    @property
+    def net_income(self):
+        return self.payments_collected - self.expenses_total
+    
+    class Meta:
+        verbose_name = _('Monthly Financial Summary')
+        verbose_name_plural = _('Monthly Financial Summaries')
+        unique_together = ['building', 'year', 'month']
+        ordering = ['year', 'month']
+
+
+# Helper functions
+LATE_FEE_PERIOD_DAYS = 30
+
+SUMMARY_AMOUNT_FIELDS = (
+    'dues_billed', 'dues_paid', 'dues_outstanding', 'late_fees',
+    'payments_collected', 'expenses_total',
+)
+
+_summary_state = threading.local()
+
+
+def _empty_summary():
+    summary = {field: Decimal('0') for field in SUMMARY_AMOUNT_FIELDS}
+    summary['expenses_by_category'] = {}
+    return summary
+
+
+def _collect_summary_rows(apartment_dues, payments, expenses):
+    """Aggregate dues, payments and expenses into per (building, year, month) rows"""
+    rows = {}
+    
+    dues_rows = apartment_dues.values(
+        'dues__building', 'dues__year', 'dues__month'
+    ).annotate(
+        billed=Sum('amount'),
+        paid=Sum('paid_amount'),
+        outstanding=Sum(Case(
+            When(paid_amount__lt=F('amount'), then=F('amount') - F('paid_amount')),
+            default=Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        )),
+        fees=Sum('late_fee')
+    ).order_by()
+    for row in dues_rows:
+        key = (row['dues__building'], row['dues__year'], row['dues__month'])
+        summary = rows.setdefault(key, _empty_summary())
+        summary['dues_billed'] = row['billed'] or Decimal('0')
+        summary['dues_paid'] = row['paid'] or Decimal('0')
+        summary['dues_outstanding'] = row['outstanding'] or Decimal('0')
+        summary['late_fees'] = row['fees'] or Decimal('0')
+    
+    payment_rows = payments.annotate(
+        year=ExtractYear('payment_date'),
+        month=ExtractMonth('payment_date')
+    ).values('apartment_dues__apartment__building', 'year', 'month').annotate(total=Sum('amount')).order_by()
+    for row in payment_rows:
+        key = (row['apartment_dues__apartment__building'], row['year'], row['month'])
+        rows.setdefault(key, _empty_summary())['payments_collected'] = row['total'] or Decimal('0')
+    
+    expense_rows = expenses.annotate(
+        year=ExtractYear('expense_date'),
+        month=ExtractMonth('expense_date')
+    ).values('building', 'year', 'month', 'category').annotate(total=Sum('amount')).order_by()
+    for row in expense_rows:
+        key = (row['building'], row['year'], row['month'])
+        summary = rows.setdefault(key, _empty_summary())
+        total = row['total'] or Decimal('0')
+        summary['expenses_total'] += total
+        summary['expenses_by_category'][row['category']] = str(total)
+    
+    return rows
+
+
+def refresh_financial_summary(building_id, year, month):
+    """Recalculate the summary row of a single building and month"""
+    rows = _collect_summary_rows(
+        ApartmentDues.objects.filter(dues__building_id=building_id, dues__year=year, dues__month=month),
+        Payment.objects.filter(
+            apartment_dues__apartment__building_id=building_id,
+            payment_date__year=year,
+            payment_date__month=month
+        ),
+        Expense.objects.filter(building_id=building_id, expense_date__year=year, expense_date__month=month)
+    )
+    defaults = rows.get((building_id, year, month), _empty_summary())
+    summary, _created = MonthlyFinancialSummary.objects.update_or_create(
+        building_id=building_id, year=year, month=month, defaults=defaults
+    )
+    return summary
+
+
+def schedule_summary_refresh(building_id, year, month):
+    """Refresh a summary row now, or at the end of the enclosing batch_summary_refresh block"""
+    pending = getattr(_summary_state, 'pending', None)
+    if pending is None:
+        refresh_financial_summary(building_id, year, month)
+    else:
+        pending.add((building_id, year, month))
+
+
+@contextmanager
+def batch_summary_refresh():
+    """Collect summary refreshes and run each affected bucket once on exit"""
+    if getattr(_summary_state, 'pending', None) is not None:
+        yield
+        return
+    
+    _summary_state.pending = set()
+    try:
+        yield
+        pending = _summary_state.pending
+    finally:
+        _summary_state.pending = None
+    
+    for building_id, year, month in sorted(pending):
+        refresh_financial_summary(building_id, year, month)
+
+
+def generate_apartment_dues(dues, batch_size=500):
+    """Create the missing apartment dues of a building dues record in bulk"""
+    with transaction.atomic():
+        missing_apartment_ids = Apartment.objects.filter(
+            building_id=dues.building_id
+        ).exclude(dues__dues=dues).values_list('pk', flat=True)
+        
+        apartment_dues = []
+        for apartment_id in missing_apartment_ids:
+            item = ApartmentDues(
+                dues=dues,
+                apartment_id=apartment_id,
+                amount=dues.amount,
+                due_date=dues.due_date
+            )
+            item.update_status()
+            apartment_dues.append(item)
+        
+        if not apartment_dues:
+            return 0
+        
+        # ignore_conflicts hides skipped rows, so count what actually landed
+        before = ApartmentDues.objects.filter(dues=dues).count()
+        ApartmentDues.objects.bulk_create(apartment_dues, batch_size=batch_size, ignore_conflicts=True)
+        created = ApartmentDues.objects.filter(dues=dues).count() - before
+        
+        schedule_summary_refresh(dues.building_id, dues.year, dues.month)
+        invalidate_all_badges()
+    
+    return created
+
+
+def generate_dues_for_period(month, year, buildings=None, amount=None, created_by=None, batch_size=500):
+    """Fan out the dues of a month to every apartment of the given buildings
+    
+    Buildings without a dues record for the month get one when ``amount`` is given.
+    Returns a ``(dues_created, apartment_dues_created)`` tuple.
+    """
+    if buildings is None:
+        buildings = Building.objects.all()
+    
+    dues_created = 0
+    period_dues = Dues.objects.filter(month=month, year=year)
+    
+    with transaction.atomic(), batch_summary_refresh():
+        period_apartment_dues = ApartmentDues.objects.filter(dues__in=period_dues.filter(building__in=buildings))
+        before = period_apartment_dues.count()
+        
+        for dues in period_dues.filter(building__in=buildings):
+            generate_apartment_dues(dues, batch_size=batch_size)
+        
+        if amount is not None:
+            # A subquery, as exclude() across the dues relation would test month and year separately
+            missing = buildings.exclude(pk__in=period_dues.values('building'))
+            for building in missing:
+                # Dues.save fans out to the new record's apartments
+                Dues.objects.create(building=building, amount=amount, month=month, year=year, created_by=created_by)
+                dues_created += 1
+        
+        apartment_dues_created = period_apartment_dues.count() - before
+    
+    return dues_created, apartment_dues_created
+
+
+def rebuild_financial_summaries(buildings=None):
+    """Rebuild summary rows from the raw dues, payments and expenses tables"""
+    apartment_dues = ApartmentDues.objects.all()
+    payments = Payment.objects.all()
+    expenses = Expense.objects.all()
+    summaries = MonthlyFinancialSummary.objects.all()
+    
+    if buildings is not None:
+        apartment_dues = apartment_dues.filter(dues__building__in=buildings)
+        payments = payments.filter(apartment_dues__apartment__building__in=buildings)
+        expenses = expenses.filter(building__in=buildings)
+        summaries = summaries.filter(building__in=buildings)
+    
+    rows = _collect_summary_rows(apartment_dues, payments, expenses)
+    with transaction.atomic():
+        summaries.delete()
+        MonthlyFinancialSummary.objects.bulk_create([
+            MonthlyFinancialSummary(building_id=building_id, year=year, month=month, **values)
+            for (building_id, year, month), values in rows.items()
+        ], batch_size=500)
+    
+    return len(rows)
+
+
+def _months_late(today, oldest_due_date):
+    """Whole late-fee periods since ``due_date`` as a Case over date ranges
+
+    Mirrors ``days_late // LATE_FEE_PERIOD_DAYS`` from ApartmentDues.update_status
+    without date arithmetic in SQL, which differs between database backends.
+    """
+    periods = (today - oldest_due_date).days // LATE_FEE_PERIOD_DAYS
+    whens = [
+        When(due_date__lte=today - timedelta(days=LATE_FEE_PERIOD_DAYS * months), then=Value(months))
+        for months in range(periods, 0, -1)
+    ]
+    if not whens:
+        return Value(0)
+    return Case(*whens, default=Value(0), output_field=models.IntegerField())
+
+
+def _dues_status_changes(apartment_dues, today):
+    """``(status, rows to change, update values)`` following ApartmentDues.update_status"""
+    # Fully paid wins first, as in update_status, so zero-amount dues stay paid
+    unpaid = Q(paid_amount__lte=0, paid_amount__lt=F('amount'))
+    changes = [
+        (status, apartment_dues.filter(condition).exclude(status=status), {'status': status})
+        for status, condition in (
+            (ApartmentDues.PAID, Q(paid_amount__gte=F('amount'))),
+            (ApartmentDues.PARTIAL, Q(paid_amount__gt=0, paid_amount__lt=F('amount'))),
+            (ApartmentDues.UNPAID, unpaid & Q(due_date__gte=today)),
+        )
+    ]
+    
+    overdue = apartment_dues.filter(unpaid, due_date__lt=today)
+    oldest = overdue.aggregate(oldest=Min('due_date'))['oldest']
+    if oldest:
+        rate = Subquery(Dues.objects.filter(pk=OuterRef('dues_id')).values('late_fee_percentage')[:1])
+        late_fee = Round(F('amount') * rate / 100 * _months_late(today, oldest), 2)
+        changes.append((
+            ApartmentDues.OVERDUE,
+            overdue.exclude(status=ApartmentDues.OVERDUE, late_fee=late_fee),
+            {'status': ApartmentDues.OVERDUE, 'late_fee': late_fee}
+        ))
+    return changes
+
+
+def refresh_dues_statuses(apartment_dues, today=None):
+    """Recalculate status and late fee of apartment dues with set-based UPDATEs
+
+    Applies the rules of ApartmentDues.update_status to a whole queryset without
+    loading rows into Python. Only rows whose values change are written.
+    Returns the number of changed rows per new status.
+    """
+    today = today or timezone.now().date()
+    changed = dict.fromkeys(dict(ApartmentDues.STATUS_CHOICES), 0)
+    for status, rows, values in _dues_status_changes(apartment_dues, today):
+        changed[status] = rows.update(**values)
+    return changed
+
+
+def refresh_overdue_dues(buildings=None, today=None):
+    """Move dues past their due date to overdue and recompute late fees per building
+
+    Each building is updated in its own transaction, then the monthly summaries
+    of the periods that changed are refreshed. Returns changed rows per status.
+    """
+    if buildings is None:
+        buildings = Building.objects.all()
+    today = today or timezone.now().date()
+    
+    totals = dict.fromkeys(dict(ApartmentDues.STATUS_CHOICES), 0)
+    for building_id in buildings.values_list('pk', flat=True).order_by('pk'):
+        apartment_dues = ApartmentDues.objects.filter(
+            dues_id__in=Dues.objects.filter(building_id=building_id).values('pk')
+        )
+        with transaction.atomic(), batch_summary_refresh():
+            changes = _dues_status_changes(apartment_dues, today)
+            periods = set()
+            for _status, rows, _values in changes:
+                periods.update(rows.values_list('dues__year', 'dues__month').distinct().order_by())
+            for status, rows, values in changes:
+                totals[status] += rows.update(**values)
+            for year, month in periods:
+                schedule_summary_refresh(building_id, year, month)
+    
+    if any(totals.values()):
+        invalidate_all_badges()
+    return totals
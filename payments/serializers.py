@@ -0,0 +1,81 @@
+from rest_framework import serializers
+from .models import Dues, ApartmentDues, Payment, Expense
+
+
+class DuesSerializer(serializers.ModelSerializer):
+    building_name = serializers.ReadOnlyField(source='building.name')
+    
+    class Meta:
+        model = Dues
+        fields = [
+            'id', 'building', 'building_name', 'amount', 'month', 'year',
+            'due_date', 'late_fee_percentage', 'description', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at']
+        extra_kwargs = {'due_date': {'required': False}}
+
+
+class ApartmentDuesSerializer(serializers.ModelSerializer):
+    apartment_label = serializers.ReadOnlyField(source='apartment.__str__')
+    building = serializers.ReadOnlyField(source='dues.building_id')
+    month = serializers.ReadOnlyField(source='dues.month')
+    year = serializers.ReadOnlyField(source='dues.year')
+    status_display = serializers.ReadOnlyField(source='get_status_display')
+    remaining_amount = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ApartmentDues
+        fields = [
+            'id', 'dues', 'apartment', 'apartment_label', 'building', 'month', 'year',
+            'amount', 'paid_amount', 'late_fee', 'remaining_amount', 'due_date',
+            'status', 'status_display', 'last_payment_date'
+        ]
+        read_only_fields = fields
+    
+    def get_remaining_amount(self, obj):
+        return max(obj.amount + obj.late_fee - obj.paid_amount, 0)
+
+
+class PaymentSerializer(serializers.ModelSerializer):
+    apartment = serializers.ReadOnlyField(source='apartment_dues.apartment_id')
+    apartment_label = serializers.ReadOnlyField(source='apartment_dues.apartment.__str__')
+    payment_method_display = serializers.ReadOnlyField(source='get_payment_method_display')
+    
+    class Meta:
+        model = Payment
+        fields = [
+            'id', 'apartment_dues', 'apartment', 'apartment_label', 'amount', 'payment_date',
+            'payment_method', 'payment_method_display', 'transaction_id', 'receipt_image',
+            'notes', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at']
+
+
+class ExpenseSerializer(serializers.ModelSerializer):
+    building_name = serializers.ReadOnlyField(source='building.name')
+    category_display = serializers.ReadOnlyField(source='get_category_display')
+    
+    class Meta:
+        model = Expense
+        fields = [
+            'id', 'building', 'building_name', 'title', 'amount', 'category', 'category_display',
+            'expense_date', 'invoice_number', 'invoice_image', 'description', 'created_by', 'created_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at']
+
+
+class BalanceSerializer(serializers.Serializer):
+    apartment = serializers.IntegerField()
+    apartment_label = serializers.CharField()
+    outstanding = serializers.DecimalField(max_digits=12, decimal_places=2)
+    late_fees = serializers.DecimalField(max_digits=12, decimal_places=2)
+    open_dues = serializers.IntegerField()
+    overdue_dues = serializers.IntegerField()
+    next_due_date = serializers.DateField(allow_null=True)
+
+
+class BalanceSummarySerializer(serializers.Serializer):
+    outstanding = serializers.DecimalField(max_digits=12, decimal_places=2)
+    late_fees = serializers.DecimalField(max_digits=12, decimal_places=2)
+    next_due_date = serializers.DateField(allow_null=True)
+    apartments = BalanceSerializer(many=True)
@@ -0,0 +1,114 @@
+"""
+Keep MonthlyFinancialSummary in step with payment, expense and dues changes.
+
+Receivers rather than save()/delete() overrides, so queryset deletes (the
+admin "delete selected" action) and cascades refresh the summaries too. An
+update refreshes the period the row moved out of as well as the new one.
+Deleted rows refresh their period once the transaction commits, once per
+period however many rows a cascade removed.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from buildings.models import Building
+
+from .models import ApartmentDues, Expense, Payment, refresh_financial_summary, schedule_summary_refresh
+
+
+def _payment_bucket(payment_id):
+    row = Payment.objects.filter(pk=payment_id).values(
+        'apartment_dues__apartment__building_id', 'payment_date'
+    ).first()
+    if row is None:
+        return None
+    return (row['apartment_dues__apartment__building_id'], row['payment_date'].year, row['payment_date'].month)
+
+
+def _expense_bucket(expense_id):
+    row = Expense.objects.filter(pk=expense_id).values('building_id', 'expense_date').first()
+    if row is None:
+        return None
+    return (row['building_id'], row['expense_date'].year, row['expense_date'].month)
+
+
+def _apartment_dues_bucket(apartment_dues_id):
+    row = ApartmentDues.objects.filter(pk=apartment_dues_id).values(
+        'dues__building_id', 'dues__year', 'dues__month'
+    ).first()
+    if row is None:
+        return None
+    return (row['dues__building_id'], row['dues__year'], row['dues__month'])
+
+
+BUCKET_LOOKUPS = {Payment: _payment_bucket, Expense: _expense_bucket, ApartmentDues: _apartment_dues_bucket}
+
+_deleted_buckets = threading.local()
+
+
+def _refresh_if_building_exists(building_id, year, month):
+    # The whole building may have been deleted by the cascade that removed the row
+    if Building.objects.filter(pk=building_id).exists():
+        refresh_financial_summary(building_id, year, month)
+
+
+def _refresh_after_commit(bucket):
+    """Queue one on_commit refresh per bucket for the current transaction"""
+    hooks = transaction.get_connection().run_on_commit
+    # The hook list is replaced after a commit or rollback, which drops stale buckets
+    if getattr(_deleted_buckets, 'hooks', None) is not hooks:
+        _deleted_buckets.hooks = hooks
+        _deleted_buckets.pending = set()
+    pending = _deleted_buckets.pending
+    if bucket in pending:
+        return
+    pending.add(bucket)
+
+    def refresh():
+        pending.discard(bucket)
+        _refresh_if_building_exists(*bucket)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+def remember_summary_bucket(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        instance._previous_summary_bucket = None
+    else:
+        instance._previous_summary_bucket = BUCKET_LOOKUPS[sender](instance.pk)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+def refresh_saved_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if sender is Payment:
+        current = (instance.apartment_dues.apartment.building_id, instance.payment_date.year, instance.payment_date.month)
+    else:
+        current = (instance.building_id, instance.expense_date.year, instance.expense_date.month)
+    previous = getattr(instance, '_previous_summary_bucket', None)
+    if previous and previous != current:
+        schedule_summary_refresh(*previous)
+    schedule_summary_refresh(*current)
+
+
+@receiver(pre_delete, sender=Payment)
+@receiver(pre_delete, sender=Expense)
+@receiver(pre_delete, sender=ApartmentDues)
+def remember_deleted_bucket(sender, instance, **kwargs):
+    # Looked up before the delete, while cascaded parents still exist
+    instance._deleted_summary_bucket = BUCKET_LOOKUPS[sender](instance.pk)
+
+
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=ApartmentDues)
+def refresh_deleted_summary(sender, instance, **kwargs):
+    bucket = getattr(instance, '_deleted_summary_bucket', None)
+    if bucket:
+        _refresh_after_commit(bucket)
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .models import refresh_overdue_dues
+
+
+@shared_task
+def refresh_overdue_dues_task():
+    """Nightly overdue status and late fee recalculation"""
+    return refresh_overdue_dues()
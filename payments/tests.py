@@ -1,3 +1,395 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from buildings.models import Apartment, Building
+from users.models import User
+
+from .imports import CAMT, StatementLine, import_statement, parse_statement
+from .models import (
+    ApartmentDues, Dues, Expense, MonthlyFinancialSummary, Payment, generate_apartment_dues, generate_dues_for_period,
+    refresh_overdue_dues,
+)
+from .views import FinancialReportView
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+API_URL = '/api/v1/payments/'
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FinancialReportViewTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', email='yonetici@example.com', password='x',
+                                              role='admin')
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin)
+        Apartment.objects.create(building=self.building, floor=1, number='1')
+        for year in (2029, 2030):
+            dues = Dues.objects.create(building=self.building, amount=Decimal('500'), month=1, year=year,
+                                       due_date=date(year, 1, 5))
+            for day, amount in ((10, '100'), (20, '200')):
+                Payment.objects.create(apartment_dues=dues.apartment_dues.get(), amount=Decimal(amount),
+                                       payment_date=date(year, 1, day))
+        Expense.objects.create(building=self.building, title='Elektrik', amount=Decimal('50'),
+                               category=Expense.UTILITIES, expense_date=date(2030, 2, 3))
+
+    def report(self, **params):
+        # Read before rendering: the site templates reverse an unknown 'user_list' URL
+        request = RequestFactory().get('/payments/reports/', params)
+        request.user = self.admin
+        response = FinancialReportView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return response.context_data
+
+    def test_partial_months_are_honoured(self):
+        context = self.report(start_date='2030-01-15', end_date='2030-02-28')
+
+        self.assertEqual(context['summary']['payments'], Decimal('200'))
+        self.assertEqual(context['summary']['previous_payments'], Decimal('200'))
+        self.assertEqual(context['summary']['net'], Decimal('150'))
+        self.assertEqual([row['month'] for row in context['monthly_data']], ['2030-01', '2030-02'])
+        self.assertEqual(context['monthly_data'][1]['expenses'], Decimal('50'))
+
+    def test_year_over_year_change(self):
+        Payment.objects.filter(payment_date__year=2029).update(amount=Decimal('50'))
+
+        context = self.report(start_date='2030-01-01', end_date='2030-01-31')
+
+        self.assertEqual(context['summary']['payments_change'], 200.0)
+        self.assertEqual(context['building_data'][0]['payments'], Decimal('300'))
+
+    def test_legacy_and_swapped_dates(self):
+        context = self.report(from_date='2030-01-31', to_date='2030-01-15')
+
+        self.assertEqual((context['start_date'], context['end_date']), (date(2030, 1, 15), date(2030, 1, 31)))
+        self.assertEqual(context['summary']['payments'], Decimal('200'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportStatementTests(TestCase):
+    def setUp(self):
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.apartments = {
+            number: Apartment.objects.create(building=self.building, block='A', floor=1, number=number)
+            for number in ('2', '7')
+        }
+        Dues.objects.create(building=self.building, amount=Decimal('500'), month=1, year=2030,
+                            due_date=date(2030, 1, 5))
+
+    def line(self, transaction_id, description='', apartment='', amount='500', line_no=1):
+        return StatementLine(
+            line_no=line_no,
+            payment_date=date(2030, 1, 3),
+            amount=Decimal(amount),
+            transaction_id=transaction_id,
+            apartment=apartment,
+            description=description,
+        )
+
+    def dues_of(self, number):
+        return ApartmentDues.objects.get(apartment=self.apartments[number])
+
+    def test_explicit_reference_is_matched(self):
+        result = import_statement(self.building, [self.line('TX1', 'Aidat 2. taksit daire A-7')])
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(self.dues_of('7').paid_amount, Decimal('500'))
+        self.assertEqual(self.dues_of('7').status, ApartmentDues.PAID)
+        self.assertEqual(self.dues_of('2').paid_amount, Decimal('0'))
+
+    def test_loose_numbers_are_not_matched(self):
+        result = import_statement(self.building, [self.line('TX1', 'Aidat 2. taksit')])
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual([line_no for line_no, _reason in result.unmatched], [1])
+        self.assertFalse(Payment.objects.exists())
+
+    def test_several_apartment_references_are_not_matched(self):
+        result = import_statement(self.building, [self.line('TX1', 'daire A2 ve daire A7')])
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual(len(result.unmatched), 1)
+
+    def test_apartment_column_is_matched(self):
+        result = import_statement(self.building, [self.line('TX1', apartment='A-2', amount='200')])
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(self.dues_of('2').status, ApartmentDues.PARTIAL)
+
+    def test_duplicates_are_skipped(self):
+        import_statement(self.building, [self.line('TX1', apartment='A2', amount='100')])
+        result = import_statement(self.building, [
+            self.line('TX1', apartment='A2', amount='100', line_no=1),
+            self.line('TX2', apartment='A2', amount='100', line_no=2),
+            self.line('TX2', apartment='A2', amount='100', line_no=3),
+        ])
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.duplicates, [(1, 'TX1'), (3, 'TX2')])
+        self.assertEqual(self.dues_of('2').paid_amount, Decimal('200'))
+
+    def test_dry_run_writes_nothing(self):
+        result = import_statement(self.building, [self.line('TX1', apartment='A7')], dry_run=True)
+
+        self.assertTrue(result.dry_run)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(self.dues_of('7').paid_amount, Decimal('0'))
+
+    def test_existing_payments_count_towards_the_balance(self):
+        Payment.objects.create(apartment_dues=self.dues_of('2'), amount=Decimal('300'), payment_date=date(2030, 1, 1))
+
+        import_statement(self.building, [self.line('TX1', apartment='A2', amount='200')])
+
+        dues = self.dues_of('2')
+        self.assertEqual(dues.paid_amount, Decimal('500'))
+        self.assertEqual(dues.status, ApartmentDues.PAID)
+        self.assertEqual(dues.last_payment_date, date(2030, 1, 3))
+
+    def test_camt_remittance_reference_is_matched(self):
+        entry = """
+            <Ntry>
+              <Amt Ccy="TRY">{amount}</Amt><CdtDbtInd>{direction}</CdtDbtInd>
+              <BookgDt><Dt>2030-01-03</Dt></BookgDt><AcctSvcrRef>{reference}</AcctSvcrRef>
+              <NtryDtls><TxDtls><RmtInf><Ustrd>{text}</Ustrd></RmtInf></TxDtls></NtryDtls>
+            </Ntry>"""
+        entries = ''.join([
+            entry.format(amount='500.00', direction='CRDT', reference='CAMT1', text='Ocak aidatı daire A-7'),
+            entry.format(amount='500.00', direction='CRDT', reference='CAMT2', text='Aidat 2. taksit'),
+            entry.format(amount='80.00', direction='DBIT', reference='CAMT3', text='Elektrik daire A-2'),
+        ])
+        statement = f'<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02"><Stmt>{entries}</Stmt></Document>'
+
+        lines = parse_statement(BytesIO(statement.encode()), CAMT)
+        result = import_statement(self.building, lines)
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line_no for line_no, _reason in result.unmatched], [2])
+        self.assertEqual(self.dues_of('7').paid_amount, Decimal('500'))
+        self.assertEqual(self.dues_of('2').paid_amount, Decimal('0'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RefreshOverdueDuesTests(TestCase):
+    def setUp(self):
+        building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        self.apartment = Apartment.objects.create(building=building, floor=1, number='1')
+        self.paid_apartment = Apartment.objects.create(building=building, floor=1, number='2')
+        self.due_date = date(2030, 1, 5)
+        Dues.objects.create(building=building, amount=Decimal('1000'), month=1, year=2030,
+                            due_date=self.due_date, late_fee_percentage=Decimal('2.00'))
+        ApartmentDues.objects.filter(apartment=self.paid_apartment).update(paid_amount=Decimal('1000'))
+
+    def refresh(self, days_late):
+        return refresh_overdue_dues(today=self.due_date + timedelta(days=days_late))
+
+    def test_late_fee_grows_per_period(self):
+        changed = self.refresh(65)
+
+        self.assertEqual(changed[ApartmentDues.OVERDUE], 1)
+        self.assertEqual(changed[ApartmentDues.PAID], 1)
+        dues = ApartmentDues.objects.get(apartment=self.apartment)
+        self.assertEqual(dues.status, ApartmentDues.OVERDUE)
+        self.assertEqual(dues.late_fee, Decimal('40.00'))
+
+    def test_second_run_changes_nothing(self):
+        self.refresh(65)
+        changed = self.refresh(65)
+
+        self.assertFalse(any(changed.values()))
+        self.assertEqual(ApartmentDues.objects.get(apartment=self.apartment).late_fee, Decimal('40.00'))
+
+    def test_not_yet_due(self):
+        changed = refresh_overdue_dues(today=self.due_date)
+
+        self.assertEqual(changed[ApartmentDues.OVERDUE], 0)
+        self.assertEqual(ApartmentDues.objects.get(apartment=self.apartment).status, ApartmentDues.UNPAID)
+
+    def test_zero_amount_dues_stay_paid(self):
+        ApartmentDues.objects.filter(apartment=self.paid_apartment).update(amount=0, paid_amount=0)
+
+        self.refresh(65)
+        changed = self.refresh(65)
+
+        dues = ApartmentDues.objects.get(apartment=self.paid_apartment)
+        self.assertEqual(dues.status, ApartmentDues.PAID)
+        self.assertEqual(dues.late_fee, Decimal('0'))
+        self.assertFalse(any(changed.values()))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerateDuesTests(TestCase):
+    def setUp(self):
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        for number in ('1', '2', '3'):
+            Apartment.objects.create(building=self.building, floor=1, number=number)
+
+    def test_saving_dues_creates_one_row_per_apartment(self):
+        dues = Dues.objects.create(building=self.building, amount=Decimal('100'), month=3, year=2030,
+                                   due_date=date(2030, 3, 5))
+
+        self.assertEqual(dues.apartment_dues.count(), 3)
+        self.assertFalse(dues.apartment_dues.exclude(amount=Decimal('100'), status=ApartmentDues.UNPAID).exists())
+
+    def test_existing_rows_are_kept(self):
+        dues = Dues.objects.create(building=self.building, amount=Decimal('100'), month=3, year=2030,
+                                   due_date=date(2030, 3, 5))
+        dues.apartment_dues.update(paid_amount=Decimal('100'))
+
+        self.assertEqual(generate_apartment_dues(dues), 0)
+        Apartment.objects.create(building=self.building, floor=2, number='4')
+        self.assertEqual(generate_apartment_dues(dues), 1)
+        self.assertEqual(dues.apartment_dues.filter(paid_amount=Decimal('100')).count(), 3)
+
+    def test_building_with_dues_in_other_periods_gets_the_new_period(self):
+        Dues.objects.create(building=self.building, amount=Decimal('100'), month=3, year=2029,
+                            due_date=date(2029, 3, 5))
+        Dues.objects.create(building=self.building, amount=Decimal('100'), month=6, year=2030,
+                            due_date=date(2030, 6, 5))
+
+        self.assertEqual(generate_dues_for_period(3, 2030, amount=Decimal('100')), (1, 3))
+        self.assertTrue(Dues.objects.filter(building=self.building, month=3, year=2030).exists())
+
+    def test_rerun_only_adds_new_apartments(self):
+        generate_dues_for_period(3, 2030, amount=Decimal('100'))
+        self.assertEqual(generate_dues_for_period(3, 2030, amount=Decimal('100')), (0, 0))
+
+        Apartment.objects.create(building=self.building, floor=2, number='4')
+        self.assertEqual(generate_dues_for_period(3, 2030), (0, 1))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FinancialSummarySignalTests(TestCase):
+    def setUp(self):
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres')
+        for number in ('1', '2'):
+            Apartment.objects.create(building=self.building, floor=1, number=number)
+        self.dues = Dues.objects.create(building=self.building, amount=Decimal('100'), month=1, year=2030,
+                                        due_date=date(2030, 1, 5))
+
+    def summary(self):
+        return MonthlyFinancialSummary.objects.get(building=self.building, year=2030, month=1)
+
+    def test_payment_updates_summary(self):
+        apartment_dues = ApartmentDues.objects.filter(dues=self.dues).first()
+        Payment.objects.create(apartment_dues=apartment_dues, amount=Decimal('40'), payment_date=date(2030, 1, 2))
+
+        self.assertEqual(self.summary().dues_billed, Decimal('200'))
+        self.assertEqual(self.summary().payments_collected, Decimal('40'))
+
+    def test_deleting_apartment_dues_refreshes_summary(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ApartmentDues.objects.filter(dues=self.dues).first().delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.summary().dues_billed, Decimal('100'))
+
+    def test_deleting_dues_refreshes_summary_once(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.dues.delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.summary().dues_billed, Decimal('0'))
+
+    def test_deleting_building_leaves_no_summary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building.delete()
+
+        self.assertFalse(MonthlyFinancialSummary.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PaymentsApiTests(TestCase):
+    def setUp(self):
+        def user(username, role):
+            return User.objects.create_user(username=username, email=f'{username}@example.com', password='x',
+                                            role=role)
+
+        self.admin = user('yonetici', 'admin')
+        self.caretaker = user('kapici', 'caretaker')
+        self.resident = user('sakin', 'resident')
+        self.building = Building.objects.create(name='Test Apartmanı', address='Adres', admin=self.admin,
+                                                caretaker=self.caretaker)
+        self.other_building = Building.objects.create(name='Diğer Apartman', address='Adres',
+                                                      admin=user('baska', 'admin'))
+        self.apartment = Apartment.objects.create(building=self.building, floor=1, number='1',
+                                                  resident=self.resident)
+        Apartment.objects.create(building=self.building, floor=1, number='2', resident=user('komsu', 'resident'))
+        Apartment.objects.create(building=self.other_building, floor=1, number='1')
+        self.dues = Dues.objects.create(building=self.building, amount=Decimal('500'), month=1, year=2030,
+                                        due_date=date(2030, 1, 5))
+        Dues.objects.create(building=self.other_building, amount=Decimal('500'), month=1, year=2030,
+                            due_date=date(2030, 1, 5))
+        for apartment_dues in ApartmentDues.objects.all():
+            Payment.objects.create(apartment_dues=apartment_dues, amount=Decimal('100'),
+                                   payment_date=date(2030, 1, 2))
+        self.client = APIClient()
+
+    def get(self, user, path):
+        self.client.force_authenticate(user)
+        return self.client.get(API_URL + path)
+
+    def ids(self, user, path):
+        return {row['id'] for row in self.get(user, path).data['results']}
+
+    def test_only_admins_write_dues(self):
+        payload = {'building': self.building.pk, 'amount': '500', 'month': 2, 'year': 2030}
+        for user in (self.caretaker, self.resident):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.post(API_URL + 'dues/', payload).status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(API_URL + 'dues/', payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_by'], self.admin.pk)
+
+    def test_expenses_are_admin_only(self):
+        Expense.objects.create(building=self.building, title='Elektrik', amount=Decimal('120'),
+                               category=Expense.UTILITIES, expense_date=date(2030, 1, 10))
+
+        self.assertEqual(self.get(self.caretaker, 'expenses/').status_code, 403)
+        self.assertEqual(self.get(self.resident, 'expenses/').status_code, 403)
+        self.assertEqual(len(self.get(self.admin, 'expenses/').data['results']), 1)
+
+    def test_records_cannot_move_to_another_building(self):
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.patch(f'{API_URL}dues/{self.dues.pk}/', {
+            'building': self.other_building.pk, 'month': 2,
+        })
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post(API_URL + 'expenses/', {
+            'building': self.other_building.pk, 'title': 'Elektrik', 'amount': '120',
+            'category': Expense.UTILITIES, 'expense_date': '2030-01-10',
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Dues.objects.get(pk=self.dues.pk).building, self.building)
+
+    def test_residents_see_only_their_apartments(self):
+        own_dues = ApartmentDues.objects.get(apartment=self.apartment)
+
+        self.assertEqual(self.ids(self.resident, 'apartment-dues/'), {own_dues.pk})
+        self.assertEqual(self.ids(self.resident, 'payments/'), {own_dues.payments.get().pk})
+        self.assertEqual(self.ids(self.admin, 'apartment-dues/'),
+                         set(ApartmentDues.objects.filter(dues=self.dues).values_list('pk', flat=True)))
+
+    def test_caretaker_records_payments_in_their_building_only(self):
+        self.client.force_authenticate(self.caretaker)
+        own = ApartmentDues.objects.get(apartment=self.apartment)
+        other = ApartmentDues.objects.get(apartment__building=self.other_building)
+
+        response = self.client.post(API_URL + 'payments/', {'apartment_dues': own.pk, 'amount': '50'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['payment_date'], date.today().isoformat())
+        response = self.client.post(API_URL + 'payments/', {'apartment_dues': other.pk, 'amount': '50'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_balance_sums_the_open_dues_of_the_user(self):
+        response = self.get(self.resident, 'balance/')
+
+        self.assertEqual(Decimal(response.data['outstanding']), Decimal('400'))
+        self.assertEqual([row['apartment'] for row in response.data['apartments']], [self.apartment.pk])
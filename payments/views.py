@@ -4,6 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.db.models import Sum, Q, F, Count
 from django.core.paginator import Paginator
 from django.http import HttpResponse, JsonResponse
@@ -17,6 +18,7 @@ from .models import Dues, ApartmentDues, Expense, Payment
 from buildings.models import Building, Apartment
 from users.models import User
 from notifications.models import create_notification, NotificationGroup, send_building_notification
+from core.analytics import month_range, building_month_financials
 
 # Admin Views
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -505,91 +507,117 @@ class FinancialReportView(AdminRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         
         # Get user's buildings
-        user_buildings = Building.objects.filter(admin=self.request.user)
-        
-        # Get date range from request
-        from_date = self.request.GET.get('from_date')
-        to_date = self.request.GET.get('to_date')
-        building_id = self.request.GET.get('building_id')
-        
-        # Set default date range (last 12 months)
-        if not from_date:
-            from_date = (timezone.now() - relativedelta(months=12)).strftime('%Y-%m-%d')
-        if not to_date:
-            to_date = timezone.now().strftime('%Y-%m-%d')
-        
-        context['from_date'] = from_date
-        context['to_date'] = to_date
+        user_buildings = Building.objects.filter(admin=self.request.user).order_by('name')
+        
+        # Get date range from request (the old from_date/to_date/building_id names still work)
+        params = self.request.GET
+        building_id = params.get('building') or params.get('building_id')
+        today = timezone.now().date()
+        end_date = parse_date(params.get('end_date') or params.get('to_date') or '') or today
+        start_date = parse_date(params.get('start_date') or params.get('from_date') or '') \
+            or end_date - relativedelta(months=12)
+        if start_date > end_date:
+            start_date, end_date = end_date, start_date
+        
+        buildings = user_buildings.filter(pk=building_id) if building_id else user_buildings
+        
+        context['from_date'] = start_date.strftime('%Y-%m-%d')
+        context['to_date'] = end_date.strftime('%Y-%m-%d')
+        context['start_date'] = start_date
+        context['end_date'] = end_date
         context['buildings'] = user_buildings
         context['selected_building'] = building_id
         
-        # Filter data based on parameters
-        dues_filter = Q(building__admin=self.request.user)
-        expenses_filter = Q(building__admin=self.request.user)
-        payments_filter = Q(apartment_dues__apartment__building__admin=self.request.user)
-        
-        if building_id:
-            dues_filter &= Q(building_id=building_id)
-            expenses_filter &= Q(building_id=building_id)
-            payments_filter &= Q(apartment_dues__apartment__building_id=building_id)
-        
-        # Dues data
-        dues_data = Dues.objects.filter(dues_filter).aggregate(
+        # Dues billed within the range
+        dues_data = ApartmentDues.objects.filter(
+            apartment__building__in=buildings,
+            due_date__range=(start_date, end_date)
+        ).aggregate(
             total_expected=Sum('amount'),
-            count=Count('id')
+            count=Count('dues', distinct=True)
         )
         
-        # Expenses data
-        expenses_data = Expense.objects.filter(expenses_filter).filter(
-            expense_date__range=[from_date, to_date]
-        ).aggregate(
-            total_expenses=Sum('amount'),
-            count=Count('id')
+        # Payments and expenses per building and month, plus the same range a year earlier
+        current = building_month_financials(buildings, start_date, end_date)
+        previous = building_month_financials(
+            buildings, start_date - relativedelta(years=1), end_date - relativedelta(years=1)
         )
         
-        # Payments data
-        payments_data = Payment.objects.filter(payments_filter).filter(
-            payment_date__range=[from_date, to_date]
-        ).aggregate(
-            total_collected=Sum('amount'),
-            count=Count('id')
-        )
+        by_month, by_building, totals = self._rollup(current)
+        previous_by_month, previous_by_building, previous_totals = self._rollup(previous)
         
-        # Monthly breakdown
         monthly_data = []
-        current_date = timezone.datetime.strptime(from_date, '%Y-%m-%d').date()
-        end_date = timezone.datetime.strptime(to_date, '%Y-%m-%d').date()
-        
-        while current_date <= end_date:
-            month_payments = Payment.objects.filter(payments_filter).filter(
-                payment_date__year=current_date.year,
-                payment_date__month=current_date.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            month_expenses = Expense.objects.filter(expenses_filter).filter(
-                expense_date__year=current_date.year,
-                expense_date__month=current_date.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
+        for month in month_range(start_date, end_date):
             monthly_data.append({
-                'month': current_date.strftime('%Y-%m'),
-                'month_name': current_date.strftime('%B %Y'),
-                'payments': month_payments,
-                'expenses': month_expenses,
-                'net': month_payments - month_expenses
+                'month': month.strftime('%Y-%m'),
+                'month_name': month.strftime('%B %Y'),
+                **self._comparison(
+                    by_month.get(month, self._empty_totals()),
+                    previous_by_month.get(month - relativedelta(years=1), self._empty_totals())
+                )
             })
-            
-            current_date = current_date + relativedelta(months=1)
+        
+        building_data = [
+            {
+                'building': building,
+                **self._comparison(
+                    by_building.get(building.pk, self._empty_totals()),
+                    previous_by_building.get(building.pk, self._empty_totals())
+                )
+            }
+            for building in buildings
+        ]
+        
+        summary = self._comparison(totals, previous_totals)
         
         context.update({
             'dues_data': dues_data,
-            'expenses_data': expenses_data,
-            'payments_data': payments_data,
+            'expenses_data': {'total_expenses': totals['expenses'], 'count': totals['expense_count']},
+            'payments_data': {'total_collected': totals['payments'], 'count': totals['payment_count']},
             'monthly_data': monthly_data,
-            'net_income': (payments_data['total_collected'] or 0) - (expenses_data['total_expenses'] or 0)
+            'building_data': building_data,
+            'summary': summary,
+            'net_income': summary['net'],
+            'total_income': summary['payments'],
+            'total_expenses': summary['expenses'],
+            'balance': summary['net'],
         })
         
         return context
+    
+    @staticmethod
+    def _empty_totals():
+        return {'payments': 0, 'payment_count': 0, 'expenses': 0, 'expense_count': 0}
+    
+    def _rollup(self, buckets):
+        """Roll (building, month) buckets up per month, per building and overall"""
+        by_month, by_building, totals = {}, {}, self._empty_totals()
+        for (building_id, month), values in buckets.items():
+            for target in (by_month.setdefault(month, self._empty_totals()),
+                           by_building.setdefault(building_id, self._empty_totals()),
+                           totals):
+                for key in target:
+                    target[key] += values[key]
+        return by_month, by_building, totals
+    
+    @staticmethod
+    def _comparison(row, previous_row):
+        """Current figures next to last year's with percentage changes"""
+        def change(current, previous):
+            return round((current - previous) / previous * 100, 1) if previous else None
+        
+        net = row['payments'] - row['expenses']
+        previous_net = previous_row['payments'] - previous_row['expenses']
+        return {
+            'payments': row['payments'],
+            'expenses': row['expenses'],
+            'net': net,
+            'previous_payments': previous_row['payments'],
+            'previous_expenses': previous_row['expenses'],
+            'previous_net': previous_net,
+            'payments_change': change(row['payments'], previous_row['payments']),
+            'expenses_change': change(row['expenses'], previous_row['expenses']),
+        }
 
 
 class SendPaymentReminderView(AdminRequiredMixin, TemplateView):
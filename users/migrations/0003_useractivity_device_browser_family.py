@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:28
+
+from django.db import migrations, models
+
+from users.user_agents import parse_user_agent
+
+
+def backfill_families(apps, schema_editor):
+    UserActivity = apps.get_model('users', 'UserActivity')
+    activities = UserActivity.objects.filter(user_agent__isnull=False).exclude(user_agent='').only('pk', 'user_agent')
+    batch = []
+    for activity in activities.iterator(chunk_size=2000):
+        activity.device_family, activity.browser_family = parse_user_agent(activity.user_agent)
+        batch.append(activity)
+        if len(batch) >= 2000:
+            UserActivity.objects.bulk_update(batch, ['device_family', 'browser_family'])
+            batch = []
+    if batch:
+        UserActivity.objects.bulk_update(batch, ['device_family', 'browser_family'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_options_user_address_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useractivity',
+            name='browser_family',
+            field=models.CharField(blank=True, default='', max_length=30, verbose_name='tarayıcı'),
+        ),
+        migrations.AddField(
+            model_name='useractivity',
+            name='device_family',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='cihaz türü'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['activity_type', 'timestamp'], name='users_usera_activit_bdf1f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['timestamp'], name='users_usera_timesta_6dbdeb_idx'),
+        ),
+        migrations.RunPython(backfill_families, migrations.RunPython.noop),
+    ]
@@ -2,8 +2,9 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import RegexValidator
-from PIL import Image
+from .user_agents import parse_user_agent
 import os
 
 
@@ -123,19 +124,8 @@ class User(AbstractUser):
         elif self.role == self.CARETAKER:
             self.can_manage_complaints = True
         
+        # Resized variants are built by core.tasks.process_image_variants
         super().save(*args, **kwargs)
-        
-        # Resize profile picture if uploaded
-        if self.profile_picture:
-            self.resize_profile_picture()
-    
-    def resize_profile_picture(self):
-        """Resize profile picture to save storage space"""
-        if self.profile_picture:
-            img = Image.open(self.profile_picture.path)
-            if img.height > 300 or img.width > 300:
-                img.thumbnail((300, 300), Image.LANCZOS)
-                img.save(self.profile_picture.path)
     
     @property
     def full_name(self):
@@ -223,7 +213,10 @@ class User(AbstractUser):
     
     def get_notification_count(self):
         """Get unread notification count"""
-        return self.notifications.filter(is_read=False).count()
+        try:
+            return self.notification_counter.unread_count
+        except ObjectDoesNotExist:
+            return 0
     
     def get_complaint_count(self):
         """Get complaint count based on role"""
@@ -299,12 +292,24 @@ class UserActivity(models.Model):
     description = models.TextField(_('açıklama'), blank=True, null=True)
     ip_address = models.GenericIPAddressField(_('IP adresi'), null=True, blank=True)
     user_agent = models.TextField(_('kullanıcı aracısı'), blank=True, null=True)
+    device_family = models.CharField(_('cihaz türü'), max_length=20, blank=True, default='')
+    browser_family = models.CharField(_('tarayıcı'), max_length=30, blank=True, default='')
     timestamp = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.get_activity_type_display()}"
     
+    def save(self, *args, **kwargs):
+        # Classify the user agent once at write time for cheap grouping later
+        if self.user_agent and not self.device_family:
+            self.device_family, self.browser_family = parse_user_agent(self.user_agent)
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = _('Kullanıcı Aktivitesi')
         verbose_name_plural = _('Kullanıcı Aktiviteleri')
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['activity_type', 'timestamp']),
+            models.Index(fields=['timestamp']),
+        ]
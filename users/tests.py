@@ -1,3 +1,30 @@
 from django.test import TestCase
 
-# Create your tests here.
+from .models import User, UserActivity
+from .user_agents import BOT, DESKTOP, MOBILE, TABLET, parse_user_agent
+
+CHROME_WINDOWS = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/120.0 Safari/537.36')
+EDGE_WINDOWS = CHROME_WINDOWS + ' Edg/120.0'
+SAFARI_IPHONE = ('Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 '
+                 '(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1')
+CHROME_ANDROID_TABLET = ('Mozilla/5.0 (Linux; Android 13; SM-X700) AppleWebKit/537.36 '
+                         '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+
+class UserAgentTests(TestCase):
+    def test_devices_and_browsers_are_classified(self):
+        self.assertEqual(parse_user_agent(CHROME_WINDOWS), (DESKTOP, 'Chrome'))
+        self.assertEqual(parse_user_agent(EDGE_WINDOWS), (DESKTOP, 'Edge'))
+        self.assertEqual(parse_user_agent(SAFARI_IPHONE), (MOBILE, 'Safari'))
+        self.assertEqual(parse_user_agent(CHROME_ANDROID_TABLET), (TABLET, 'Chrome'))
+        self.assertEqual(parse_user_agent('curl/8.4.0')[0], BOT)
+        self.assertEqual(parse_user_agent(''), ('', ''))
+
+    def test_activity_stores_the_classification(self):
+        user = User.objects.create_user(username='sakin', email='sakin@example.com', password='x')
+
+        activity = UserActivity.objects.create(user=user, activity_type='login', user_agent=SAFARI_IPHONE)
+
+        activity.refresh_from_db()
+        self.assertEqual((activity.device_family, activity.browser_family), (MOBILE, 'Safari'))
@@ -0,0 +1,48 @@
+"""
+Minimal User-Agent classification.
+
+Activities store the device and browser family next to the raw header so that
+analytics can group on two short columns instead of the free-form string.
+"""
+import re
+
+DESKTOP = 'desktop'
+MOBILE = 'mobile'
+TABLET = 'tablet'
+BOT = 'bot'
+OTHER = 'other'
+
+# Checked in order, the first match wins (Edge and Opera also claim to be Chrome)
+BROWSER_PATTERNS = (
+    ('Edge', re.compile(r'Edg(e|A|iOS)?/', re.I)),
+    ('Opera', re.compile(r'OPR/|Opera', re.I)),
+    ('Samsung Internet', re.compile(r'SamsungBrowser', re.I)),
+    ('Firefox', re.compile(r'Firefox|FxiOS', re.I)),
+    ('Chrome', re.compile(r'Chrome|CriOS', re.I)),
+    ('Safari', re.compile(r'Safari', re.I)),
+    ('Internet Explorer', re.compile(r'MSIE|Trident/', re.I)),
+)
+
+BOT_PATTERN = re.compile(r'bot|crawl|spider|slurp|curl|wget|python-requests', re.I)
+TABLET_PATTERN = re.compile(r'iPad|Tablet|Android(?!.*Mobile)', re.I)
+MOBILE_PATTERN = re.compile(r'Mobi|iPhone|iPod|Android|Windows Phone', re.I)
+
+
+def parse_user_agent(user_agent):
+    """Return ``(device_family, browser_family)`` for a User-Agent header"""
+    if not user_agent:
+        return '', ''
+
+    if BOT_PATTERN.search(user_agent):
+        device = BOT
+    elif TABLET_PATTERN.search(user_agent):
+        device = TABLET
+    elif MOBILE_PATTERN.search(user_agent):
+        device = MOBILE
+    elif re.search(r'Windows|Macintosh|X11|Linux', user_agent):
+        device = DESKTOP
+    else:
+        device = OTHER
+
+    browser = next((name for name, pattern in BROWSER_PATTERNS if pattern.search(user_agent)), 'Other')
+    return device, browser